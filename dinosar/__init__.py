@@ -1,5 +1,25 @@
 """Dinosar."""
+import importlib
+import os
 
-from . import archive, isce
+__all__ = ["archive", "executor", "isce", "pipeline", "timeseries"]
 
-__all__ = ["archive", "isce"]
+
+def __getattr__(name):
+    """Import subpackages on first access to keep command line startup fast."""
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_cache_dir(cache_dir=None):
+    """Root directory for persistent caches (map tiles, cost model fits).
+
+    Uses `cache_dir` if given, otherwise the DINOSAR_CACHE environment
+    variable, otherwise ~/.cache/dinosar.
+    """
+    if cache_dir is None:
+        cache_dir = os.environ.get(
+            "DINOSAR_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "dinosar")
+        )
+    return cache_dir
@@ -8,54 +8,303 @@ NASA Distributed Active Archive Center (`ASF DAAC`_).
 
 """
 
+import contextlib
+import datetime
 import requests
 import json
 import shapely
 import shapely.wkt
 from shapely.geometry import box, mapping
+from shapely.strtree import STRtree
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 import os
-import subprocess
 import shutil
-import sys
-from lxml import html
+from dinosar.executor import run
 
+ASF_SEARCH_URL = "https://api.daac.asf.alaska.edu/services/search/param"
+ORBIT_URL = "https://s1qc.asf.alaska.edu/aux_poeorb"
+
+# Approximate size of a Sentinel-1 SLC frame used for archive size estimates
+FRAME_BYTES = 5_000_000_000
 
-def run_bash_command(cmd):
-    """Call a system command through the subprocess python module."""
-    print(cmd)
-    try:
-        retcode = subprocess.call(cmd, shell=True)
-        if retcode < 0:
-            print("Child was terminated by signal", -retcode, file=sys.stderr)
-        else:
-            print("Child returned", retcode, file=sys.stderr)
-    except OSError as e:
-        print("Execution failed:", e, file=sys.stderr)
 
+def run_bash_command(cmd, **kwargs):
+    """Call a system command, see dinosar.executor.run() for arguments."""
+    return run(cmd, **kwargs)
 
-def inventory2s3(gf, s3bucket):
+
+def inventory2s3(gf, s3bucket, workdir=None):
     """Mirror Sentinel1 inventory for specific path on S3.
 
-    Assumes geodataframe has already been filtered for desired frames.
+    Assumes geodataframe has already been filtered for desired frames. Frames
+    are downloaded to a temporary directory (created in `workdir`), synced to
+    the bucket and then deleted.
     """
-    filenames = gf.downloadUrl.tolist()
-    write_download_urls(filenames)
+    import tempfile
 
     nasauser = os.environ["NASAUSER"]
     nasapass = os.environ["NASAPASS"]
-    os.mkdir("tmp")
-    os.chdir("tmp")
-    cmd = f"wget -q -nc --user={nasauser} --password={nasapass} \
-    --input-file=download-links.txt"
-    # NOTE: don't print this command since it contains password info.
-    run_bash_command(cmd)
+    tmpdir = tempfile.mkdtemp(dir=workdir)
+    frames = os.path.join(tmpdir, "frames")
+    os.mkdir(frames)
+    try:
+        links = write_download_urls(
+            gf.downloadUrl.tolist(), os.path.join(tmpdir, "download-links.txt")
+        )
+        cmd = (
+            f"wget -q -nc --user={nasauser} --password={nasapass} "
+            f"--input-file={links}"
+        )
+        # NOTE: don't print this command since it contains password info.
+        run(cmd, cwd=frames, display=f"wget -q -nc --input-file={links}")
+        run(f"aws s3 sync {frames} s3://{s3bucket}")
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+# String columns that can be recomputed from granuleName or geometry
+DERIVED_COLUMNS = {
+    "fileName": lambda gf: gf.granuleName.astype(str) + ".zip",
+    "sceneId": lambda gf: gf.granuleName.astype(str),
+    "productName": lambda gf: gf.granuleName.astype(str),
+    "product_file_id": lambda gf: gf.granuleName.astype(str) + "_SLC",
+    "stringFootprint": lambda gf: gf.geometry.apply(lambda x: x.wkt),
+}
+
+# Numeric metadata returned as strings by the ASF API
+INTEGER_COLUMNS = {
+    "relativeOrbit": "i2",
+    "absoluteOrbit": "i4",
+    "frameNumber": "i2",
+    "firstFrame": "i2",
+    "finalFrame": "i2",
+    "flightLine": "i2",
+    "insarStackSize": "i2",
+}
+
+# Repetitive strings always stored as categoricals by compact_inventory
+CATEGORICAL_COLUMNS = [
+    "platform",
+    "flightDirection",
+    "beamMode",
+    "polarization",
+    "sceneDateString",
+    "utc",
+]
+
+# Character positions of fields in a Sentinel-1 granule name, e.g.
+# S1B_IW_SLC__1SDV_20171117T015310_20171117T015337_008315_00EB6C_40CA
+GRANULE_LENGTH = 67
+GRANULE_SEPARATORS = [3, 6, 11, 16, 32, 48, 55, 62]
+GRANULE_FIELDS = {
+    "mission": (0, 3),
+    "mode": (4, 6),
+    "productType": (7, 10),
+    "resolution": (10, 11),
+    "processingLevel": (12, 13),
+    "productClass": (13, 14),
+    "polarization": (14, 16),
+    "startTime": (17, 32),
+    "stopTime": (33, 48),
+    "absoluteOrbit": (49, 55),
+    "datatakeID": (56, 62),
+    "productID": (63, 67),
+}
+
+
+def _digits(chars, start, stop, base=10):
+    """Integer value of fixed-width digit fields in a uint8 character array."""
+    lookup = np.zeros(256, dtype="i8")
+    lookup[48:58] = np.arange(10)  # 0-9
+    lookup[65:71] = np.arange(10, 16)  # A-F
+    lookup[97:103] = np.arange(10, 16)  # a-f
+    weights = base ** np.arange(stop - start - 1, -1, -1, dtype="i8")
+    return lookup[chars[:, start:stop]] @ weights
+
+
+def _datetimes(chars, start):
+    """Parse fixed-width YYYYMMDDTHHMMSS fields in a uint8 character array."""
+    days, inverse = np.unique(_digits(chars, start, start + 8), return_inverse=True)
+    days = pd.to_datetime(days.astype(str), format="%Y%m%d").values
+    seconds = (
+        _digits(chars, start + 9, start + 11) * 3600
+        + _digits(chars, start + 11, start + 13) * 60
+        + _digits(chars, start + 13, start + 15)
+    )
+    return days[inverse.ravel()] + seconds.astype("timedelta64[s]")
+
+
+def _categorical(chars, start, stop):
+    """Categorical of a fixed-width field in a uint8 character array."""
+    values = chars[:, start:stop].copy().view(f"S{stop - start}").ravel()
+    categories, codes = np.unique(values, return_inverse=True)
+    return pd.Categorical.from_codes(codes.ravel(), categories.astype(str))
+
+
+def parse_granule_names(names):
+    """Split Sentinel-1 granule names into typed columns.
+
+    Names are parsed as a fixed-width character array, so a whole inventory
+    is split with a handful of vectorized operations.
+
+    Parameters
+    ----------
+    names : array-like
+        granule names, e.g. gf.granuleName:
+        S1B_IW_SLC__1SDV_20171117T015310_20171117T015337_008315_00EB6C_40CA
+
+    Returns
+    -------
+    df :  DataFrame
+        columns mission, mode, productType, resolution, processingLevel,
+        productClass, polarization (categoricals), startTime, stopTime
+        (datetimes), absoluteOrbit, datatakeID (integers) and productID,
+        with the same index as `names` if it is a Series
+
+    """
+    index = names.index if isinstance(names, pd.Series) else None
+    # one extra byte to detect names that are too long
+    width = GRANULE_LENGTH + 1
+    raw = np.asarray(names, dtype=object).astype(f"S{width}")
+    chars = raw.view(np.uint8).reshape(-1, width)
+    valid = (
+        (chars[:, GRANULE_LENGTH] == 0)
+        & (chars[:, GRANULE_LENGTH - 1] != 0)
+        & np.all(chars[:, GRANULE_SEPARATORS] == ord("_"), axis=1)
+    )
+    if not valid.all():
+        bad = np.asarray(names, dtype=object)[~valid][0]
+        raise ValueError(f"{bad} is not a Sentinel-1 granule name")
+
+    df = pd.DataFrame(index=index if index is not None else pd.RangeIndex(len(raw)))
+    for field in [
+        "mission",
+        "mode",
+        "productType",
+        "resolution",
+        "processingLevel",
+        "productClass",
+        "polarization",
+    ]:
+        df[field] = _categorical(chars, *GRANULE_FIELDS[field])
+    df["startTime"] = _datetimes(chars, GRANULE_FIELDS["startTime"][0])
+    df["stopTime"] = _datetimes(chars, GRANULE_FIELDS["stopTime"][0])
+    df["absoluteOrbit"] = _digits(chars, *GRANULE_FIELDS["absoluteOrbit"]).astype("i4")
+    df["datatakeID"] = _digits(chars, *GRANULE_FIELDS["datatakeID"], 16).astype("i4")
+    start, stop = GRANULE_FIELDS["productID"]
+    df["productID"] = chars[:, start:stop].copy().view("S4").ravel().astype(str)
+
+    return df
+
+
+def resolve_duplicates(gf, prefer="newest"):
+    """Keep a single product for each Sentinel-1 acquisition.
+
+    ASF can return several products for the same acquisition (e.g. reprocessed
+    versions with different product IDs). Products are grouped by mission,
+    datatake ID and start time parsed from granuleName, and one product is
+    kept per group.
 
-    cmd = f"aws s3 sync . s3://{s3bucket}"
-    run_bash_command(cmd)
-    os.chdir("tmp")
-    shutil.rmtree("tmp")
+    Parameters
+    ----------
+    gf : GeoDataFrame
+        a pandas geodataframe from load_asf_json or load_inventory
+    prefer : str or callable
+        'newest' or 'oldest' processingDate, or a function of the inventory
+        returning a Series of scores where the highest score is kept
+
+    Returns
+    -------
+    gf :  GeoDataFrame
+        inventory with one product per acquisition (original order)
+    dropped :  GeoDataFrame
+        products that were removed
+
+    """
+    keys = parse_granule_names(gf.granuleName).loc[
+        :, ["mission", "datatakeID", "startTime"]
+    ]
+    if callable(prefer):
+        score = pd.Series(np.asarray(prefer(gf)), index=gf.index)
+    elif prefer in ("newest", "oldest"):
+        score = pd.to_datetime(gf.processingDate)
+        if prefer == "oldest":
+            score = -score.astype("i8")
+    else:
+        raise ValueError(f"prefer must be 'newest', 'oldest' or callable: {prefer}")
+    keys["score"] = np.asarray(score)
+    keys["position"] = np.arange(len(gf))
+
+    ranked = keys.sort_values("score", ascending=False, kind="stable")
+    duplicate = ranked.duplicated(["mission", "datatakeID", "startTime"])
+    drop = np.sort(ranked.position.values[duplicate.values])
+    if drop.size == 0:
+        return gf, gf.iloc[drop]
+    mask = np.ones(len(gf), dtype=bool)
+    mask[drop] = False
+
+    return gf.iloc[mask].copy(), gf.iloc[drop].copy()
+
+
+def add_time_columns(gf):
+    """Add timeStamp, sceneDateString, dateStamp and utc columns in place."""
+    gf["timeStamp"] = pd.to_datetime(gf.sceneDate, format="%Y-%m-%d %H:%M:%S")
+    gf["dateStamp"] = gf.timeStamp.dt.normalize()
+    gf["sceneDateString"] = gf.timeStamp.dt.strftime("%Y-%m-%d")
+    gf["utc"] = gf.timeStamp.dt.strftime("%H:%M:%S")
+
+
+def get_column(gf, name):
+    """Get an inventory column, recomputing it if dropped by compact_inventory."""
+    if name in gf.columns:
+        return gf[name]
+    return DERIVED_COLUMNS[name](gf).rename(name)
+
+
+def compact_inventory(gf, threshold=0.5):
+    """Reduce inventory memory with categorical and small integer dtypes.
+
+    Numeric metadata stored as strings is converted to small integers,
+    repetitive strings (CATEGORICAL_COLUMNS and any other string column with
+    few unique values) become categoricals, and string columns that duplicate granuleName or
+    geometry are dropped (see get_column() to recompute them).
+
+    Parameters
+    ----------
+    gf : GeoDataFrame
+        a pandas geodataframe from load_asf_json or load_inventory
+    threshold : float
+        convert string columns with fewer unique values than this fraction of
+        rows to categoricals
+
+    Returns
+    -------
+    gf :  GeoDataFrame
+        A geopandas GeoDataFrame
+
+    """
+    gf = gf.drop(columns="stringFootprint", errors="ignore")
+    for column, derive in DERIVED_COLUMNS.items():
+        if column in gf.columns and gf[column].equals(derive(gf)):
+            gf = gf.drop(columns=column)
+
+    for column, dtype in INTEGER_COLUMNS.items():
+        if column in gf.columns:
+            values = pd.to_numeric(gf[column], errors="coerce")
+            if values.notnull().all():
+                gf[column] = values.astype(dtype)
+
+    keep = ("granuleName", "downloadUrl", gf.geometry.name)
+    for column in gf.columns:
+        if gf[column].dtype == object and column not in keep:
+            if column in CATEGORICAL_COLUMNS or (
+                gf[column].nunique(dropna=False) <= threshold * len(gf)
+            ):
+                gf[column] = gf[column].astype("category")
+
+    return gf
 
 
 def load_asf_json(jsonfile):
@@ -72,26 +321,120 @@ def load_asf_json(jsonfile):
     Returns
     -------
     gf :  GeoDataFrame
-        A geopandas GeoDataFrame
+        A geopandas GeoDataFrame (without columns if the query found nothing)
 
     """
     with open(jsonfile) as f:
         meta = json.load(f)[0]  # list of scene dictionaries
+    if not meta:
+        return gpd.GeoDataFrame(geometry=gpd.GeoSeries([], crs="EPSG:4326"))
 
     df = pd.DataFrame(meta)
     polygons = df.stringFootprint.apply(shapely.wkt.loads)
     gf = gpd.GeoDataFrame(df, crs="EPSG:4326", geometry=polygons)
 
-    gf["timeStamp"] = pd.to_datetime(gf.sceneDate, format="%Y-%m-%d %H:%M:%S")
-    gf["sceneDateString"] = gf.timeStamp.apply(lambda x: x.strftime("%Y-%m-%d"))
-    gf["dateStamp"] = pd.to_datetime(gf.sceneDateString)
-    gf["utc"] = gf.timeStamp.apply(lambda x: x.strftime("%H:%M:%S"))
+    add_time_columns(gf)
     gf["orbitCode"] = gf.relativeOrbit.astype("category").cat.codes
 
     return gf
 
 
-def summarize_orbits(gf):
+def acquisition_statistics(gf, dates=None):
+    """Compute per-orbit and per-date inventory statistics.
+
+    All aggregates come from a single grouped pass over the scenes, which
+    produces one row per (relativeOrbit, date) acquisition. Per-orbit
+    statistics are then derived from that much smaller table. Passing the
+    `dates` table from a previous call updates it with newly appended scenes
+    without revisiting the old ones.
+
+    Parameters
+    ----------
+    gf : GeoDataFrame
+        a pandas geodataframe from load_asf_json (or only new scenes if
+        `dates` is given)
+    dates : DataFrame
+        per-date table from a previous call to update
+
+    Returns
+    -------
+    orbits :  DataFrame
+        index Orbit, columns Start, Stop, Dates, Frames, Direction, UTC,
+        Revisit (median days between dates), MaxGap (days), and Bytes
+        (estimated archive size)
+    dates :  DataFrame
+        index (relativeOrbit, sceneDateString), columns nFrames, platform,
+        Direction, UTC, and dt (days since previous date on same orbit)
+
+    """
+    gb = gf.groupby(["relativeOrbit", "sceneDateString"], sort=False, observed=True)
+    new = gb.agg(
+        nFrames=("granuleName", "count"),
+        platform=("platform", "first"),
+        Direction=("flightDirection", "first"),
+        UTC=("utc", "first"),
+    )
+    # plain (not categorical) index so tables from different inventories combine
+    levels = [np.asarray(new.index.get_level_values(i)) for i in range(2)]
+    new.index = pd.MultiIndex.from_arrays(levels, names=new.index.names)
+    if dates is not None:
+        new = pd.concat([dates.drop(columns="dt"), new])
+        gb = new.groupby(level=[0, 1], sort=False)
+        new = gb.agg(
+            dict(nFrames="sum", platform="first", Direction="first", UTC="first")
+        )
+
+    return orbit_statistics(new)
+
+
+def orbit_statistics(dates):
+    """Derive per-orbit statistics from a per-date acquisition table.
+
+    Per-date tables of disjoint inventories (e.g. partitions by orbit and
+    year) can be concatenated and passed here, since intervals between dates
+    are recomputed.
+
+    Parameters
+    ----------
+    dates : DataFrame
+        index (relativeOrbit, sceneDateString), columns nFrames, platform,
+        Direction and UTC as returned by acquisition_statistics()
+
+    Returns
+    -------
+    orbits :  DataFrame
+        per-orbit statistics (see acquisition_statistics())
+    dates :  DataFrame
+        sorted per-date table with dt column updated
+
+    """
+    dates = dates.sort_index()
+    days = pd.to_datetime(dates.index.get_level_values(1))
+    dt = pd.Series(days, index=dates.index).groupby(level=0).diff().dt.days
+    dates["dt"] = dt.fillna(0).astype("i2")
+
+    gb = dates.groupby(level=0)
+    dateStrings = pd.Series(dates.index.get_level_values(1), index=dates.index)
+    orbits = pd.DataFrame(
+        dict(
+            Start=dateStrings.groupby(level=0).min(),
+            Stop=dateStrings.groupby(level=0).max(),
+            Dates=gb.size(),
+            Frames=gb.nFrames.sum(),
+            Direction=gb.Direction.first(),
+            UTC=gb.UTC.first(),
+            Revisit=dates.dt.where(dates.dt > 0).groupby(level=0).median(),
+            MaxGap=gb.dt.max(),
+        )
+    )
+    orbits["Bytes"] = orbits.Frames.astype("i8") * FRAME_BYTES
+    orbits.sort_index(inplace=True, ascending=False)
+    orbits.index.name = "Orbit"
+
+    return orbits, dates
+
+
+def summarize_orbits(gf, stats=None, outdir="."):
     """Break inventory into separate dataframes by relative orbit.
 
     For each relative orbit in GeoDataFame, save simple summary of acquisition
@@ -101,94 +444,309 @@ def summarize_orbits(gf):
     ----------
     gf : GeoDataFrame
         a pandas geodataframe from load_asf_json
+    stats : tuple
+        precomputed output of acquisition_statistics(gf)
+    outdir : str
+        output directory
+
+    Returns
+    -------
+    outnames :  list
+        paths of saved tables
 
     """
-    for orb in gf.relativeOrbit.unique():
-        df = gf.query("relativeOrbit == @orb")
-        gb = df.groupby("sceneDateString")
-        nFrames = gb.granuleName.count()
-        df = df.loc[:, ["sceneDateString", "dateStamp", "platform"]]
-        # Only keep one frame per date
-        DF = df.drop_duplicates("sceneDateString").reset_index(drop=True)
-        DF.sort_values("sceneDateString", inplace=True)
-        DF.reset_index(inplace=True, drop=True)
-        timeDeltas = DF.dateStamp.diff()
-        DF["dt"] = timeDeltas.dt.days
-        DF.loc[0, "dt"] = 0
-        DF["dt"] = DF.dt.astype("i2")
-        DF["nFrames"] = nFrames.values
-        DF.drop("dateStamp", axis=1, inplace=True)
-        # DF.set_index('date') # convert to datetime difference
-        outFile = f"acquisitions_{orb}.csv"
+    if stats is None:
+        stats = acquisition_statistics(gf)
+    orbits, dates = stats
+    outnames = []
+    for orb, df in dates.groupby(level=0, sort=False):
+        DF = df.reset_index(level=0, drop=True).reset_index()
+        DF = DF.loc[:, ["sceneDateString", "platform", "dt", "nFrames"]]
+        outFile = os.path.join(outdir, f"acquisitions_{orb}.csv")
         print(f"Saving {outFile} ...")
         DF.to_csv(outFile)
+        outnames.append(outFile)
+
+    return outnames
 
 
-def save_geojson_footprints(gf):
+FOOTPRINT_COLUMNS = ["granuleName", "downloadUrl", "sceneDateString", "platform"]
+FOOTPRINT_DATES = "footprint_dates"
+
+
+def _write_geojson(outname, gf):
+    """Write granuleName, downloadUrl and geometry of frames as GeoJSON."""
+    features = [
+        dict(
+            type="Feature",
+            properties=dict(granuleName=name, downloadUrl=url),
+            geometry=mapping(geometry),
+        )
+        for name, url, geometry in zip(gf.granuleName, gf.downloadUrl, gf.geometry)
+    ]
+    crs = dict(type="name", properties=dict(name="urn:ogc:def:crs:OGC:1.3:CRS84"))
+    with open(outname, "w") as f:
+        json.dump(dict(type="FeatureCollection", crs=crs, features=features), f)
+    return outname
+
+
+def save_geojson_footprints(gf, outdir=".", workers=None):
     """Save all frames from each date as separate geojson file.
 
     JSON footprints with metadata are easily visualized if pushed to GitHub.
-    This saves a bunch of [date].geojson files in local directory.
+    This saves a bunch of [orbit]/[date].geojson files in `outdir`. Files are
+    encoded directly instead of through the OGR driver and written
+    concurrently, which mostly helps on network file systems. For long
+    archives, save_footprints() writes a single file instead.
 
     Parameters
     ----------
     gf : GeoDataFrame
         a pandas geodataframe from load_asf_json
+    outdir : str
+        output directory
+    workers : int
+        number of files written concurrently (default: ThreadPoolExecutor's)
+
+    Returns
+    -------
+    outnames :  list
+        paths of saved files
 
     """
-    attributes = ("granuleName", "downloadUrl", "geometry")
-    gb = gf.groupby(["relativeOrbit", "sceneDateString"])
-    S = gf.groupby("relativeOrbit").sceneDateString.unique()
-    for orbit, dateList in S.iteritems():
-        os.makedirs(str(orbit))
-        for date in dateList:
-            dftmp = gf.loc[gb.groups[(orbit, date)], attributes].reset_index(drop=True)
-            outname = f"{orbit}/{date}.geojson"
-            dftmp.to_file(outname, driver="GeoJSON")
+    from concurrent.futures import ThreadPoolExecutor
+
+    attributes = ["granuleName", "downloadUrl", "geometry"]
+    groups = gf.groupby(["relativeOrbit", "sceneDateString"], observed=True)
+    for orbit in gf.relativeOrbit.unique():
+        os.makedirs(os.path.join(outdir, str(orbit)), exist_ok=True)
+    with ThreadPoolExecutor(workers) as pool:
+        futures = [
+            pool.submit(
+                _write_geojson,
+                os.path.join(outdir, str(orbit), f"{date}.geojson"),
+                gf.loc[index, attributes],
+            )
+            for (orbit, date), index in groups.groups.items()
+        ]
+        outnames = [future.result() for future in futures]
+    print(f"Saved {len(outnames)} footprint files in {outdir}")
+
+    return outnames
+
+
+def save_footprints(gf, outname="footprints.gpkg"):
+    """Save frame footprints to a single GeoPackage with a layer per orbit.
+
+    Layers are named orbit_[orbit] and sorted by date. A footprint_dates
+    table indexes the position of each date in its layer, so the frames of
+    one date are read without scanning the layer (see load_footprints()).
 
+    Parameters
+    ----------
+    gf : GeoDataFrame
+        a pandas geodataframe from load_asf_json (not modified)
+    outname : str
+        name of output file, overwritten if it exists
+
+    Returns
+    -------
+    dates :  DataFrame
+        the date index: relativeOrbit, sceneDateString, layer, start, frames
+
+    """
+    import sqlite3
+
+    if os.path.isfile(outname):
+        os.remove(outname)
+    columns = [column for column in FOOTPRINT_COLUMNS if column in gf.columns]
+    frames = []
+    for orbit, df in gf.groupby("relativeOrbit", observed=True):
+        layer = f"orbit_{orbit}"
+        df = df.sort_values(["sceneDateString", "granuleName"])
+        df = gpd.GeoDataFrame(
+            df[columns].astype(str), geometry=df.geometry.values, crs=gf.crs
+        )
+        df.to_file(outname, layer=layer, driver="GPKG")
+        counts = df.groupby("sceneDateString", sort=True).size()
+        frames.append(
+            pd.DataFrame(
+                dict(
+                    relativeOrbit=int(orbit),
+                    sceneDateString=counts.index,
+                    layer=layer,
+                    start=counts.cumsum().values - counts.values,
+                    frames=counts.values,
+                )
+            )
+        )
+    dates = pd.concat(frames, ignore_index=True)
+
+    with contextlib.closing(sqlite3.connect(outname)) as con, con:
+        dates.to_sql(FOOTPRINT_DATES, con, index=False)
+        con.execute(
+            f"CREATE INDEX {FOOTPRINT_DATES}_idx "
+            f"ON {FOOTPRINT_DATES} (relativeOrbit, sceneDateString)"
+        )
+        con.execute(
+            "INSERT INTO gpkg_contents (table_name, data_type, identifier) "
+            "VALUES (?, 'attributes', ?)",
+            (FOOTPRINT_DATES, FOOTPRINT_DATES),
+        )
+    print(f"Saved {len(gf)} footprints of {len(dates)} dates: {outname}")
+
+    return dates
+
+
+def load_footprints(inname="footprints.gpkg", orbit=None, date=None):
+    """Load footprints saved with save_footprints().
+
+    Parameters
+    ----------
+    inname : str
+        GeoPackage from save_footprints()
+    orbit : int
+        relative orbit (default: date index only)
+    date : str
+        date as YYYY-MM-DD (default: all dates of `orbit`)
 
-def summarize_inventory(gf):
+    Returns
+    -------
+    gf :  GeoDataFrame or DataFrame
+        footprints of the orbit and date, or the date index if no orbit is
+        given
+
+    """
+    import sqlite3
+
+    if orbit is not None and date is None:
+        return gpd.read_file(inname, layer=f"orbit_{int(orbit)}")
+    with contextlib.closing(sqlite3.connect(inname)) as con:
+        if orbit is None:
+            return pd.read_sql_query(f"SELECT * FROM {FOOTPRINT_DATES}", con)
+        match = con.execute(
+            f"SELECT start, frames FROM {FOOTPRINT_DATES} "
+            "WHERE relativeOrbit = ? AND sceneDateString = ?",
+            (int(orbit), date),
+        ).fetchone()
+    if match is None:
+        raise ValueError(f"No footprints for orbit {orbit} on {date}")
+    start, frames = match
+    layer = f"orbit_{int(orbit)}"
+    return gpd.read_file(inname, layer=layer, rows=slice(start, start + frames))
+
+
+def summarize_inventory(gf, stats=None, outname="inventory_summary.csv"):
     """Get basic statistics for each track.
 
     For each relativeOrbit in the dataframe, return the first date, last date,
     number of dates, number of total frames, flight direction (ascending, or
-    descending), and UTC observation time. Also calculates approximate archive
-    size by assuming 5Gb * total frames. Prints results to screen and also
-    saves inventory_summary.csv.
+    descending), UTC observation time, and median and maximum days between
+    acquisitions. Also calculates approximate archive size by assuming 5Gb *
+    total frames. Prints results to screen and also saves
+    inventory_summary.csv.
 
     Parameters
     ----------
     gf : GeoDataFrame
         a pandas geodataframe from load_asf_json
+    stats : tuple
+        precomputed output of acquisition_statistics(gf)
+    outname : str
+        output CSV file, None to only print the summary
+
+    Returns
+    -------
+    dfS :  DataFrame
+        summary table indexed by relative orbit
 
     """
-    dfS = pd.DataFrame(index=gf.relativeOrbit.unique())
-    dfS["Start"] = gf.groupby("relativeOrbit").sceneDateString.min()
-    dfS["Stop"] = gf.groupby("relativeOrbit").sceneDateString.max()
-    dfS["Dates"] = gf.groupby("relativeOrbit").sceneDateString.nunique()
-    dfS["Frames"] = gf.groupby("relativeOrbit").sceneDateString.count()
-    dfS["Direction"] = gf.groupby("relativeOrbit").flightDirection.first()
-    dfS["UTC"] = gf.groupby("relativeOrbit").utc.first()
-    dfS.sort_index(inplace=True, ascending=False)
-    dfS.index.name = "Orbit"
-    dfS.to_csv("inventory_summary.csv")
-    print(dfS)
-    size = dfS.Frames.sum() * 5 / 1e3
+    if stats is None:
+        stats = acquisition_statistics(gf)
+    dfS = stats[0]
+    if outname:
+        dfS.to_csv(outname)
+    print(dfS.drop(columns="Bytes"))
+    size = dfS.Bytes.sum() / 1e12
     print(f"Approximate Archive size = {size} Tb")
 
+    return dfS
+
 
-def merge_inventories(s1Afile, s1Bfile):
-    """Merge Sentinel 1A and Sentinel 1B into single dataframe.
+def select_pairs(dates, neighbors=1, max_days=None):
+    """Select interferometric pairs of nearby acquisition dates on each orbit.
 
-    ASF API queries are done per satellite, so queries for S1A and S1B need to
-    be merged into a single dataframe.
+    Each date is paired with the next `neighbors` dates on the same relative
+    orbit, so neighbors=1 gives a sequential network.
 
     Parameters
     ----------
-    s1Afile : str
-        Path to the json file from an ASF API query for Sentinel-1A data.
-    s1Bfile : str
-        Path to the json file from an ASF API query for Sentinel-1B data.
+    dates : DataFrame
+        per-date table from acquisition_statistics()
+    neighbors : int
+        number of following dates to pair with each date
+    max_days : int
+        maximum temporal baseline in days
+
+    Returns
+    -------
+    pairs :  DataFrame
+        columns relativeOrbit, reference (later date), secondary (earlier
+        date) as YYYYMMDD strings matching int-[reference]-[secondary]
+        directories, and days between them
+
+    """
+    dates = dates.sort_index()
+    orbits = pd.Series(dates.index.get_level_values(0))
+    days = pd.Series(pd.to_datetime(dates.index.get_level_values(1)))
+    frames = []
+    for k in range(1, neighbors + 1):
+        reference = days.groupby(orbits.values).shift(-k)
+        valid = reference.notnull()
+        frames.append(
+            pd.DataFrame(
+                dict(
+                    relativeOrbit=orbits[valid].values,
+                    reference=reference[valid].dt.strftime("%Y%m%d").values,
+                    secondary=days[valid].dt.strftime("%Y%m%d").values,
+                    days=(reference[valid] - days[valid]).dt.days.values,
+                )
+            )
+        )
+    pairs = pd.concat(frames, ignore_index=True)
+    if max_days is not None:
+        pairs = pairs[pairs.days <= max_days]
+    pairs = pairs.sort_values(["relativeOrbit", "secondary", "reference"])
+
+    return pairs.reset_index(drop=True)
+
+
+def _drop_duplicates(gf):
+    """Resolve duplicate products and report what was dropped."""
+    gf, dropped = resolve_duplicates(gf)
+    if len(dropped) > 0:
+        print(f"Dropped {len(dropped)} duplicate products:")
+        print("\n".join(dropped.granuleName))
+    return gf
+
+
+def merge_inventories(*inventories, compact=False, dedupe=True):
+    """Merge several inventories into a single dataframe.
+
+    ASF API queries are done per satellite (and often per region), so queries
+    need to be merged into a single dataframe. Queries that found nothing are
+    skipped and scenes appearing in more than one inventory are kept once.
+
+    Parameters
+    ----------
+    inventories : str or GeoDataFrame
+        Paths to json files from ASF API queries (e.g. query_SA.json,
+        query_SB.json) or already loaded GeoDataFrames.
+    compact : bool
+        Convert to memory-efficient dtypes with compact_inventory().
+    dedupe : bool
+        Keep only the newest product for each acquisition (see
+        resolve_duplicates()).
 
     Returns
     -------
@@ -196,11 +754,23 @@ def merge_inventories(s1Afile, s1Bfile):
         A geopandas GeoDataFrame
 
     """
-    print("Merging S1A and S1B inventories")
-    gfA = load_asf_json(s1Afile)
-    gfB = load_asf_json(s1Bfile)
-    gf = pd.concat([gfA, gfB])
+    print(f"Merging {len(inventories)} inventories")
+    frames = []
+    for inventory in inventories:
+        if isinstance(inventory, str):
+            inventory = load_asf_json(inventory)
+        if len(inventory):
+            frames.append(inventory)
+    if not frames:
+        raise ValueError("No scenes in the inventories")
+    gf = pd.concat(frames)
+    gf.drop_duplicates("granuleName", inplace=True)
+    if dedupe:
+        gf = _drop_duplicates(gf)
     gf.reset_index(inplace=True)
+    gf["orbitCode"] = gf.relativeOrbit.astype("category").cat.codes
+    if compact:
+        gf = compact_inventory(gf)
 
     return gf
 
@@ -211,7 +781,7 @@ def save_inventory(gf, outname="query.geojson", format="GeoJSON"):
     Parameters
     ----------
     gf : GeoDataFrame
-        a pandas geodataframe from load_asf_json.
+        a pandas geodataframe from load_asf_json (not modified).
     outname : str
         name of output file.
     format : str
@@ -223,18 +793,23 @@ def save_inventory(gf, outname="query.geojson", format="GeoJSON"):
         os.remove(outname)
     # NOTE: can't save pandas Timestamps!
     # ValueError: Invalid field type <class 'pandas._libs.tslib.Timestamp'>
-    gf.drop(["timeStamp", "dateStamp"], axis=1, inplace=True)
+    gf = gf.drop(columns=["timeStamp", "dateStamp"], errors="ignore")
+    for column in gf.columns[gf.dtypes == "category"]:
+        gf[column] = gf[column].astype(object)
     gf.to_file(outname, driver=format)
     print("Saved inventory: ", outname)
 
 
-def load_inventory(inventoryJSON):
+def load_inventory(inventoryJSON, dedupe=True):
     """Load inventory saved with asf.archive.save_inventory().
 
     Parameters
     ----------
     inventoryJSON : str
         dinsar inventory file (query.geojson)
+    dedupe : bool
+        keep only the newest product for each acquisition (see
+        resolve_duplicates())
 
     Returns
     -------
@@ -243,10 +818,9 @@ def load_inventory(inventoryJSON):
 
     """
     gf = gpd.read_file(inventoryJSON)
-    gf["timeStamp"] = pd.to_datetime(gf.sceneDate, format="%Y-%m-%d %H:%M:%S")
-    gf["sceneDateString"] = gf.timeStamp.apply(lambda x: x.strftime("%Y-%m-%d"))
-    gf["dateStamp"] = pd.to_datetime(gf.sceneDateString)
-    gf["utc"] = gf.timeStamp.apply(lambda x: x.strftime("%H:%M:%S"))
+    if dedupe:
+        gf = _drop_duplicates(gf)
+    add_time_columns(gf)
     gf["relativeOrbit"] = gf.relativeOrbit.astype("int")
     gf.sort_values("relativeOrbit", inplace=True)
     gf["orbitCode"] = gf.relativeOrbit.astype("category").cat.codes
@@ -267,8 +841,8 @@ def download_scene(downloadUrl):
 
     """
     print("Requires ~/.netrc file")
-    cmd = "wget -nc -c {downloadUrl}"
-    run_bash_command(cmd)
+    cmd = f"wget -nc -c {downloadUrl}"
+    return run(cmd)
 
 
 def query_asf(
@@ -280,19 +854,34 @@ def query_asf(
     stop=None,
     beam="IW",
     flightDirection=None,
+    outname=None,
+    baseurl=ASF_SEARCH_URL,
+    outdir=".",
 ):
-    """Search ASF with [south, north, west, east] bounds.
+    """Search ASF with [south, north, west, east] bounds or a polygon.
 
-    Saves result to local file: query_{sat}.{format}
+    Saves result to file: {outdir}/query_{sat}.{format}
 
     Parameters
     ----------
-    snwe : list
-        bounding coordinates [south, north, west, east].
+    snwe : list or shapely geometry
+        bounding coordinates [south, north, west, east], or a (multi)polygon
+        (e.g. from ogr2geometry()) to search with the exact shape.
     sat : str
         satellite id (either 'S1A' or 'S1B')
     format : str
         output format of ASF API (json, csv, kml, metalink)
+    outname : str
+        output file name (default: query_{sat}.{format} in outdir)
+    baseurl : str
+        ASF search API endpoint
+    outdir : str
+        output directory if outname is not given
+
+    Returns
+    -------
+    outname :  str
+        path to saved query results
 
     Notes
     ----------
@@ -305,11 +894,13 @@ def query_asf(
 
     """
     print(f"Querying ASF Vertex for {sat}...")
-    miny, maxy, minx, maxx = snwe
-    roi = shapely.geometry.box(minx, miny, maxx, maxy)
+    if hasattr(snwe, "wkt"):
+        roi = snwe
+    else:
+        miny, maxy, minx, maxx = snwe
+        roi = shapely.geometry.box(minx, miny, maxx, maxy)
     polygonWKT = roi.wkt
 
-    baseurl = "https://api.daac.asf.alaska.edu/services/search/param"
     # relativeOrbit=$ORBIT
     data = dict(
         intersectsWith=polygonWKT,
@@ -329,31 +920,184 @@ def query_asf(
 
     r = requests.get(baseurl, params=data, timeout=100)
     print(r.url)
+    r.raise_for_status()
+    text = r.text
+    # Paged (CMR-backed) search responses point to the next page in a header
+    if format == "json" and "CMR-Search-After" in r.headers:
+        scenes = r.json()[0]
+        while "CMR-Search-After" in r.headers:
+            headers = {"CMR-Search-After": r.headers["CMR-Search-After"]}
+            r = requests.get(baseurl, params=data, headers=headers, timeout=100)
+            r.raise_for_status()
+            scenes.extend(r.json()[0])
+        text = json.dumps([scenes])
     # Save Directly to dataframe
     # df = pd.DataFrame(r.json()[0])
-    with open(f"query_{sat}.{format}", "w") as j:
-        j.write(r.text)
+    if outname is None:
+        outname = os.path.join(outdir, f"query_{sat}.{format}")
+    with open(outname, "w") as j:
+        j.write(text)
 
+    return outname
 
-def get_orbit_url_file(
-    granuleName, inventory="poeorb.txt", url="https://s1qc.asf.alaska.edu/aux_poeorb"
+
+def cluster_regions(regions, distance=0.5):
+    """Group regions of interest that are within a distance of each other.
+
+    Parameters
+    ----------
+    regions : GeoDataFrame
+        regions of interest (EPSG:4326)
+    distance : float
+        regions closer than this (in decimal degrees) share a cluster
+
+    Returns
+    -------
+    labels :  ndarray
+        cluster number for each region
+    bounds :  list
+        [S, N, W, E] bounds of each cluster
+
+    """
+    geoms = regions.geometry.buffer(distance / 2).values
+    pairs = spatial_join(geoms, geoms)
+    # connected components by repeatedly taking the smallest neighbor label
+    labels = np.arange(len(regions))
+    while True:
+        smallest = labels.copy()
+        np.minimum.at(smallest, pairs.geom.values, labels[pairs.region.values])
+        smallest = smallest[smallest]
+        if np.array_equal(smallest, labels):
+            break
+        labels = smallest
+    labels = np.unique(labels, return_inverse=True)[1].ravel()
+
+    bounds = []
+    extents = regions.geometry.bounds.groupby(labels)
+    for label, df in extents:
+        bounds.append([df.miny.min(), df.maxy.max(), df.minx.min(), df.maxx.max()])
+
+    return labels, bounds
+
+
+def query_regions(
+    regions,
+    name="name",
+    distance=0.5,
+    sats=("SA", "SB"),
+    workers=8,
+    outdir=".",
+    **kwargs,
 ):
+    """Query ASF for many regions of interest with few consolidated queries.
+
+    Nearby regions are clustered (see cluster_regions()) and each cluster is
+    queried once per satellite, concurrently. The combined results are split
+    back out per region with a single spatial join and saved to
+    [outdir]/[name]/query.geojson.
+
+    Parameters
+    ----------
+    regions : GeoDataFrame
+        regions of interest
+    name : str
+        column of `regions` with a unique name for each region
+    distance : float
+        regions closer than this (in decimal degrees) are queried together
+    sats : list
+        satellite ids to query
+    workers : int
+        number of concurrent queries
+    outdir : str
+        parent directory for per-region output directories
+    kwargs :
+        other arguments passed to query_asf() (e.g. orbit, start, stop)
+
+    Returns
+    -------
+    inventories :  dict
+        {region name: path to saved inventory}
+
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if regions.crs is not None:
+        regions = regions.to_crs(epsg=4326)
+    labels, bounds = cluster_regions(regions, distance)
+    print(f"Querying {len(regions)} regions with {len(bounds)} clusters")
+    clusters = os.path.join(outdir, "clusters")
+    os.makedirs(clusters, exist_ok=True)
+
+    with ThreadPoolExecutor(workers) as pool:
+        futures = []
+        for i, snwe in enumerate(bounds):
+            for sat in sats:
+                outname = os.path.join(clusters, f"query_{i}_{sat}.json")
+                args = dict(kwargs, outname=outname)
+                futures.append(pool.submit(query_asf, snwe, sat, **args))
+        files = [future.result() for future in futures]
+
+    gf = merge_inventories(*files)
+    inventories = {}
+    for label, subset in split_inventory(gf, regions, name).items():
+        os.makedirs(os.path.join(outdir, str(label)), exist_ok=True)
+        outname = os.path.join(outdir, str(label), "query.geojson")
+        save_inventory(subset, outname)
+        inventories[label] = outname
+
+    return inventories
+
+
+def get_orbit_url_file(granuleName, inventory="poeorb.txt", url=ORBIT_URL):
     """Find and construct orbit URL from directory listing."""
-    sat = granuleName[:3]
-    date = granuleName[17:25]
-    print(f"finding precise orbit for {sat}, {date}")
+    granule = _parse_granule(granuleName)
+    print(f"finding precise orbit for {granule.mission}, {granule.startTime:%Y%m%d}")
     df = pd.read_csv(inventory, header=None, names=["orbit"])
-    dfSat = df[df.orbit.str.startswith(sat)].copy()
-    dayBefore = pd.to_datetime(date) - pd.to_timedelta(1, unit="d")
-    dayBeforeStr = dayBefore.strftime("%Y%m%d")
-    dfSat.loc[:, "startTime"] = dfSat.orbit.str[42:50]
-    match = dfSat.loc[dfSat.startTime == dayBeforeStr, "orbit"].values[0]
-    orbitUrl = f"{url}/{match}"
+    orbitUrl = _match_orbit(df, granuleName, url)
 
     return orbitUrl
 
 
-def get_orbit_url(granuleName, url="https://s1qc.asf.alaska.edu/aux_poeorb"):
+def _parse_granule(granuleName):
+    """Parse one granule name, file name or download url (see get_orbit_url)."""
+    name = os.path.splitext(os.path.basename(granuleName))[0]
+    return parse_granule_names([name]).iloc[0]
+
+
+def orbit_file_key(orbitFile):
+    """(mission, first valid day YYYYMMDD) of a precise orbit file name.
+
+    e.g. ('S1B', '20171116') for
+    S1B_OPER_AUX_POEORB_OPOD_20171207T111405_V20171116T225942_20171118T005942.EOF
+    """
+    return orbitFile[:3], orbitFile[42:50]
+
+
+def orbit_key(granuleName):
+    """orbit_file_key() of the precise orbit file covering a granule.
+
+    Precise orbit files are valid from the day before the acquisition. Only
+    the mission and start date of the granule name are read, so this is fast
+    enough for per-request lookups, and raises a ValueError for names
+    without a valid start date.
+    """
+    name = os.path.basename(granuleName)
+    start = datetime.datetime.strptime(name[17:25], "%Y%m%d")
+    return name[:3], f"{start - datetime.timedelta(days=1):%Y%m%d}"
+
+
+def _match_orbit(df, granuleName, url):
+    """Select the precise orbit file of a granule from a listing."""
+    key = orbit_key(granuleName)
+    matches = [orbit for orbit in df.orbit.dropna() if orbit_file_key(orbit) == key]
+    if not matches:
+        raise ValueError(f"No precise orbit for {granuleName} in {url}")
+    orbitUrl = f"{url}/{matches[0]}"
+
+    return orbitUrl
+
+
+def get_orbit_url(granuleName, url=ORBIT_URL):
     """Retrieve precise orbit file for a specific Sentinel-1 granule.
 
     Precise orbits available ~3 weeks after acquisition.
@@ -363,6 +1107,7 @@ def get_orbit_url(granuleName, url="https://s1qc.asf.alaska.edu/aux_poeorb"):
     granuleName : str
         ASF granule name, e.g.:
         S1B_IW_SLC__1SDV_20171117T015310_20171117T015337_008315_00EB6C_40CA
+        (a file name or download url of the granule also works)
     url : str
         website with simple list of orbit file links
 
@@ -372,19 +1117,18 @@ def get_orbit_url(granuleName, url="https://s1qc.asf.alaska.edu/aux_poeorb"):
         url pointing to matched orbit file
 
     """
-    sat = granuleName[:3]
-    date = granuleName[17:25]
-    print(f"retrieving precise orbit URL for {sat}, {date}")
+    from lxml import html
+
+    granule = _parse_granule(granuleName)
+    print(
+        f"retrieving precise orbit URL for {granule.mission}, "
+        f"{granule.startTime:%Y%m%d}"
+    )
     r = requests.get(url)
     webpage = html.fromstring(r.content)
     orbits = webpage.xpath("//a/@href")
     df = pd.DataFrame(dict(orbit=orbits))
-    dfSat = df[df.orbit.str.startswith(sat)].copy()
-    dayBefore = pd.to_datetime(date) - pd.to_timedelta(1, unit="d")
-    dayBeforeStr = dayBefore.strftime("%Y%m%d")
-    dfSat.loc[:, "startTime"] = dfSat.orbit.str[42:50]
-    match = dfSat.loc[dfSat.startTime == dayBeforeStr, "orbit"].values[0]
-    orbitUrl = f"{url}/{match}"
+    orbitUrl = _match_orbit(df, granuleName, url)
 
     return orbitUrl
 
@@ -395,7 +1139,7 @@ def get_slc_names(gf, dateStr, relativeOrbit):
         print(f"retrieving SLC.zip for track {relativeOrbit}, {dateStr}")
         GF = gf.query("relativeOrbit == @relativeOrbit")
         GF = GF.loc[GF.dateStamp == dateStr]
-        filenames = GF.fileName.tolist()
+        filenames = get_column(GF, "fileName").tolist()
     except Exception as e:
         print("ERROR retrieving scenes, double check dates!")
         print(e)
@@ -435,21 +1179,30 @@ def get_slc_urls(gf, dateStr, relativeOrbit):
     return filenames
 
 
-def write_download_urls(fileList):
+def write_download_urls(fileList, outname="download-links.txt"):
     """Write list of frame urls to a file.
 
     This is useful if you are running isce on a server and want to keep a
-    record of download links. Writes download-links.txt to current folder.
+    record of download links.
 
     Parameters
     ----------
     fileList : list
         list of download url strings
+    outname : str
+        output file
+
+    Returns
+    -------
+    outname :  str
+        path of saved file
 
     """
-    with open("download-links.txt", "w") as f:
+    with open(outname, "w") as f:
         f.write("\n".join(fileList))
 
+    return outname
+
 
 def ogr2snwe(vectorFile, buffer=None):
     """Convert ogr shape to South,North,West,East bounds.
@@ -478,24 +1231,200 @@ def ogr2snwe(vectorFile, buffer=None):
     return snwe
 
 
-def snwe2file(snwe):
+def read_geometries(vectorFile):
+    """Read only the geometries of a vector file, reprojected to EPSG:4326.
+
+    Attribute columns are skipped when reading, which matters for large
+    files with many fields.
+
+    Parameters
+    ----------
+    vectorFile : str
+        path to OGR-recognized vector file.
+
+    Returns
+    -------
+    geoms :  GeoSeries
+        geometries in EPSG:4326
+
+    """
+    import fiona
+
+    with fiona.open(vectorFile) as src:
+        fields = list(src.schema["properties"])
+    gf = gpd.read_file(vectorFile, ignore_fields=fields)
+    if gf.crs is not None:
+        gf = gf.to_crs(epsg=4326)
+
+    return gf.geometry
+
+
+def count_vertices(geom):
+    """Number of exterior and interior ring vertices in a (multi)polygon."""
+    polygons = getattr(geom, "geoms", [geom])
+    return sum(
+        len(p.exterior.coords) + sum(len(r.coords) for r in p.interiors)
+        for p in polygons
+    )
+
+
+def _simplify(geom, max_vertices, tolerance, steps=40):
+    """Simplify with a doubling tolerance to at most `max_vertices` vertices.
+
+    The geometry is buffered by the tolerance before simplifying, so the result
+    always covers the original shape. Returns None if the geometry can't be
+    simplified that far, simplified polygons keep at least 4 vertices each.
+    """
+    simplified = geom
+    for _ in range(steps):
+        if count_vertices(simplified) <= max_vertices and simplified.covers(geom):
+            return simplified
+        simplified = geom.buffer(tolerance).simplify(tolerance, preserve_topology=True)
+        tolerance *= 2
+    return None
+
+
+def ogr2geometry(vectorFile, buffer=None, max_vertices=300, tolerance=1e-4):
+    """Convert ogr shapes to a single (multi)polygon for ASF queries.
+
+    Unlike ogr2snwe(), the shape itself is kept, so long or multi-part regions
+    don't pull in frames that only intersect their bounding box. The shape is
+    simplified until it has no more than `max_vertices` vertices, growing it
+    slightly so no part of the region is lost, and rings are oriented
+    counter-clockwise as required by the ASF API. Shapes with too
+    many parts to keep apart are replaced by their convex hull.
+
+    Parameters
+    ----------
+    vectorFile : str
+        path to OGR-recognized vector file.
+    buffer : float
+        Amount of buffer distance to add to shape (in decimal degrees).
+    max_vertices : int
+        maximum number of vertices in the output geometry
+    tolerance : float
+        initial simplification tolerance (in decimal degrees), doubled until
+        the geometry has few enough vertices
+
+    Returns
+    -------
+    geom :  Polygon or MultiPolygon
+        region of interest in EPSG:4326
+
+    """
+    from shapely.geometry import MultiPolygon
+    from shapely.geometry.polygon import orient
+    from shapely.ops import unary_union
+
+    geom = unary_union(list(read_geometries(vectorFile)))
+    if buffer:
+        geom = geom.buffer(buffer)
+    if geom.geom_type not in ("Polygon", "MultiPolygon"):
+        geom = geom.convex_hull
+    simplified = _simplify(geom, max_vertices, tolerance)
+    if simplified is None:
+        print(f"Using the convex hull of {vectorFile} (too many parts)")
+        simplified = _simplify(geom.convex_hull, max_vertices, tolerance)
+    if simplified is None:
+        raise ValueError(f"{vectorFile} can't be simplified to {max_vertices} vertices")
+    if simplified.geom_type == "MultiPolygon":
+        simplified = MultiPolygon([orient(p) for p in simplified.geoms])
+    else:
+        simplified = orient(simplified)
+
+    return simplified
+
+
+def spatial_join(geoms, regions):
+    """Find intersecting pairs of geometries with an STRtree.
+
+    Parameters
+    ----------
+    geoms : array-like
+        shapely geometries (e.g. inventory footprints, gf.geometry.values)
+    regions : array-like
+        shapely geometries (e.g. regions of interest)
+
+    Returns
+    -------
+    pairs :  DataFrame
+        positional indices into geoms ('geom') and regions ('region') for
+        every intersecting pair, sorted by region
+
+    """
+    regions = list(regions)
+    geoms = list(geoms)
+    tree = STRtree(geoms)
+    if hasattr(tree, "query_items"):  # shapely 1.8
+        left, right = [], []
+        for j, region in enumerate(regions):
+            for i in tree.query_items(region):
+                if geoms[i].intersects(region):
+                    left.append(i)
+                    right.append(j)
+    else:  # shapely >= 2.0
+        right, left = tree.query(np.asarray(regions), predicate="intersects")
+    pairs = pd.DataFrame(
+        dict(geom=np.asarray(left, dtype="i8"), region=np.asarray(right, dtype="i8"))
+    )
+    pairs.sort_values(["region", "geom"], inplace=True, ignore_index=True)
+
+    return pairs
+
+
+def split_inventory(gf, regions, name="name"):
+    """Split an inventory into subsets intersecting each region of interest.
+
+    A single spatial join is done for all regions, so this is much faster
+    than filtering the inventory once per region.
+
+    Parameters
+    ----------
+    gf : GeoDataFrame
+        a pandas geodataframe from load_asf_json or load_inventory
+    regions : GeoDataFrame
+        regions of interest
+    name : str
+        column of `regions` with a unique name for each region
+
+    Returns
+    -------
+    subsets :  dict
+        {region name: GeoDataFrame} for regions with at least one frame
+
+    """
+    if regions.crs is not None:
+        regions = regions.to_crs(epsg=4326)
+    pairs = spatial_join(gf.geometry.values, regions.geometry.values)
+    subsets = {}
+    for region, rows in pairs.groupby("region").geom:
+        subset = gf.iloc[rows.values].copy()
+        subset["orbitCode"] = subset.relativeOrbit.astype("category").cat.codes
+        subsets[regions[name].iloc[region]] = subset
+
+    return subsets
+
+
+def snwe2file(snwe, outdir="."):
     """Use Shapely to convert to GeoJSON & WKT.
 
-    Save local text files in variety of formats to record bounds: snwe.json,
+    Save text files in variety of formats to record bounds: snwe.json,
     snwe.wkt, snwe.txt.
 
     Parameters
     ----------
     snwe : list
         bounding coordinates [south, north, west, east].
+    outdir : str
+        output directory
 
     """
     S, N, W, E = snwe
     roi = box(W, S, E, N)
-    with open("snwe.json", "w") as j:
+    with open(os.path.join(outdir, "snwe.json"), "w") as j:
         json.dump(mapping(roi), j)
-    with open("snwe.wkt", "w") as w:
+    with open(os.path.join(outdir, "snwe.wkt"), "w") as w:
         w.write(roi.wkt)
-    with open("snwe.txt", "w") as t:
+    with open(os.path.join(outdir, "snwe.txt"), "w") as t:
         snweList = "[{0:.3f}, {1:.3f}, {2:.3f}, {3:.3f}]".format(S, N, W, E)
         t.write(snweList)
@@ -0,0 +1,181 @@
+"""Compact acquisition matrix for fast coverage queries.
+
+An inventory is reduced to a relativeOrbit x day matrix of frame counts and a
+bit-packed copy of the same matrix marking days with at least one acquisition.
+Questions about revisit gaps, ascending/descending overlap, and coverage can
+then be answered with a few vectorized operations on a matrix of a few hundred
+kilobytes instead of groupbys over the full inventory.
+
+Notes
+-----
+The matrix can be saved next to an inventory file (e.g. query.acq.npz for
+query.geojson) and reloaded without reading the inventory::
+
+    acq = AcquisitionMatrix.from_inventory(gf)
+    acq.save(matrix_path("query.geojson"))
+
+"""
+import os
+import numpy as np
+import pandas as pd
+
+
+def matrix_path(inventory):
+    """Path of the acquisition matrix saved alongside an inventory file."""
+    return os.path.splitext(inventory)[0] + ".acq.npz"
+
+
+class AcquisitionMatrix:
+    """Relative orbit x day acquisition matrix.
+
+    Parameters
+    ----------
+    orbits : ndarray
+        sorted relative orbit numbers (matrix rows)
+    directions : ndarray
+        flight direction for each orbit ('ASCENDING' or 'DESCENDING')
+    start : str or datetime64
+        date of the first column
+    frames : ndarray
+        number of frames acquired with shape (orbits, days)
+
+    """
+
+    def __init__(self, orbits, directions, start, frames):
+        self.orbits = np.asarray(orbits)
+        self.directions = np.asarray(directions)
+        self.start = np.datetime64(start, "D")
+        self.frames = np.asarray(frames, dtype="u1")
+        self.bits = np.packbits(self.frames > 0, axis=1)
+
+    @classmethod
+    def from_inventory(cls, gf):
+        """Build acquisition matrix from an inventory GeoDataFrame.
+
+        Parameters
+        ----------
+        gf : GeoDataFrame
+            a pandas geodataframe from load_asf_json or load_inventory
+
+        Returns
+        -------
+        acq :  AcquisitionMatrix
+
+        """
+        codes, orbits = pd.factorize(gf.relativeOrbit.astype("int"), sort=True)
+        days = gf.dateStamp.values.astype("datetime64[D]")
+        start = days.min()
+        columns = (days - start).astype("i8")
+        ndays = columns.max() + 1
+        counts = np.bincount(codes * ndays + columns, minlength=orbits.size * ndays)
+        frames = np.minimum(counts, 255).reshape(orbits.size, ndays)
+        directions = gf.groupby(codes).flightDirection.first().values
+
+        return cls(np.asarray(orbits), directions, start, frames)
+
+    @classmethod
+    def load(cls, path):
+        """Load acquisition matrix saved with AcquisitionMatrix.save()."""
+        with np.load(path, allow_pickle=False) as npz:
+            return cls(npz["orbits"], npz["directions"], npz["start"], npz["frames"])
+
+    def save(self, path):
+        """Save acquisition matrix to a compressed .npz file."""
+        np.savez_compressed(
+            path,
+            orbits=self.orbits,
+            directions=self.directions.astype("U10"),
+            start=self.start,
+            frames=self.frames,
+        )
+
+    @property
+    def ndays(self):
+        """Number of days (matrix columns)."""
+        return self.frames.shape[1]
+
+    @property
+    def dates(self):
+        """Dates of the matrix columns."""
+        return self.start + np.arange(self.ndays)
+
+    def _columns(self, start=None, stop=None):
+        """Column slice for an inclusive date range."""
+        first = 0
+        last = self.ndays
+        if start is not None:
+            first = int((np.datetime64(start, "D") - self.start).astype("i8"))
+        if stop is not None:
+            last = int((np.datetime64(stop, "D") - self.start).astype("i8")) + 1
+        return slice(max(first, 0), min(max(last, 0), self.ndays))
+
+    def _rows(self, direction=None):
+        """Boolean row selection for a flight direction."""
+        if direction is None:
+            return np.ones(self.orbits.size, dtype=bool)
+        return self.directions == direction.upper()
+
+    def acquired(self, start=None, stop=None):
+        """Boolean matrix of days with at least one acquisition."""
+        cols = self._columns(start, stop)
+        acquired = np.unpackbits(self.bits, axis=1, count=self.ndays).astype(bool)
+        return acquired[:, cols]
+
+    def any_acquired(self, direction=None):
+        """Dates with an acquisition on any orbit (optionally per direction)."""
+        packed = np.bitwise_or.reduce(self.bits[self._rows(direction)], axis=0)
+        return np.unpackbits(packed, count=self.ndays).astype(bool)
+
+    def max_gaps(self, start=None, stop=None):
+        """Longest interval in days between acquisitions for each orbit.
+
+        Orbits with fewer than two acquisitions in the date range have a gap
+        of 0.
+
+        Returns
+        -------
+        gaps :  Series
+            maximum gap in days indexed by relative orbit
+
+        """
+        rows, cols = np.nonzero(self.acquired(start, stop))
+        gaps = np.zeros(self.orbits.size, dtype="i8")
+        same = rows[1:] == rows[:-1]
+        np.maximum.at(gaps, rows[1:][same], np.diff(cols)[same])
+        return pd.Series(gaps, index=self.orbits, name="MaxGap")
+
+    def tracks_with_gap(self, days, start=None, stop=None):
+        """Relative orbits with an interval between acquisitions > days."""
+        gaps = self.max_gaps(start, stop)
+        return gaps.index[gaps.values > days].values
+
+    def overlap_dates(self):
+        """Dates with both ascending and descending acquisitions."""
+        both = self.any_acquired("ASCENDING") & self.any_acquired("DESCENDING")
+        return self.dates[both]
+
+    def coverage_fraction(self, revisit=12, start=None, stop=None):
+        """Fraction of revisit intervals with at least one acquisition.
+
+        Parameters
+        ----------
+        revisit : int
+            interval length in days (e.g. 12 for a single Sentinel-1 satellite)
+        start : str
+            first date of the window (default: first date in matrix)
+        stop : str
+            last date of the window (default: last date in matrix)
+
+        Returns
+        -------
+        fraction :  Series
+            coverage fraction indexed by relative orbit
+
+        """
+        acquired = self.acquired(start, stop)
+        nbins = -(-acquired.shape[1] // revisit)
+        padded = np.zeros((self.orbits.size, nbins * revisit), dtype=bool)
+        padded[:, : acquired.shape[1]] = acquired
+        covered = padded.reshape(self.orbits.size, nbins, revisit).any(axis=2)
+        fraction = covered.mean(axis=1) if nbins else np.zeros(self.orbits.size)
+        return pd.Series(fraction, index=self.orbits, name="Coverage")
@@ -0,0 +1,322 @@
+"""Acquisition density rasters from inventory footprints.
+
+Footprints are rasterized with a vectorized scanline algorithm: every polygon
+edge is intersected with the pixel-center rows it spans, crossings are paired
+into column spans, spans of frames acquired on the same date are merged, and
+the spans are burned into the grid with a cumulative sum. Each pixel counts
+the number of acquisition dates covering it, so overlapping frames from the
+same date are only counted once. Orbits are rasterized in parallel processes.
+
+Notes
+-----
+Rasters are written as band-sequential int32 binary files with a GDAL VRT
+header (e.g. density.vrt), which GDAL-based tools and QGIS open directly::
+
+    counts, labels, bounds = density_raster(gf, shape=(1000, 1000))
+    write_raster(counts, labels, bounds, "density.vrt")
+
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import shapely
+
+
+def _ring_edges(geoms):
+    """Ring edges of arbitrary (multi)polygons with shapely."""
+    coords, owner = [], []
+    for i, geom in geoms:
+        for polygon in getattr(geom, "geoms", [geom]):
+            for ring in [polygon.exterior, *polygon.interiors]:
+                xy = np.asarray(ring.coords)[:, :2]
+                coords.append(np.hstack([xy[:-1], xy[1:]]))
+                owner.append(np.full(len(xy) - 1, i))
+    return coords, owner
+
+
+def _edges(geoms):
+    """Polygon ring edges (x0, y0, x1, y1) and the position of their geometry.
+
+    Single-ring 2D polygons (almost all frame footprints) are decoded from
+    WKB with numpy, anything else is read through shapely.
+    """
+    if hasattr(shapely, "to_wkb"):  # shapely >= 2.0
+        wkbs = list(shapely.to_wkb(geoms, byte_order=1))
+    else:
+        wkbs = [geom.wkb for geom in geoms]
+    sizes = np.array([len(w) for w in wkbs], dtype="i8")
+    buf = np.frombuffer(b"".join(wkbs), dtype="u1")
+    starts = np.cumsum(sizes) - sizes
+    simple = sizes >= 13
+    header = buf[starts[simple, None] + np.arange(13)]
+    # little endian flag, then geometry type, rings and points as uint32
+    little = np.zeros(len(wkbs), dtype=bool)
+    little[simple] = header[:, 0] == 1
+    fields = np.zeros((len(wkbs), 3), dtype="<u4")
+    fields[simple] = header[:, 1:].copy().view("<u4")
+    simple &= little & (fields[:, 0] == 3) & (fields[:, 1] == 1)
+    npoints = np.where(simple, fields[:, 2], 0).astype("i8")
+    simple &= sizes == 13 + 16 * npoints
+
+    nbytes = 16 * npoints[simple]
+    first = np.repeat(starts[simple] + 13, nbytes)
+    within = np.arange(nbytes.sum()) - np.repeat(np.cumsum(nbytes) - nbytes, nbytes)
+    xy = buf[first + within].view("<f8").reshape(-1, 2)
+    ends = np.cumsum(npoints[simple])
+    last = np.zeros(len(xy), dtype=bool)
+    last[ends - 1] = True
+    coords = [np.hstack([xy[:-1], xy[1:]])[~last[:-1]]]
+    owner = [np.repeat(np.flatnonzero(simple), npoints[simple] - 1)]
+
+    other = [(i, geoms[i]) for i in np.flatnonzero(~simple)]
+    more, more_owner = _ring_edges(other)
+    coords = np.concatenate(coords + more).reshape(-1, 4)
+    owner = np.concatenate(owner + more_owner).astype("i8")
+    return coords, owner
+
+
+def rasterize_spans(edges, owner, groups, bounds, shape):
+    """Count groups of polygons covering each pixel center.
+
+    Parameters
+    ----------
+    edges : ndarray
+        polygon edges [x0, y0, x1, y1] with shape (N, 4)
+    owner : ndarray
+        polygon of each edge
+    groups : ndarray
+        group of each polygon (e.g. acquisition date), polygons in the same
+        group count once where they overlap
+    bounds : tuple
+        grid bounds (minx, miny, maxx, maxy)
+    shape : tuple
+        grid shape (rows, columns), row 0 at maxy
+
+    Returns
+    -------
+    counts :  ndarray
+        int32 counts with shape `shape`
+
+    """
+    minx, miny, maxx, maxy = bounds
+    nrows, ncols = shape
+    dx = (maxx - minx) / ncols
+    dy = (maxy - miny) / nrows
+    x0, y0, x1, y1 = edges.T
+    ylo, yhi = np.minimum(y0, y1), np.maximum(y0, y1)
+
+    # rows with pixel centers in [ylo, yhi)
+    first = np.maximum(np.floor((maxy - yhi) / dy - 0.5) + 1, 0).astype("i8")
+    last = np.minimum(np.floor((maxy - ylo) / dy - 0.5), nrows - 1).astype("i8")
+    nspan = np.maximum(last - first + 1, 0)
+    edge = np.repeat(np.arange(len(edges)), nspan)
+    offsets = np.cumsum(nspan) - nspan
+    row = first[edge] + np.arange(edge.size) - np.repeat(offsets, nspan)
+
+    yc = maxy - (row + 0.5) * dy
+    t = (yc - y0[edge]) / (y1[edge] - y0[edge])
+    x = x0[edge] + t * (x1[edge] - x0[edge])
+    polygon = owner[edge]
+
+    # pair sorted crossings of each (polygon, row) into spans (even-odd rule)
+    key = polygon * nrows + row
+    order = np.argsort(key)
+    x, row, polygon, key = x[order], row[order], polygon[order], key[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    sizes = np.diff(np.r_[starts, key.size])
+    # most (polygon, row) pairs have two crossings, only sort x for the others
+    many = np.repeat(sizes > 2, sizes)
+    if many.any():
+        sub = np.flatnonzero(many)
+        sub = sub[np.lexsort((x[sub], key[sub]))]
+        x[many] = x[sub]
+    pair = np.arange(0, key.size, 2)
+    xa = np.minimum(x[pair], x[pair + 1])
+    xb = np.maximum(x[pair], x[pair + 1])
+    row, polygon = row[pair], polygon[pair]
+    ca = np.clip(np.ceil((xa - minx) / dx - 0.5), 0, ncols).astype("i8")
+    cb = np.clip(np.ceil((xb - minx) / dx - 0.5), 0, ncols).astype("i8")
+    keep = ca < cb
+    ca, cb, row, group = ca[keep], cb[keep], row[keep], groups[polygon[keep]]
+    if not ca.size:
+        return np.zeros(shape, dtype="i4")
+
+    # merge overlapping spans of the same (group, row)
+    key = group.astype("i8") * nrows + row
+    order = np.argsort(key * (ncols + 1) + ca)
+    ca, cb, key, row = ca[order], cb[order], key[order], row[order]
+    width = ncols + 1
+    end = np.maximum.accumulate(cb + key * width)
+    begin = np.r_[True, (ca + key * width)[1:] > end[:-1]]
+    runs = np.flatnonzero(begin)
+    ca = ca[runs]
+    cb = np.maximum.reduceat(cb + key * width, runs) - key[runs] * width
+    row = row[runs]
+
+    size = nrows * width
+    diff = np.bincount(row * width + ca, minlength=size)
+    diff -= np.bincount(row * width + cb, minlength=size)
+    counts = np.cumsum(diff.reshape(nrows, width), axis=1)[:, :ncols]
+
+    return counts.astype("i4")
+
+
+def _rasterize_layers(jobs, groups, bounds, shape):
+    """Rasterize (layer, edges, owner) jobs of a batch of orbits (in a worker)."""
+    return {
+        layer: rasterize_spans(edges, owner, groups, bounds, shape)
+        for layer, edges, owner in jobs
+    }
+
+
+def density_raster(
+    gf,
+    bounds=None,
+    shape=(1000, 1000),
+    start=None,
+    stop=None,
+    by="relativeOrbit",
+    workers=None,
+):
+    """Count acquisitions covering each pixel of a grid.
+
+    Parameters
+    ----------
+    gf : GeoDataFrame
+        a pandas geodataframe from load_asf_json or load_inventory
+    bounds : tuple
+        grid bounds (minx, miny, maxx, maxy) (default: bounds of the
+        footprints in the time window, required if there are none)
+    shape : tuple
+        grid shape (rows, columns)
+    start : str
+        first date of the time window (e.g. '2018-01-01')
+    stop : str
+        last date of the time window
+    by : str
+        'relativeOrbit' or 'flightDirection' for one layer per value, or None
+        for a single layer of all acquisitions
+    workers : int
+        number of processes (default: number of CPUs)
+
+    Returns
+    -------
+    counts :  ndarray
+        int32 number of acquisition dates with shape (layers, rows, columns)
+    labels :  list
+        value of `by` for each layer (no layers for an empty time window,
+        except the single 'all' layer of by=None)
+    bounds :  tuple
+        grid bounds (minx, miny, maxx, maxy)
+
+    """
+    keep = pd.Series(True, index=gf.index)
+    if start is not None:
+        keep &= gf.sceneDateString >= start
+    if stop is not None:
+        keep &= gf.sceneDateString <= stop
+    gf = gf[keep.values]
+    if len(gf) == 0:
+        if bounds is None:
+            raise ValueError(f"No acquisitions between {start} and {stop}")
+        labels = ["all"] if by is None else []
+        counts = np.zeros((len(labels),) + tuple(shape), dtype="i4")
+        return counts, labels, tuple(bounds)
+    edges, owner = _edges(list(gf.geometry.values))
+    if bounds is None:
+        bounds = (
+            edges[:, [0, 2]].min(),
+            edges[:, [1, 3]].min(),
+            edges[:, [0, 2]].max(),
+            edges[:, [1, 3]].max(),
+        )
+
+    codes, keys = pd.factorize(gf.relativeOrbit, sort=True)
+    n = len(keys)
+    if by is None:
+        labels = ["all"]
+        layer = np.zeros(n, dtype="i8")
+    elif by == "relativeOrbit":
+        labels = list(keys)
+        layer = np.arange(n)
+    else:
+        column = gf[by].groupby(codes).first()
+        labels = sorted(column.unique())
+        layer = np.searchsorted(labels, column.values)
+
+    # footprints of the same orbit and date count once where they overlap
+    dates = pd.factorize(gf.sceneDateString)[0]
+    groups = pd.factorize(codes.astype("i8") * (dates.max() + 1) + dates)[0]
+    edge_orbit = codes[owner]
+
+    nbatches = min(n, workers or os.cpu_count() or 1)
+    jobs = []
+    for batch in range(nbatches):
+        orbits = np.arange(batch, n, nbatches)
+        jobs.append([])
+        for value in np.unique(layer[orbits]):
+            mask = np.isin(edge_orbit, orbits[layer[orbits] == value])
+            jobs[-1].append((value, edges[mask], owner[mask]))
+
+    print(f"Rasterizing {len(gf)} footprints from {n} orbits")
+    counts = np.zeros((len(labels),) + tuple(shape), dtype="i4")
+    with ProcessPoolExecutor(workers) as pool:
+        results = pool.map(
+            _rasterize_layers,
+            jobs,
+            [groups] * nbatches,
+            [bounds] * nbatches,
+            [shape] * nbatches,
+        )
+        for result in results:
+            for value, layer_counts in result.items():
+                counts[value] += layer_counts
+
+    return counts, labels, bounds
+
+
+def write_raster(counts, labels, bounds, outname="density.vrt"):
+    """Save count raster as int32 binary with a GDAL VRT header.
+
+    Parameters
+    ----------
+    counts : ndarray
+        counts with shape (layers, rows, columns) from density_raster()
+    labels : list
+        band descriptions
+    bounds : tuple
+        grid bounds (minx, miny, maxx, maxy)
+    outname : str
+        name of the VRT file, data are written to the same name with .bin
+
+    """
+    nbands, nrows, ncols = counts.shape
+    minx, miny, maxx, maxy = bounds
+    dx = (maxx - minx) / ncols
+    dy = (maxy - miny) / nrows
+    binfile = os.path.splitext(outname)[0] + ".bin"
+    np.ascontiguousarray(counts, dtype="<i4").tofile(binfile)
+
+    bands = []
+    for i, label in enumerate(labels):
+        bands.append(
+            f"""  <VRTRasterBand dataType="Int32" band="{i + 1}" subClass="VRTRawRasterBand">
+    <Description>{label}</Description>
+    <SourceFilename relativeToVRT="1">{os.path.basename(binfile)}</SourceFilename>
+    <ImageOffset>{i * nrows * ncols * 4}</ImageOffset>
+    <PixelOffset>4</PixelOffset>
+    <LineOffset>{ncols * 4}</LineOffset>
+    <ByteOrder>LSB</ByteOrder>
+  </VRTRasterBand>"""
+        )
+    newline = "\n"
+    vrt = f"""<VRTDataset rasterXSize="{ncols}" rasterYSize="{nrows}">
+  <SRS>EPSG:4326</SRS>
+  <GeoTransform>{minx}, {dx}, 0.0, {maxy}, 0.0, {-dy}</GeoTransform>
+{newline.join(bands)}
+</VRTDataset>
+"""
+    with open(outname, "w") as f:
+        f.write(vrt)
+    print(f"Saved {outname}")
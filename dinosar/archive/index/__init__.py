@@ -0,0 +1,368 @@
+"""Persistent spatial index over inventory footprints.
+
+Frame footprints are packed into a two-level Sort-Tile-Recursive (STR) tree of
+bounding boxes stored as plain numpy arrays: leaf nodes of footprints and parent
+nodes of leaves. Candidate frames for a point, bounding box or polygon are found
+by pruning parent nodes, then leaf nodes, then footprints with vectorized
+comparisons, and only those candidates are tested against the exact footprint
+geometry.
+
+Notes
+-----
+The index is saved next to an inventory file (e.g. query.sidx.npz for
+query.geojson) together with a hash of the inventory granule names, so
+reloading an unchanged inventory reuses the saved index::
+
+    gf = asf.load_inventory("query.geojson")
+    index = FootprintIndex.for_inventory(gf, index_path("query.geojson"))
+    rows = index.query_point(-77.8, 0.8)
+    gf.iloc[rows]
+
+"""
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+import shapely
+import shapely.wkb
+from shapely.geometry import Point, box
+from shapely.geometry.base import BaseGeometry
+
+PREDICATES = (None, "intersects", "contains", "within")
+MAX_RING = 32
+
+
+def index_path(inventory):
+    """Path of the spatial index saved alongside an inventory file."""
+    return os.path.splitext(inventory)[0] + ".sidx.npz"
+
+
+def footprint_key(gf):
+    """Hash of inventory granule names and their order."""
+    hashes = pd.util.hash_pandas_object(gf.granuleName, index=False).values
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
+
+
+def _overlaps(a, b):
+    """Elementwise intersection of (..., 4) [minx, miny, maxx, maxy] bounds."""
+    return (
+        (a[..., 0] <= b[..., 2])
+        & (a[..., 2] >= b[..., 0])
+        & (a[..., 1] <= b[..., 3])
+        & (a[..., 3] >= b[..., 1])
+    )
+
+
+def _group_bounds(bounds, size):
+    """Bounds of each group of `size` consecutive [minx, miny, maxx, maxy] boxes."""
+    n = bounds.shape[0]
+    groups = -(-n // size)
+    padded = np.full((groups * size, 4), np.nan)
+    padded[:n] = bounds
+    padded = padded.reshape(groups, size, 4)
+    return np.concatenate(
+        [np.nanmin(padded[..., :2], axis=1), np.nanmax(padded[..., 2:], axis=1)],
+        axis=1,
+    )
+
+
+def _children(queries, nodes, size, count):
+    """Expand (query, node) pairs to (query, child) pairs of full nodes."""
+    children = (nodes[:, None] * size + np.arange(size)).ravel()
+    queries = np.repeat(queries, size)
+    valid = children < count
+    return queries[valid], children[valid]
+
+
+def _ring_array(geoms):
+    """Exterior rings of simple polygons padded to (N, MAX_RING, 2).
+
+    Footprints that are not polygons without holes, or have more than
+    MAX_RING vertices, are left as NaN and tested with shapely instead.
+    """
+    rings = np.full((len(geoms), MAX_RING, 2), np.nan)
+    for i, geom in enumerate(geoms):
+        if geom.geom_type != "Polygon" or len(geom.interiors):
+            continue
+        ring = np.asarray(geom.exterior.coords)[:, :2]
+        if len(ring) <= MAX_RING:
+            rings[i, : len(ring)] = ring
+            rings[i, len(ring) :] = ring[-1]
+    return rings
+
+
+def _points_in_rings(rings, xy):
+    """Crossing number test of points against aligned polygon rings."""
+    x0, y0 = rings[:, :-1, 0], rings[:, :-1, 1]
+    x1, y1 = rings[:, 1:, 0], rings[:, 1:, 1]
+    px, py = xy[:, :1], xy[:, 1:]
+    crosses = (y0 > py) != (y1 > py)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xcross = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+    return np.count_nonzero(crosses & (px < xcross), axis=1) % 2 == 1
+
+
+def _predicate(geoms, queries, predicate):
+    """Evaluate a binary predicate for aligned arrays of geometries."""
+    if hasattr(shapely, predicate):  # shapely >= 2.0
+        return getattr(shapely, predicate)(geoms, queries)
+    return np.array(
+        [getattr(g, predicate)(q) for g, q in zip(geoms, queries)], dtype=bool
+    )
+
+
+class FootprintIndex:
+    """Packed STR tree over footprint bounding boxes.
+
+    Parameters
+    ----------
+    bounds : ndarray
+        [minx, miny, maxx, maxy] of each footprint with shape (N, 4)
+    order : ndarray
+        footprint positions in tree order
+    node_bounds : ndarray
+        bounds of each leaf node of `node_size` consecutive footprints in
+        tree order with shape (nodes, 4)
+    rings : ndarray
+        exterior ring coordinates of simple footprints for fast point tests,
+        with shape (N, MAX_RING, 2)
+    wkb : ndarray
+        concatenated WKB of all footprints (uint8)
+    offsets : ndarray
+        start of each footprint in `wkb`, with a final end offset
+    key : str
+        hash of the inventory used to build the index (see footprint_key)
+    node_size : int
+        number of footprints per leaf node, and of leaf nodes per parent node
+
+    Notes
+    -----
+    Parent node bounds are not saved, they are recomputed from `node_bounds`.
+
+    """
+
+    def __init__(self, bounds, order, node_bounds, rings, wkb, offsets, key, node_size):
+        self.bounds = np.asarray(bounds, dtype="f8").reshape(-1, 4)
+        self.order = np.asarray(order, dtype="i8")
+        self.node_bounds = np.asarray(node_bounds, dtype="f8").reshape(-1, 4)
+        self.rings = np.asarray(rings, dtype="f8").reshape(-1, MAX_RING, 2)
+        self.wkb = np.asarray(wkb, dtype="u1")
+        self.offsets = np.asarray(offsets, dtype="i8")
+        self.key = str(key)
+        self.node_size = int(node_size)
+        self.parent_bounds = _group_bounds(self.node_bounds, self.node_size)
+        self._geometries = [None] * len(self)
+
+    def __len__(self):
+        return self.bounds.shape[0]
+
+    @classmethod
+    def from_geometries(cls, geoms, key="", node_size=16):
+        """Build index from a sequence of shapely geometries.
+
+        Parameters
+        ----------
+        geoms : array-like
+            shapely geometries (e.g. gf.geometry.values)
+        key : str
+            identifier saved with the index
+        node_size : int
+            number of footprints per leaf node
+
+        Returns
+        -------
+        index :  FootprintIndex
+
+        """
+        geoms = list(geoms)
+        bounds = np.array([g.bounds for g in geoms], dtype="f8").reshape(-1, 4)
+        n = len(geoms)
+        nnodes = -(-n // node_size)
+        nslices = max(int(np.ceil(np.sqrt(nnodes))), 1)
+        centers = (bounds[:, :2] + bounds[:, 2:]) / 2
+        xrank = np.empty(n, dtype="i8")
+        xrank[np.argsort(centers[:, 0], kind="stable")] = np.arange(n)
+        slices = xrank // (nslices * node_size)
+        order = np.lexsort((centers[:, 1], slices))
+
+        node_bounds = _group_bounds(bounds[order], node_size)
+
+        wkbs = [g.wkb for g in geoms]
+        offsets = np.concatenate([[0], np.cumsum([len(w) for w in wkbs])])
+        wkb = np.frombuffer(b"".join(wkbs), dtype="u1")
+
+        rings = _ring_array(geoms)
+        index = cls(bounds, order, node_bounds, rings, wkb, offsets, key, node_size)
+        index._geometries = geoms
+        return index
+
+    @classmethod
+    def for_inventory(cls, gf, path=None, node_size=16):
+        """Load the saved index for an inventory, or build and save it.
+
+        The saved index is only reused if it was built from the same
+        inventory (same granules in the same order).
+
+        Parameters
+        ----------
+        gf : GeoDataFrame
+            a pandas geodataframe from load_asf_json or load_inventory
+        path : str
+            index file (e.g. index_path('query.geojson')), None to not persist
+        node_size : int
+            number of footprints per leaf node for a new index
+
+        Returns
+        -------
+        index :  FootprintIndex
+
+        """
+        key = footprint_key(gf)
+        if path and os.path.exists(path):
+            index = cls.load(path)
+            if index.key == key:
+                index._geometries = list(gf.geometry.values)
+                return index
+        index = cls.from_geometries(gf.geometry.values, key, node_size)
+        if path:
+            index.save(path)
+        return index
+
+    @classmethod
+    def load(cls, path):
+        """Load index saved with FootprintIndex.save()."""
+        with np.load(path, allow_pickle=False) as npz:
+            return cls(
+                npz["bounds"],
+                npz["order"],
+                npz["node_bounds"],
+                npz["rings"],
+                npz["wkb"],
+                npz["offsets"],
+                npz["key"].item(),
+                npz["node_size"].item(),
+            )
+
+    def save(self, path):
+        """Save index to an .npz file."""
+        np.savez(
+            path,
+            bounds=self.bounds,
+            order=self.order,
+            node_bounds=self.node_bounds,
+            rings=self.rings,
+            wkb=self.wkb,
+            offsets=self.offsets,
+            key=np.array(self.key),
+            node_size=np.array(self.node_size),
+        )
+
+    def geometry(self, position):
+        """Footprint geometry at a row position (decoded on first use)."""
+        geom = self._geometries[position]
+        if geom is None:
+            start, stop = self.offsets[position], self.offsets[position + 1]
+            geom = shapely.wkb.loads(self.wkb[start:stop].tobytes())
+            self._geometries[position] = geom
+        return geom
+
+    def _candidates(self, qbounds, chunk=4_000_000):
+        """Query and row positions of footprints with intersecting bounds."""
+        qbounds = np.asarray(qbounds, dtype="f8").reshape(-1, 4)
+        nnodes = self.node_bounds.shape[0]
+        step = max(1, chunk // max(self.parent_bounds.shape[0], 1))
+        queries, positions = [], []
+        for first in range(0, qbounds.shape[0], step):
+            qb = qbounds[first : first + step]
+            q, parent = np.nonzero(_overlaps(qb[:, None], self.parent_bounds[None]))
+            q, node = _children(q, parent, self.node_size, nnodes)
+            hit = _overlaps(self.node_bounds[node], qb[q])
+            q, slot = _children(q[hit], node[hit], self.node_size, self.order.size)
+            pos = self.order[slot]
+            hit = _overlaps(self.bounds[pos], qb[q])
+            queries.append(q[hit] + first)
+            positions.append(pos[hit])
+        if not queries:
+            return np.empty(0, dtype="i8"), np.empty(0, dtype="i8")
+        return np.concatenate(queries), np.concatenate(positions)
+
+    def _query(self, geoms, predicate):
+        """Unsorted query and row positions of matching footprints."""
+        if predicate not in PREDICATES:
+            raise ValueError(f"predicate must be one of {PREDICATES}")
+        if isinstance(geoms, BaseGeometry):
+            geoms = [geoms]
+        if not isinstance(geoms, np.ndarray) or geoms.dtype.kind not in "fiu":
+            geoms = list(geoms)
+            if geoms and all(g.geom_type == "Point" for g in geoms):
+                geoms = np.array([g.coords[0][:2] for g in geoms])
+        if isinstance(geoms, np.ndarray) and geoms.dtype.kind in "fiu":
+            coords = geoms.reshape(-1, 2).astype("f8")
+            qbounds = np.hstack([coords, coords])
+            geoms = None
+        else:
+            qbounds = np.array([g.bounds for g in geoms], dtype="f8")
+        queries, positions = self._candidates(qbounds)
+        if predicate is None or not queries.size:
+            return queries, positions
+
+        keep = np.zeros(queries.size, dtype=bool)
+        pending = np.ones(queries.size, dtype=bool)
+        if geoms is None and predicate in ("intersects", "contains"):
+            rings = self.rings[positions]
+            pending = np.isnan(rings[:, 0, 0])
+            keep[~pending] = _points_in_rings(
+                rings[~pending], coords[queries[~pending]]
+            )
+        if pending.any():
+            if geoms is None:
+                qgeoms = [Point(*coords[q]) for q in queries[pending]]
+            else:
+                qgeoms = [geoms[q] for q in queries[pending]]
+            fgeoms = [self.geometry(p) for p in positions[pending]]
+            keep[pending] = _predicate(fgeoms, qgeoms, predicate)
+        return queries[keep], positions[keep]
+
+    def query_bulk(self, geoms, predicate="intersects"):
+        """Find footprints matching many query geometries at once.
+
+        Points are tested against footprint outlines with vectorized numpy,
+        other geometries with shapely. Points exactly on a footprint edge may
+        or may not match.
+
+        Parameters
+        ----------
+        geoms : array-like
+            shapely geometries (points, boxes or polygons), or an (N, 2) array
+            of x, y point coordinates
+        predicate : str
+            'intersects', 'contains' (footprint contains query geometry),
+            'within' (footprint within query geometry), or None to only
+            compare bounding boxes
+
+        Returns
+        -------
+        pairs :  DataFrame
+            positional indices into geoms ('query') and inventory rows
+            ('geom') for every match, sorted by query
+
+        """
+        queries, positions = self._query(geoms, predicate)
+        order = np.lexsort((positions, queries))
+        return pd.DataFrame(dict(query=queries[order], geom=positions[order]))
+
+    def query(self, geom, predicate="intersects"):
+        """Row positions of footprints matching a single query geometry."""
+        return np.sort(self._query([geom], predicate)[1])
+
+    def query_point(self, x, y):
+        """Row positions of footprints containing a point."""
+        return np.sort(self._query(np.array([[x, y]], dtype="f8"), "intersects")[1])
+
+    def query_bbox(self, minx, miny, maxx, maxy, predicate=None):
+        """Row positions of footprints intersecting a bounding box.
+
+        By default only footprint bounding boxes are compared, use
+        predicate='intersects' to test the exact footprints.
+        """
+        return np.sort(self._query([box(minx, miny, maxx, maxy)], predicate)[1])
@@ -0,0 +1,328 @@
+"""Inventories partitioned by relative orbit and year.
+
+Archive-wide inventories with millions of scenes don't fit comfortably in a
+single GeoDataFrame. A partitioned inventory stores one inventory file per
+(relativeOrbit, year) under a root directory, plus a small manifest with the
+number of scenes, date range and bounds of each partition::
+
+    root/partitions.json
+    root/relativeOrbit=018/year=2017/inventory.geojson
+    root/relativeOrbit=018/year=2018/inventory.geojson
+
+Queries read the manifest to find the partitions they touch and only load
+those. Summaries are computed per partition in parallel processes and then
+combined.
+
+Notes
+-----
+Write and query partitions with::
+
+    write_partitions(gf, "archive")
+    inventory = PartitionedInventory("archive")
+    orbits, dates = inventory.acquisition_statistics(orbits=[18, 91])
+    pairs = inventory.select_pairs(neighbors=3, max_days=48)
+
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import geopandas as gpd
+import pandas as pd
+from shapely.geometry import box
+from dinosar.archive import asf
+
+MANIFEST = "partitions.json"
+EXTENSIONS = {"GeoJSON": "geojson", "GPKG": "gpkg", "ESRI Shapefile": "shp"}
+
+
+def partition_path(root, orbit, year, format="GeoJSON"):
+    """Path of the inventory file for one (relativeOrbit, year) partition."""
+    name = f"inventory.{EXTENSIONS.get(format, format.lower())}"
+    return os.path.join(root, f"relativeOrbit={int(orbit):03d}", f"year={year}", name)
+
+
+def _partition_summary(gf):
+    """Manifest entry for a partition inventory."""
+    minx, miny, maxx, maxy = gf.total_bounds
+    return dict(
+        count=len(gf),
+        start=gf.sceneDateString.min(),
+        stop=gf.sceneDateString.max(),
+        direction=gf.flightDirection.iloc[0],
+        minx=minx,
+        miny=miny,
+        maxx=maxx,
+        maxy=maxy,
+    )
+
+
+def _write_partition(path, gf, format, append):
+    """Save a single partition, merged with existing scenes if appending."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if append and os.path.exists(path):
+        gf = pd.concat([asf.load_inventory(path, dedupe=False), gf])
+        gf = gf.drop_duplicates("granuleName", ignore_index=True)
+        gf, dropped = asf.resolve_duplicates(gf)
+    summary = _partition_summary(gf)
+    asf.save_inventory(gf.drop(columns="orbitCode", errors="ignore"), path, format)
+    return summary
+
+
+def _load_partition(path, start=None, stop=None, bbox=None):
+    """Load a partition keeping scenes within an optional date range and bbox."""
+    gf = asf.load_inventory(path)
+    keep = pd.Series(True, index=gf.index)
+    if start is not None:
+        keep &= gf.sceneDateString >= start
+    if stop is not None:
+        keep &= gf.sceneDateString <= stop
+    if bbox is not None:
+        keep &= gf.intersects(box(*bbox))
+    return gf[keep]
+
+
+def _partition_dates(path, start=None, stop=None, bbox=None):
+    """Per-date acquisition table for a single partition."""
+    gf = _load_partition(path, start, stop, bbox)
+    if len(gf) == 0:
+        return None
+    return asf.acquisition_statistics(gf)[1]
+
+
+def _apply(func, path, start, stop, bbox):
+    """Load a partition and apply a function to it (in a worker process)."""
+    return func(_load_partition(path, start, stop, bbox))
+
+
+def write_partitions(gf, root, format="GeoJSON", append=False, workers=None):
+    """Save an inventory as partitions by relative orbit and year.
+
+    Partitions are written in parallel processes. Partitions not present in
+    `gf` are left untouched, so an archive can be built up one query at a
+    time.
+
+    Parameters
+    ----------
+    gf : GeoDataFrame
+        a pandas geodataframe from load_asf_json or load_inventory
+    root : str
+        root directory of the partitioned inventory
+    format : str
+        OGR-recognized format of the partition files
+    append : bool
+        merge with scenes already saved in a partition instead of replacing it
+    workers : int
+        number of processes (default: number of CPUs)
+
+    Returns
+    -------
+    inventory :  PartitionedInventory
+
+    """
+    years = gf.timeStamp.dt.year
+    groups = gf.groupby([gf.relativeOrbit.astype("int"), years], observed=True)
+    keys = list(groups.groups)
+    paths = [partition_path(root, orbit, year, format) for orbit, year in keys]
+    frames = [groups.get_group(key) for key in keys]
+    print(f"Writing {len(keys)} partitions to {root}")
+    with ProcessPoolExecutor(workers) as pool:
+        summaries = list(
+            pool.map(
+                _write_partition,
+                paths,
+                frames,
+                [format] * len(keys),
+                [append] * len(keys),
+            )
+        )
+
+    new = pd.DataFrame(summaries)
+    new.insert(0, "relativeOrbit", [orbit for orbit, year in keys])
+    new.insert(1, "year", [year for orbit, year in keys])
+    new.insert(2, "path", [os.path.relpath(path, root) for path in paths])
+    new.set_index(["relativeOrbit", "year"], inplace=True)
+    if os.path.exists(os.path.join(root, MANIFEST)):
+        manifest = PartitionedInventory(root).manifest
+        new = pd.concat([manifest.drop(new.index, errors="ignore"), new])
+    new.sort_index(inplace=True)
+    with open(os.path.join(root, MANIFEST), "w") as f:
+        json.dump(new.reset_index().to_dict(orient="records"), f, indent=1)
+
+    return PartitionedInventory(root)
+
+
+class PartitionedInventory:
+    """Lazily loaded inventory partitioned by relative orbit and year.
+
+    Parameters
+    ----------
+    root : str
+        root directory written by write_partitions()
+
+    """
+
+    def __init__(self, root):
+        self.root = root
+        with open(os.path.join(root, MANIFEST)) as f:
+            manifest = pd.DataFrame(json.load(f))
+        self.manifest = manifest.set_index(["relativeOrbit", "year"]).sort_index()
+
+    def __len__(self):
+        return int(self.manifest["count"].sum())
+
+    def select(self, orbits=None, start=None, stop=None, bbox=None):
+        """Manifest entries of partitions touched by a query.
+
+        Parameters
+        ----------
+        orbits : list
+            relative orbit numbers
+        start : str
+            first date (e.g. '2018-01-01')
+        stop : str
+            last date (e.g. '2018-12-31')
+        bbox : list
+            [minx, miny, maxx, maxy] bounds
+
+        Returns
+        -------
+        manifest :  DataFrame
+            manifest rows of matching partitions
+
+        """
+        m = self.manifest
+        keep = pd.Series(True, index=m.index)
+        if orbits is not None:
+            orbits = [int(orbit) for orbit in orbits]
+            keep &= m.index.get_level_values(0).isin(orbits)
+        if start is not None:
+            keep &= m.stop >= start
+        if stop is not None:
+            keep &= m.start <= stop
+        if bbox is not None:
+            minx, miny, maxx, maxy = bbox
+            keep &= (m.minx <= maxx) & (m.maxx >= minx)
+            keep &= (m.miny <= maxy) & (m.maxy >= miny)
+        return m[keep.values]
+
+    def _paths(self, orbits=None, start=None, stop=None, bbox=None):
+        """Absolute paths of the partitions touched by a query."""
+        selected = self.select(orbits, start, stop, bbox)
+        return [os.path.join(self.root, path) for path in selected.path]
+
+    def map_partitions(
+        self, func, orbits=None, start=None, stop=None, bbox=None, workers=None
+    ):
+        """Apply a function to each partition touched by a query in parallel.
+
+        Parameters
+        ----------
+        func : callable
+            picklable function (e.g. defined at module level) taking a
+            partition GeoDataFrame
+        orbits, start, stop, bbox :
+            query (see select())
+        workers : int
+            number of processes (default: number of CPUs)
+
+        Returns
+        -------
+        results :  list
+            function results in partition order
+
+        """
+        paths = self._paths(orbits, start, stop, bbox)
+        n = len(paths)
+        with ProcessPoolExecutor(workers) as pool:
+            return list(
+                pool.map(_apply, [func] * n, paths, [start] * n, [stop] * n, [bbox] * n)
+            )
+
+    def load(self, orbits=None, start=None, stop=None, bbox=None, workers=None):
+        """Load scenes matching a query into a single GeoDataFrame.
+
+        Parameters
+        ----------
+        orbits, start, stop, bbox :
+            query (see select())
+        workers : int
+            number of processes (default: number of CPUs)
+
+        Returns
+        -------
+        gf :  GeoDataFrame
+            A geopandas GeoDataFrame
+
+        """
+        paths = self._paths(orbits, start, stop, bbox)
+        if len(paths) == 1:
+            frames = [_load_partition(paths[0], start, stop, bbox)]
+        else:
+            n = len(paths)
+            with ProcessPoolExecutor(workers) as pool:
+                frames = list(
+                    pool.map(
+                        _load_partition, paths, [start] * n, [stop] * n, [bbox] * n
+                    )
+                )
+        if not frames:
+            return gpd.GeoDataFrame()
+        gf = pd.concat(frames, ignore_index=True)
+        gf.sort_values("relativeOrbit", inplace=True, kind="stable")
+        gf["orbitCode"] = gf.relativeOrbit.astype("category").cat.codes
+        return gf
+
+    def acquisition_statistics(
+        self, orbits=None, start=None, stop=None, bbox=None, workers=None
+    ):
+        """Per-orbit and per-date statistics computed partition by partition.
+
+        Returns the same tables as asf.acquisition_statistics() for the scenes
+        matching the query, without loading them all at once. Raises a
+        ValueError if no scenes match.
+        """
+        paths = self._paths(orbits, start, stop, bbox)
+        n = len(paths)
+        with ProcessPoolExecutor(workers) as pool:
+            tables = list(
+                pool.map(_partition_dates, paths, [start] * n, [stop] * n, [bbox] * n)
+            )
+        tables = [table for table in tables if table is not None]
+        if not tables:
+            raise ValueError(
+                f"No scenes match orbits={orbits}, start={start}, stop={stop}, "
+                f"bbox={bbox}"
+            )
+        return asf.orbit_statistics(pd.concat(tables).drop(columns="dt"))
+
+    def summarize_inventory(
+        self, outname="inventory_summary.csv", workers=None, **query
+    ):
+        """Save and print per-orbit summary (see asf.summarize_inventory())."""
+        stats = self.acquisition_statistics(workers=workers, **query)
+        return asf.summarize_inventory(None, stats, outname)
+
+    def summarize_orbits(self, outdir=".", workers=None, **query):
+        """Save per-orbit acquisition tables (see asf.summarize_orbits())."""
+        stats = self.acquisition_statistics(workers=workers, **query)
+        return asf.summarize_orbits(None, stats, outdir)
+
+    def select_pairs(self, neighbors=1, max_days=None, workers=None, **query):
+        """Select interferometric pairs (see asf.select_pairs())."""
+        dates = self.acquisition_statistics(workers=workers, **query)[1]
+        return asf.select_pairs(dates, neighbors, max_days)
+
+    def get_slc_urls(self, dateStr, relativeOrbit):
+        """Get frame downloadUrls, loading only the matching partition."""
+        date = pd.Timestamp(dateStr).strftime("%Y-%m-%d")
+        paths = self._paths([relativeOrbit], date, date)
+        if not paths:
+            return []
+        gf = _load_partition(paths[0], date, date)
+        return asf.get_slc_urls(gf, date, int(relativeOrbit))
+
+    def get_slc_names(self, dateStr, relativeOrbit):
+        """Get frame file names, loading only the matching partition."""
+        return [
+            os.path.basename(url) for url in self.get_slc_urls(dateStr, relativeOrbit)
+        ]
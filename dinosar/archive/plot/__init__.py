@@ -10,22 +10,200 @@ This file contains library functions. To run as a script use::
 """
 import geopandas as gpd
 import numpy as np
-import matplotlib.pyplot as plt
+import pandas as pd
+import hashlib
+import functools
+import json
+import os
+from shapely.geometry import mapping, shape
+from shapely.ops import unary_union
+from dinosar import get_cache_dir
+from dinosar.archive import asf
+
+# NOTE: matplotlib and cartopy (optional 'vis' dependency) take seconds to
+# import, so they are imported by the functions that use them
+
+TILE_URL = "http://tile.stamen.com/terrain/{z}/{x}/{y}.png"
+
+# In-memory footprint unions keyed by inventory content
+_FOOTPRINTS = {}
+
+
+def _fetch_tile(url, user_agent="dinosar"):
+    """Return raw tile bytes from a http(s) or file:// url, None on failure."""
+    from urllib.request import Request, urlopen
+    from urllib.error import URLError
+
+    try:
+        with urlopen(Request(url, headers={"User-Agent": user_agent})) as fh:
+            return fh.read()
+    except (URLError, OSError) as e:
+        print(f"Failed to fetch tile {url}: {e}")
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_tiles_class():
+    """Define tile source class on first use since cartopy import is deferred."""
+    import io
+    from PIL import Image
+    from cartopy.io.img_tiles import GoogleTiles
+
+    class CachedTiles(GoogleTiles):
+        """Web map tiles stored in a persistent directory after first fetch."""
+
+        def __init__(self, url=TILE_URL, cache_dir=None):
+            super().__init__(url=url)
+            key = hashlib.md5(url.encode()).hexdigest()[:12]
+            self.tile_dir = os.path.join(get_cache_dir(cache_dir), "tiles", key)
+
+        def tile_path(self, tile):
+            x, y, z = tile
+            return os.path.join(self.tile_dir, str(z), str(x), f"{y}.png")
+
+        def get_image(self, tile):
+            path = self.tile_path(tile)
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    data = f.read()
+            else:
+                data = _fetch_tile(self._image_url(tile))
+                if data is not None:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp = f"{path}.{os.getpid()}.tmp"
+                    with open(tmp, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp, path)
+            if data is None:  # blank tile, not cached so it is retried next time
+                img = Image.new(self.desired_tile_form, (256, 256), (250, 250, 250))
+            else:
+                img = Image.open(io.BytesIO(data)).convert(self.desired_tile_form)
+            return img, self.tileextent(tile), "lower"
+
+    return CachedTiles
+
+
+def get_tiler(url=TILE_URL, cache_dir=None):
+    """Get a cartopy tile source that caches tiles on local disk.
+
+    Parameters
+    ----------
+    url : str
+        tile url template with {x}, {y}, {z} (http(s):// or file:// for a local
+        tile directory)
+    cache_dir : str
+        cache root directory (see get_cache_dir())
+
+    Returns
+    -------
+    tiler :  GoogleTiles
+        cartopy image tile source
+
+    """
+    return _cached_tiles_class()(url=url, cache_dir=cache_dir)
+
+
+def inventory_key(gf):
+    """Hash of the inventory columns that determine orbit footprints."""
+    cols = gf.loc[:, ["relativeOrbit", "flightDirection", "granuleName"]]
+    hashes = pd.util.hash_pandas_object(cols, index=False).values
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
 
-# import matplotlib.patheffects as PathEffects
-from matplotlib.dates import YearLocator, MonthLocator  # DateFormatter
-from pandas.plotting import table
 
-# Make plots optional dependency (switch to geoviews)
-import cartopy.crs as ccrs
-import cartopy.feature as cfeature
-from cartopy.mpl.gridliner import LONGITUDE_FORMATTER, LATITUDE_FORMATTER
-from cartopy.io.img_tiles import GoogleTiles
-from owslib.wmts import WebMapTileService
+def orbit_footprints(gf, cache_dir=None):
+    """Union of frame footprints and flight direction for each relative orbit.
 
+    Results are memoized by inventory content, in memory and optionally on
+    disk (cache_dir/footprints), so repeated plots don't recompute unions.
 
-def plot_map(gf, snwe, vectorFile=None, zoom=8):
+    Parameters
+    ----------
+    gf :  GeoDataFrame
+        A geopandas GeoDataFrame
+    cache_dir : str
+        cache root directory for persistent results, None for memory only
+
+    Returns
+    -------
+    footprints :  dict
+        {relativeOrbit: (polygon, flightDirection)} in order of appearance
+
+    """
+    key = inventory_key(gf)
+    if key in _FOOTPRINTS:
+        return _FOOTPRINTS[key]
+
+    cachefile = None
+    if cache_dir is not None:
+        cachefile = os.path.join(cache_dir, "footprints", f"{key}.json")
+        if os.path.isfile(cachefile):
+            with open(cachefile) as f:
+                records = json.load(f)
+            footprints = {
+                orbit: (shape(geom), direction) for orbit, geom, direction in records
+            }
+            _FOOTPRINTS[key] = footprints
+            return footprints
+
+    footprints = {}
+    groups = gf.groupby("relativeOrbit", sort=False, observed=True)
+    for orbit, df in groups:
+        poly = unary_union(df.geometry.values)
+        footprints[orbit] = (poly, df.flightDirection.iloc[0])
+
+    if cachefile is not None:
+        os.makedirs(os.path.dirname(cachefile), exist_ok=True)
+        records = [
+            (getattr(orbit, "item", lambda: orbit)(), mapping(poly), direction)
+            for orbit, (poly, direction) in footprints.items()
+        ]
+        with open(cachefile, "w") as f:
+            json.dump(records, f)
+    _FOOTPRINTS[key] = footprints
+
+    return footprints
+
+
+@functools.lru_cache(maxsize=None)
+def _map_features():
+    """Load Natural Earth basemap features once per process."""
+    import cartopy.feature as cfeature
+
+    sources = [
+        (
+            cfeature.NaturalEarthFeature(
+                category="cultural",
+                name="admin_1_states_provinces_lines",
+                scale="110m",
+                facecolor="none",
+            ),
+            dict(edgecolor="k", linestyle=":"),
+        ),
+        (
+            cfeature.NaturalEarthFeature("physical", "coastline", "10m"),
+            dict(edgecolor="black", facecolor="none", linewidth=2),
+        ),
+        (cfeature.BORDERS, dict(edgecolor="black", facecolor="none")),
+    ]
+    features = []
+    for feature, kwargs in sources:
+        geometries = list(feature.geometries())
+        features.append((cfeature.ShapelyFeature(geometries, feature.crs), kwargs))
+
+    return features
+
+
+def plot_map(
+    gf,
+    snwe,
+    vectorFile=None,
+    zoom=8,
+    tile_url=TILE_URL,
+    cache_dir=None,
+    outname="map.pdf",
+):
     """Plot dinosar inventory on a static map.
+
     Parameters
     ----------
     gf :  GeoDataFrame
@@ -33,10 +211,23 @@ def plot_map(gf, snwe, vectorFile=None, zoom=8):
     snwe : list
         bounding coordinates [south, north, west, east].
     vectorFile: str
-        path to region of interest polygon
+        path to region of interest polygon (or a sequence of shapely geometries)
     zoom: int
         zoom level for WMTS
+    tile_url: str
+        basemap tile url template (http(s):// or file://)
+    cache_dir: str
+        root directory for cached tiles and footprints (see get_cache_dir())
+    outname: str
+        output figure name
+
     """
+    from matplotlib import cm
+    from matplotlib.figure import Figure
+    import cartopy.crs as ccrs
+    from cartopy.mpl.gridliner import LONGITUDE_FORMATTER, LATITUDE_FORMATTER
+
+    cache_dir = get_cache_dir(cache_dir)
     pad = 1
     S, N, W, E = snwe
     plot_CRS = ccrs.PlateCarree()
@@ -44,32 +235,26 @@ def plot_map(gf, snwe, vectorFile=None, zoom=8):
     x0, y0 = plot_CRS.transform_point(W - pad, S - pad, geodetic_CRS)
     x1, y1 = plot_CRS.transform_point(E + pad, N + pad, geodetic_CRS)
 
-    fig, ax = plt.subplots(
-        figsize=(8, 8), dpi=100, subplot_kw=dict(projection=plot_CRS)
-    )
+    fig = Figure(figsize=(8, 8), dpi=100)
+    ax = fig.subplots(subplot_kw=dict(projection=plot_CRS))
 
     ax.set_xlim((x0, x1))
     ax.set_ylim((y0, y1))
-    url = "http://tile.stamen.com/terrain/{z}/{x}/{y}.png"
-    tiler = GoogleTiles(url=url)
-    # NOTE: going higher than zoom=8 is slow...
+    tiler = get_tiler(tile_url, cache_dir)
+    # NOTE: going higher than zoom=8 is slow (on first fetch)...
     ax.add_image(tiler, zoom)
 
-    states_provinces = cfeature.NaturalEarthFeature(
-        category="cultural",
-        name="admin_1_states_provinces_lines",
-        scale="110m",
-        facecolor="none",
-    )
-    ax.add_feature(states_provinces, edgecolor="k", linestyle=":")
-    ax.coastlines(resolution="10m", color="black", linewidth=2)
-    ax.add_feature(cfeature.BORDERS)
+    for feature, kwargs in _map_features():
+        ax.add_feature(feature, **kwargs)
 
     # Add region of interest polygon in specified
-    if vectorFile:
-        tmp = gpd.read_file(vectorFile)
+    if vectorFile is not None:
+        if isinstance(vectorFile, str):
+            geometries = gpd.read_file(vectorFile).geometry.values
+        else:
+            geometries = list(vectorFile)
         ax.add_geometries(
-            tmp.geometry.values,
+            geometries,
             ccrs.PlateCarree(),
             facecolor="none",
             edgecolor="m",
@@ -77,14 +262,11 @@ def plot_map(gf, snwe, vectorFile=None, zoom=8):
             linestyle="dashed",
         )
 
-    orbits = gf.relativeOrbit.unique()
-    colors = plt.cm.jet(np.linspace(0, 1, orbits.size))
-
-    for orbit, color in zip(orbits, colors):
-        df = gf.query("relativeOrbit == @orbit")
-        poly = df.geometry.cascaded_union
+    footprints = orbit_footprints(gf, cache_dir)
+    colors = cm.jet(np.linspace(0, 1, len(footprints)))
 
-        if df.flightDirection.iloc[0] == "ASCENDING":
+    for (orbit, (poly, direction)), color in zip(footprints.items(), colors):
+        if direction == "ASCENDING":
             linestyle = "--"
             xpos, ypos = poly.centroid.x, poly.bounds[3]
         else:
@@ -122,19 +304,28 @@ def plot_map(gf, snwe, vectorFile=None, zoom=8):
     gl.xformatter = LONGITUDE_FORMATTER
     gl.yformatter = LATITUDE_FORMATTER
 
-    plt.title("Orbital Footprints")
-    plt.savefig("map.pdf", bbox_inches="tight")
+    ax.set_title("Orbital Footprints")
+    fig.savefig(outname, bbox_inches="tight")
 
 
-def plot_timeline_table(gf):
+def plot_timeline_table(gf, outname="timeline_with_table.pdf", stats=None):
     """Plot dinosar inventory acquisitions as a timeline with a table.
 
     Parameters
     ----------
     gf :  GeoDataFrame
         A geopandas GeoDataFrame
+    outname : str
+        output figure name
+    stats : tuple
+        precomputed output of asf.acquisition_statistics(gf)
 
     """
+    from matplotlib import cm
+    from matplotlib.dates import YearLocator, MonthLocator
+    from matplotlib.figure import Figure
+    from pandas.plotting import table
+
     dfA = gf.query('platform == "Sentinel-1A"')
     dfAa = dfA.query(' flightDirection == "ASCENDING" ')
     dfAd = dfA.query(' flightDirection == "DESCENDING" ')
@@ -143,22 +334,18 @@ def plot_timeline_table(gf):
     dfBd = dfB.query(' flightDirection == "DESCENDING" ')
 
     # summary table
-    dfS = gpd.pd.DataFrame(index=gf.relativeOrbit.unique())
-    dfS["Start"] = gf.groupby("relativeOrbit").sceneDateString.min()
-    dfS["Stop"] = gf.groupby("relativeOrbit").sceneDateString.max()
-    dfS["Dates"] = gf.groupby("relativeOrbit").sceneDateString.nunique()
-    dfS["Frames"] = gf.groupby("relativeOrbit").sceneDateString.count()
-    dfS["Direction"] = gf.groupby("relativeOrbit").flightDirection.first()
-    dfS["UTC"] = gf.groupby("relativeOrbit").utc.first()
-    dfS.sort_index(inplace=True, ascending=False)
-    dfS.index.name = "Orbit"
+    if stats is None:
+        stats = asf.acquisition_statistics(gf)
+    columns = ["Start", "Stop", "Dates", "Frames", "Direction", "UTC"]
+    dfS = stats[0].loc[:, columns]
 
     # Same colors as map
     orbits = gf.relativeOrbit.unique()
-    colors = plt.cm.jet(np.linspace(0, 1, orbits.size))
+    colors = cm.jet(np.linspace(0, 1, orbits.size))
 
-    fig, ax = plt.subplots(figsize=(11, 8.5))
-    plt.scatter(
+    fig = Figure(figsize=(11, 8.5))
+    ax = fig.subplots()
+    ax.scatter(
         dfAa.timeStamp.values,
         dfAa.orbitCode.values,
         c=colors[dfAa.orbitCode.values],
@@ -167,7 +354,7 @@ def plot_timeline_table(gf):
         facecolor="none",
         label="S1A",
     )
-    plt.scatter(
+    ax.scatter(
         dfBa.timeStamp.values,
         dfBa.orbitCode.values,
         c=colors[dfBa.orbitCode.values],
@@ -177,7 +364,7 @@ def plot_timeline_table(gf):
         marker="d",
         label="S1B",
     )
-    plt.scatter(
+    ax.scatter(
         dfAd.timeStamp.values,
         dfAd.orbitCode.values,
         c=colors[dfAd.orbitCode.values],
@@ -185,7 +372,7 @@ def plot_timeline_table(gf):
         s=60,
         label="S1A",
     )
-    plt.scatter(
+    ax.scatter(
         dfBd.timeStamp.values,
         dfBd.orbitCode.values,
         c=colors[dfBd.orbitCode.values],
@@ -195,7 +382,8 @@ def plot_timeline_table(gf):
         label="S1B",
     )
 
-    plt.yticks(gf.orbitCode.unique(), gf.relativeOrbit.unique())
+    ax.set_yticks(gf.orbitCode.unique())
+    ax.set_yticklabels(gf.relativeOrbit.unique())
 
     table(
         ax,
@@ -210,23 +398,29 @@ def plot_timeline_table(gf):
 
     ax.xaxis.set_minor_locator(MonthLocator())
     ax.xaxis.set_major_locator(YearLocator())
-    plt.legend(loc="upper right")
-    plt.ylim(-1, orbits.size + 3)
-    plt.ylabel("Orbit Number")
+    ax.legend(loc="upper right")
+    ax.set_ylim(-1, orbits.size + 3)
+    ax.set_ylabel("Orbit Number")
     fig.autofmt_xdate()
-    plt.title("Acquisition Timeline")
-    plt.savefig("timeline_with_table.pdf", bbox_inches="tight")
+    ax.set_title("Acquisition Timeline")
+    fig.savefig(outname, bbox_inches="tight")
 
 
-def plot_timeline_sentinel(gf):
+def plot_timeline_sentinel(gf, outname="timeline.pdf"):
     """Plot dinosar inventory acquisitions as a timeline.
 
     Parameters
     ----------
     gf :  GeoDataFrame
         A geopandas GeoDataFrame
+    outname : str
+        output figure name
 
     """
+    from matplotlib import cm
+    from matplotlib.dates import YearLocator, MonthLocator
+    from matplotlib.figure import Figure
+
     dfA = gf.query('platform == "Sentinel-1A"')
     dfAa = dfA.query(' flightDirection == "ASCENDING" ')
     dfAd = dfA.query(' flightDirection == "DESCENDING" ')
@@ -236,10 +430,11 @@ def plot_timeline_sentinel(gf):
 
     # Same colors as map
     orbits = gf.relativeOrbit.unique()
-    colors = plt.cm.jet(np.linspace(0, 1, orbits.size))
+    colors = cm.jet(np.linspace(0, 1, orbits.size))
 
-    fig, ax = plt.subplots(figsize=(11, 8.5))
-    plt.scatter(
+    fig = Figure(figsize=(11, 8.5))
+    ax = fig.subplots()
+    ax.scatter(
         dfAa.timeStamp.values,
         dfAa.orbitCode.values,
         edgecolors=colors[dfAa.orbitCode.values],
@@ -248,7 +443,7 @@ def plot_timeline_sentinel(gf):
         s=60,
         label="Asc S1A",
     )
-    plt.scatter(
+    ax.scatter(
         dfBa.timeStamp.values,
         dfBa.orbitCode.values,
         edgecolors=colors[dfBa.orbitCode.values],
@@ -258,7 +453,7 @@ def plot_timeline_sentinel(gf):
         marker="d",
         label="Asc S1B",
     )
-    plt.scatter(
+    ax.scatter(
         dfAd.timeStamp.values,
         dfAd.orbitCode.values,
         c=colors[dfAd.orbitCode.values],
@@ -266,7 +461,7 @@ def plot_timeline_sentinel(gf):
         s=60,
         label="Dsc S1A",
     )
-    plt.scatter(
+    ax.scatter(
         dfBd.timeStamp.values,
         dfBd.orbitCode.values,
         c=colors[dfBd.orbitCode.values],
@@ -276,36 +471,48 @@ def plot_timeline_sentinel(gf):
         label="Dsc S1B",
     )
 
-    plt.yticks(gf.orbitCode.unique(), gf.relativeOrbit.unique())
+    ax.set_yticks(gf.orbitCode.unique())
+    ax.set_yticklabels(gf.relativeOrbit.unique())
 
     ax.xaxis.set_minor_locator(MonthLocator())
     ax.xaxis.set_major_locator(YearLocator())
-    plt.legend(loc="lower right")
-    plt.ylim(-1, orbits.size)
-    plt.ylabel("Orbit Number")
+    ax.legend(loc="lower right")
+    ax.set_ylim(-1, orbits.size)
+    ax.set_ylabel("Orbit Number")
     fig.autofmt_xdate()
-    plt.title("Acquisition Timeline")
-    plt.savefig("timeline.pdf", bbox_inches="tight")
+    ax.set_title("Acquisition Timeline")
+    fig.savefig(outname, bbox_inches="tight")
 
 
-def plot_timeline(gf, platform1, platform2):
+def plot_timeline(gf, platform1, platform2, outname="timeline.pdf"):
     """Plot dinosar inventory acquisitions as a timeline.
 
     Parameters
     ----------
     gf :  GeoDataFrame
         A geopandas GeoDataFrame
+    platform1 : str
+        first platform name (e.g. 'Sentinel-1A')
+    platform2 : str
+        second platform name (e.g. 'Sentinel-1B')
+    outname : str
+        output figure name
 
     """
+    from matplotlib import cm
+    from matplotlib.dates import YearLocator, MonthLocator
+    from matplotlib.figure import Figure
+
     dfA = gf.query("platform == @platform1")
     dfB = gf.query("platform == @platform2")
 
     # Same colors as map
     orbits = gf.relativeOrbit.unique()
-    colors = plt.cm.jet(np.linspace(0, 1, orbits.size))
+    colors = cm.jet(np.linspace(0, 1, orbits.size))
 
-    fig, ax = plt.subplots(figsize=(11, 8.5))
-    plt.scatter(
+    fig = Figure(figsize=(11, 8.5))
+    ax = fig.subplots()
+    ax.scatter(
         dfA.timeStamp.values,
         dfA.orbitCode.values,
         edgecolors=colors[dfA.orbitCode.values],
@@ -314,7 +521,7 @@ def plot_timeline(gf, platform1, platform2):
         s=60,
         label=f"{platform1}",
     )
-    plt.scatter(
+    ax.scatter(
         dfB.timeStamp.values,
         dfB.orbitCode.values,
         edgecolors=colors[dfB.orbitCode.values],
@@ -325,13 +532,196 @@ def plot_timeline(gf, platform1, platform2):
         label=f"{platform2}",
     )
 
-    plt.yticks(gf.orbitCode.unique(), gf.relativeOrbit.unique())
+    ax.set_yticks(gf.orbitCode.unique())
+    ax.set_yticklabels(gf.relativeOrbit.unique())
 
     ax.xaxis.set_minor_locator(MonthLocator())
     ax.xaxis.set_major_locator(YearLocator())
-    plt.legend(loc="lower right")
-    plt.ylim(-1, orbits.size)
-    plt.ylabel("Orbit Number")
+    ax.legend(loc="lower right")
+    ax.set_ylim(-1, orbits.size)
+    ax.set_ylabel("Orbit Number")
     fig.autofmt_xdate()
-    plt.title("Acquisition Timeline")
-    plt.savefig("timeline.pdf", bbox_inches="tight")
+    ax.set_title("Acquisition Timeline")
+    fig.savefig(outname, bbox_inches="tight")
+
+
+def bin_acquisitions(gf, freq="M"):
+    """Count acquisitions per relative orbit and time bin.
+
+    Parameters
+    ----------
+    gf :  GeoDataFrame
+        A geopandas GeoDataFrame
+    freq : str
+        pandas period alias for the time bins (e.g. 'W', 'M', 'Q', 'Y')
+
+    Returns
+    -------
+    counts :  ndarray
+        number of frames with shape (orbits, bins)
+    orbits :  ndarray
+        sorted relative orbits (rows of counts)
+    periods :  PeriodIndex
+        time bins (columns of counts)
+
+    """
+    orbitCodes, orbits = pd.factorize(gf.relativeOrbit, sort=True)
+    ordinals = gf.timeStamp.dt.to_period(freq).array.asi8
+    first = ordinals.min()
+    nbins = ordinals.max() - first + 1
+    flat = orbitCodes * nbins + (ordinals - first)
+    counts = np.bincount(flat, minlength=orbits.size * nbins).reshape(-1, nbins)
+    periods = pd.period_range(pd.Period(ordinal=first, freq=freq), periods=nbins)
+
+    return counts, np.asarray(orbits), periods
+
+
+def plot_timeline_binned(gf, freq="M", outname="timeline.pdf"):
+    """Plot dinosar inventory acquisitions as an image of binned counts.
+
+    Drawing cost depends on the number of orbits and time bins, not on the
+    number of scenes, so this is suitable for very large inventories.
+
+    Parameters
+    ----------
+    gf :  GeoDataFrame
+        A geopandas GeoDataFrame
+    freq : str
+        pandas period alias for the time bins (e.g. 'W', 'M', 'Q', 'Y')
+    outname : str
+        output figure name
+
+    """
+    from matplotlib.figure import Figure
+    import matplotlib.dates as mdates
+    from matplotlib.dates import YearLocator, MonthLocator
+
+    counts, orbits, periods = bin_acquisitions(gf, freq)
+    directions = gf.groupby("relativeOrbit", observed=True).flightDirection.first()
+    labels = [f"{orbit} ({directions[orbit][0]})" for orbit in orbits]
+
+    start = mdates.date2num(periods[0].start_time)
+    stop = mdates.date2num(periods[-1].end_time)
+    image = np.ma.masked_equal(counts, 0)
+
+    fig = Figure(figsize=(11, 8.5))
+    ax = fig.subplots()
+    im = ax.imshow(
+        image,
+        aspect="auto",
+        interpolation="nearest",
+        origin="lower",
+        cmap="viridis",
+        extent=(start, stop, -0.5, orbits.size - 0.5),
+    )
+    fig.colorbar(im, ax=ax, label=f"Frames per bin ({freq})")
+
+    ax.set_yticks(np.arange(orbits.size))
+    ax.set_yticklabels(labels)
+    ax.xaxis_date()
+    ax.xaxis.set_minor_locator(MonthLocator())
+    ax.xaxis.set_major_locator(YearLocator())
+    ax.set_ylabel("Orbit Number")
+    fig.autofmt_xdate()
+    ax.set_title("Acquisition Timeline")
+    fig.savefig(outname, bbox_inches="tight")
+
+
+def _init_report_worker():
+    """Set up matplotlib and basemap features once per worker process."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    try:
+        _map_features()
+    except Exception as e:
+        print(f"Unable to load basemap features: {e}")
+
+
+def _plot_report(gf, aoi, outdir, freq, zoom, tile_url, cache_dir):
+    """Save map and timeline figures for a single region of interest."""
+    os.makedirs(outdir, exist_ok=True)
+    w, s, e, n = gf.total_bounds
+    plot_map(
+        gf,
+        [s, n, w, e],
+        [aoi],
+        zoom,
+        tile_url,
+        cache_dir,
+        outname=os.path.join(outdir, "map.pdf"),
+    )
+    outname = os.path.join(outdir, "timeline.pdf")
+    if freq:
+        plot_timeline_binned(gf, freq, outname=outname)
+    else:
+        plot_timeline_sentinel(gf, outname=outname)
+
+    return outdir
+
+
+def plot_reports(
+    gf,
+    aois,
+    outdir=".",
+    name="name",
+    processes=None,
+    freq=None,
+    zoom=8,
+    tile_url=TILE_URL,
+    cache_dir=None,
+):
+    """Save map and timeline figures for many regions of interest.
+
+    The inventory is split by a single spatial join, then figures for each
+    region are drawn in parallel worker processes that load basemap features
+    once and share the tile cache. Figures are saved to [outdir]/[name]/.
+
+    Parameters
+    ----------
+    gf :  GeoDataFrame
+        A geopandas GeoDataFrame
+    aois : GeoDataFrame
+        regions of interest
+    outdir : str
+        parent directory for per-region output directories
+    name : str
+        column of `aois` with a unique name for each region
+    processes : int
+        number of worker processes (default: number of CPUs)
+    freq : str
+        plot binned timelines with this period alias (see plot_timeline_binned)
+    zoom: int
+        zoom level for WMTS
+    tile_url: str
+        basemap tile url template (http(s):// or file://)
+    cache_dir: str
+        root directory for cached tiles and footprints (see get_cache_dir())
+
+    Returns
+    -------
+    outdirs :  dict
+        {region name: output directory}
+
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if aois.crs is not None:
+        aois = aois.to_crs(epsg=4326)
+    subsets = asf.split_inventory(gf, aois, name)
+    geometries = dict(zip(aois[name], aois.geometry))
+    for label in set(aois[name]) - set(subsets):
+        print(f"No frames intersect {label}, skipping")
+
+    outdirs = {}
+    with ProcessPoolExecutor(processes, initializer=_init_report_worker) as pool:
+        futures = {}
+        for label, subset in subsets.items():
+            path = os.path.join(outdir, str(label))
+            args = (subset, geometries[label], path, freq, zoom, tile_url, cache_dir)
+            futures[label] = pool.submit(_plot_report, *args)
+        for label, future in futures.items():
+            outdirs[label] = future.result()
+            print(f"Saved map.pdf and timeline.pdf in {outdirs[label]}")
+
+    return outdirs
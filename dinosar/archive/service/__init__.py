@@ -0,0 +1,459 @@
+"""Long-lived inventory service answering JSON queries over local HTTP.
+
+Command line tools reload query.geojson on every call. For orchestration that
+makes many small lookups, an `InventoryService` loads inventories and the
+precise orbit catalog once and keeps dictionaries and a footprint index in
+memory. Files are checked for changes in a background thread and reloaded
+without interrupting queries (the new indexes are swapped in when ready).
+
+Routes (GET, query parameters, JSON responses)::
+
+    /health
+    /inventories
+    /urls?date=20180320&orbit=120[&inventory=name]
+    /names?date=20180320&orbit=120[&inventory=name]
+    /dates?orbit=120[&inventory=name]
+    /granule?name=S1B_IW_SLC__...
+    /orbit?granule=S1B_IW_SLC__...
+    /summary[?inventory=name]
+    /coverage?[revisit=12&start=2018-01-01&stop=2018-12-31&inventory=name]
+    /footprints?point=lon,lat or bbox=minx,miny,maxx,maxy[&inventory=name]
+
+Notes
+-----
+Serve inventories and query them with the client::
+
+    server = start_server(InventoryService(["query.geojson"], "poeorb.txt"))
+    client = InventoryClient(f"http://127.0.0.1:{server.server_port}")
+    client.urls("20180320", 120)
+
+"""
+import http.client
+import http.server
+import json
+import os
+import threading
+import urllib.parse
+from dinosar.archive import asf
+from dinosar.archive.coverage import AcquisitionMatrix
+from dinosar.archive.index import FootprintIndex, index_path
+
+DEFAULT_PORT = 8765
+ORBIT_URL = asf.ORBIT_URL
+
+
+class ServiceError(RuntimeError):
+    """Query to the inventory service failed."""
+
+    def __init__(self, message, status=400):
+        self.status = status
+        super().__init__(message)
+
+
+def _day(value):
+    """Date string in any of YYYYMMDD, YYYY-MM-DD or YYYY/MM/DD as YYYYMMDD."""
+    day = str(value).replace("-", "").replace("/", "")[:8]
+    if len(day) != 8 or not day.isdigit():
+        raise ServiceError(f"Invalid date: {value}")
+    return day
+
+
+class InventoryIndex:
+    """In-memory lookup tables for a single inventory file.
+
+    Parameters
+    ----------
+    path : str
+        inventory saved with asf.save_inventory()
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime_ns
+        gf = asf.load_inventory(path)
+        days = gf.dateStamp.dt.strftime("%Y%m%d").values
+        orbits = gf.relativeOrbit.values
+        urls = gf.downloadUrl.values
+        names = gf.granuleName.values
+
+        self.urls = {}
+        self.dates = {}
+        self.granules = {}
+        for name, url, orbit, day, direction, platform in zip(
+            names, urls, orbits, days, gf.flightDirection.values, gf.platform.values
+        ):
+            self.urls.setdefault((int(orbit), day), []).append(url)
+            self.granules[name] = dict(
+                url=url,
+                orbit=int(orbit),
+                date=day,
+                direction=direction,
+                platform=platform,
+            )
+        for (orbit, day) in self.urls:
+            self.dates.setdefault(orbit, []).append(day)
+        for orbit in self.dates:
+            self.dates[orbit].sort()
+        self.names = list(names)
+        self.summary = asf.acquisition_statistics(gf)[0]
+        self.matrix = AcquisitionMatrix.from_inventory(gf)
+        self.index = FootprintIndex.for_inventory(gf, index_path(path))
+
+    def __len__(self):
+        return len(self.names)
+
+
+class OrbitCatalog:
+    """Precise orbit file names indexed by mission and validity start date.
+
+    Parameters
+    ----------
+    path : str
+        text file listing orbit file names (e.g. saved aux_poeorb listing)
+    url : str
+        directory url the orbit files are downloaded from
+
+    """
+
+    def __init__(self, path, url=ORBIT_URL):
+        self.path = path
+        self.url = url
+        self.mtime = os.stat(path).st_mtime_ns
+        self.orbits = {}
+        with open(path) as f:
+            for line in f:
+                name = line.strip()
+                if len(name) >= 50:
+                    self.orbits.setdefault(asf.orbit_file_key(name), name)
+
+    def __len__(self):
+        return len(self.orbits)
+
+    def lookup(self, granule):
+        """Url of the precise orbit for a granule (see asf.get_orbit_url())."""
+        try:
+            key = asf.orbit_key(granule)
+        except ValueError:
+            raise ServiceError(f"Invalid granule name: {granule}")
+        name = self.orbits.get(key)
+        if name is None:
+            raise ServiceError(f"No precise orbit for {granule}", 404)
+        return f"{self.url}/{name}"
+
+
+class InventoryService:
+    """Inventories and orbit catalog kept in memory and reloaded on change.
+
+    Parameters
+    ----------
+    inventories : list or dict
+        inventory paths, or {name: path} (names default to the paths)
+    orbit_catalog : str
+        text file listing precise orbit file names
+    orbit_url : str
+        directory url of precise orbit files
+
+    """
+
+    def __init__(self, inventories, orbit_catalog=None, orbit_url=ORBIT_URL):
+        if not isinstance(inventories, dict):
+            inventories = {path: path for path in inventories}
+        self.paths = dict(inventories)
+        self.default = next(iter(self.paths), None)
+        self.orbit_catalog = orbit_catalog
+        self.orbit_url = orbit_url
+        self.indexes = {}
+        self.orbits = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self.reload()
+
+    def reload(self):
+        """Reload files that changed since they were loaded.
+
+        Returns
+        -------
+        reloaded :  list
+            names of reloaded inventories (and 'orbits' for the catalog)
+
+        """
+        reloaded = []
+        with self._lock:
+            for name, path in self.paths.items():
+                current = self.indexes.get(name)
+                try:
+                    if current and os.stat(path).st_mtime_ns == current.mtime:
+                        continue
+                    self.indexes[name] = InventoryIndex(path)
+                    reloaded.append(name)
+                except Exception as e:
+                    print(f"Unable to load {path}: {e}")
+            if self.orbit_catalog:
+                try:
+                    mtime = os.stat(self.orbit_catalog).st_mtime_ns
+                    if self.orbits is None or mtime != self.orbits.mtime:
+                        catalog = OrbitCatalog(self.orbit_catalog, self.orbit_url)
+                        self.orbits = catalog
+                        reloaded.append("orbits")
+                except Exception as e:
+                    print(f"Unable to load {self.orbit_catalog}: {e}")
+        if reloaded:
+            print(f"Loaded {', '.join(reloaded)}")
+        return reloaded
+
+    def watch(self, interval=1.0):
+        """Check for changed files every `interval` seconds in a thread."""
+
+        def poll():
+            while not self._stop.wait(interval):
+                self.reload()
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=poll, daemon=True)
+        self._watcher.start()
+
+    def close(self):
+        """Stop watching files."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+
+    def inventory(self, name=None):
+        """In-memory index of an inventory (default: the first)."""
+        index = self.indexes.get(name or self.default)
+        if index is None:
+            raise ServiceError(f"Unknown inventory: {name}", 404)
+        return index
+
+    def handle(self, route, params):
+        """Answer a query.
+
+        Parameters
+        ----------
+        route : str
+            route name (e.g. 'urls')
+        params : dict
+            query parameters as strings
+
+        Returns
+        -------
+        result :
+            JSON-serializable result
+
+        """
+        try:
+            return self._handle(route, params)
+        except KeyError as e:
+            raise ServiceError(f"Missing parameter: {e.args[0]}")
+        except (TypeError, ValueError) as e:
+            raise ServiceError(str(e))
+
+    def _handle(self, route, params):
+        inventory = params.get("inventory")
+        if route == "health":
+            return dict(status="ok", inventories=len(self.indexes))
+        if route == "inventories":
+            return {
+                name: dict(path=index.path, scenes=len(index), mtime=index.mtime)
+                for name, index in self.indexes.items()
+            }
+        if route in ("urls", "names"):
+            key = (int(params["orbit"]), _day(params["date"]))
+            urls = self.inventory(inventory).urls.get(key, [])
+            if route == "names":
+                return [os.path.basename(url) for url in urls]
+            return urls
+        if route == "dates":
+            return self.inventory(inventory).dates.get(int(params["orbit"]), [])
+        if route == "granule":
+            for index in self.indexes.values():
+                if params["name"] in index.granules:
+                    return index.granules[params["name"]]
+            raise ServiceError(f"Unknown granule: {params['name']}", 404)
+        if route == "orbit":
+            if self.orbits is None:
+                raise ServiceError("No orbit catalog loaded", 404)
+            return self.orbits.lookup(params["granule"])
+        if route == "summary":
+            summary = self.inventory(inventory).summary
+            return json.loads(summary.to_json(orient="index", date_format="iso"))
+        if route == "coverage":
+            matrix = self.inventory(inventory).matrix
+            start, stop = params.get("start"), params.get("stop")
+            fraction = matrix.coverage_fraction(
+                int(params.get("revisit", 12)), start, stop
+            )
+            gaps = matrix.max_gaps(start, stop)
+            return {
+                str(orbit): dict(
+                    coverage=float(fraction[orbit]), max_gap=int(gaps[orbit])
+                )
+                for orbit in fraction.index
+            }
+        if route == "footprints":
+            index = self.inventory(inventory)
+            if "point" in params:
+                x, y = map(float, params["point"].split(","))
+                positions = index.index.query_point(x, y)
+            else:
+                minx, miny, maxx, maxy = map(float, params["bbox"].split(","))
+                bbox = (minx, miny, maxx, maxy)
+                positions = index.index.query_bbox(*bbox, predicate="intersects")
+            return [index.names[i] for i in positions]
+        raise ServiceError(f"Unknown route: {route}", 404)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Serve InventoryService queries as JSON."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            result = self.server.service.handle(url.path.strip("/"), params)
+            body = dict(result=result)
+            status = 200
+        except ServiceError as e:
+            body = dict(error=str(e))
+            status = e.status
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(service, host="127.0.0.1", port=DEFAULT_PORT, interval=1.0):
+    """Serve an InventoryService from a background thread.
+
+    Parameters
+    ----------
+    service : InventoryService
+    host : str
+        address to listen on (default: local connections only)
+    port : int
+        port to listen on (0 for any free port, see server.server_port)
+    interval : float
+        seconds between checks for changed files, None to disable reloading
+
+    Returns
+    -------
+    server :  ThreadingHTTPServer
+        call server.shutdown() then server.server_close() to stop serving
+
+    """
+    server = http.server.ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service
+    if interval:
+        service.watch(interval)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+class InventoryClient:
+    """Client for a running inventory service.
+
+    Connections are kept open and are not shared between threads.
+
+    Parameters
+    ----------
+    url : str
+        service address (e.g. 'http://127.0.0.1:8765')
+    timeout : float
+        seconds to wait for a response
+
+    """
+
+    def __init__(self, url=f"http://127.0.0.1:{DEFAULT_PORT}", timeout=10):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(
+                self.host, self.port, timeout=self.timeout
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, route, **params):
+        """Send a query and return its result, raises ServiceError on failure."""
+        params = {key: value for key, value in params.items() if value is not None}
+        path = f"/{route}?{urllib.parse.urlencode(params)}"
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                body = json.loads(response.read())
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # server closed the kept-alive connection, reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+        if response.status != 200:
+            raise ServiceError(body["error"], response.status)
+        return body["result"]
+
+    def health(self):
+        """Service status."""
+        return self.get("health")
+
+    def inventories(self):
+        """Loaded inventories with their paths and number of scenes."""
+        return self.get("inventories")
+
+    def urls(self, date, orbit, inventory=None):
+        """Frame download urls for a date and relative orbit."""
+        return self.get("urls", date=date, orbit=orbit, inventory=inventory)
+
+    def names(self, date, orbit, inventory=None):
+        """Frame file names for a date and relative orbit."""
+        return self.get("names", date=date, orbit=orbit, inventory=inventory)
+
+    def dates(self, orbit, inventory=None):
+        """Acquisition dates (YYYYMMDD) of a relative orbit."""
+        return self.get("dates", orbit=orbit, inventory=inventory)
+
+    def granule(self, name):
+        """Url, orbit, date, direction and platform of a granule."""
+        return self.get("granule", name=name)
+
+    def orbit_url(self, granule):
+        """Precise orbit url for a granule."""
+        return self.get("orbit", granule=granule)
+
+    def summary(self, inventory=None):
+        """Per-orbit summary (see asf.summarize_inventory())."""
+        return self.get("summary", inventory=inventory)
+
+    def coverage(self, revisit=12, start=None, stop=None, inventory=None):
+        """Coverage fraction and longest gap in days of each orbit."""
+        return self.get(
+            "coverage", revisit=revisit, start=start, stop=stop, inventory=inventory
+        )
+
+    def footprints(self, point=None, bbox=None, inventory=None):
+        """Granules containing a (lon, lat) point or intersecting a bbox."""
+        if point is not None:
+            query = dict(point=",".join(map(str, point)))
+        else:
+            query = dict(bbox=",".join(map(str, bbox)))
+        return self.get("footprints", inventory=inventory, **query)
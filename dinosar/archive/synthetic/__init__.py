@@ -0,0 +1,701 @@
+"""Synthetic Sentinel-1 inventories and a local stand-in for the ASF archive.
+
+`synthetic_scenes()` generates SLC frames in the ASF search API format for
+any region and time span. Ground tracks, acquisition times, absolute orbits
+and frame numbers follow the Sentinel-1 12-day repeat orbit (175 relative
+orbits per cycle, S1B six days after S1A), calibrated against real ASF
+results, so relative orbit numbers, footprints and granule names look like
+the real archive (to within a few km and a minute).
+
+A `MockArchive` serves scenes like the ASF search API
+(services/search/param), the precise orbit listing (aux_poeorb) and the SLC
+datapool, with configurable latency, paging and injected errors, for testing
+query, caching and download code offline::
+
+    archive = MockArchive(synthetic_scenes([46, 47, -121, -120], "2018-01-01"))
+    server = start_mock_server(archive)
+    asf.query_asf([46, 47, -121, -120], "SA", baseurl=archive.search_url)
+    asf.get_orbit_url(granule, url=archive.orbit_url)
+
+Notes
+-----
+Footprints follow constant-heading tracks, which is accurate at low and mid
+latitudes only, regions must not cross the antimeridian.
+
+"""
+import collections
+import datetime
+import http.server
+import json
+import math
+import threading
+import time
+import urllib.parse
+import numpy as np
+import pandas as pd
+import shapely.geometry
+import shapely.wkt
+
+DATAPOOL_URL = "https://datapool.asf.alaska.edu"
+SEARCH_PATH = "/services/search/param"
+ORBIT_PATH = "/aux_poeorb"
+
+# Repeat orbit: 175 relative orbits in 12 days
+CYCLE_DAYS = 12
+RELATIVE_ORBITS = 175
+ORBIT_SECONDS = CYCLE_DAYS * 86400 / RELATIVE_ORBITS
+# Ascending equator crossing of relative orbit 120 and its absolute orbit
+REFERENCE_ORBITS = {
+    "S1A": (2817, datetime.datetime(2014, 10, 13, 23, 28, 40)),
+    "S1B": (2246, datetime.datetime(2016, 9, 26, 23, 28, 15)),
+}
+REFERENCE_ORBIT = 120
+REFERENCE_LONGITUDE = -77.6
+# Offset of absolute orbit numbers: relative = (absolute - offset) % 175 + 1
+ORBIT_OFFSETS = {"S1A": 73, "S1B": 27}
+MISSION_DATES = {"S1A": ("2014-10-03", None), "S1B": ("2016-09-26", "2021-12-23")}
+PLATFORMS = {"S1A": "Sentinel-1A", "S1B": "Sentinel-1B"}
+# Footprint centers: descending tracks cross the equator this far east of
+# the ascending track of the same relative orbit, headings from north
+DESCENDING_LONGITUDE = 183.27
+HEADINGS = {"ASCENDING": -12.0, "DESCENDING": 192.0}
+# Relative orbits (and ASF frame numbers) start at this ascending latitude
+NODE_LATITUDE = 1.9
+FRAMES_PER_ORBIT = 1185
+FRAME_SECONDS = 27
+FRAME_STEP_SECONDS = 25
+SWATH_KM = 250
+KM_PER_DEGREE = 111.2
+MAX_LATITUDE = 80
+
+
+def _wrap(lon):
+    """Longitude in [-180, 180)."""
+    return (lon + 180) % 360 - 180
+
+
+def _mercator(lat):
+    """Mercator ordinate of a latitude in degrees."""
+    return math.degrees(math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)))
+
+
+def track_longitude(relativeOrbit, direction, lat):
+    """Longitude of footprint centers of a track at a latitude.
+
+    Parameters
+    ----------
+    relativeOrbit : int
+        relative orbit whose ascending node starts the pass (ascending frames
+        north of NODE_LATITUDE are labeled with the next relative orbit)
+    direction : str
+        'ASCENDING' or 'DESCENDING'
+    lat : float
+        latitude in degrees
+
+    Returns
+    -------
+    lon :  float
+
+    """
+    step = 360 * CYCLE_DAYS / RELATIVE_ORBITS
+    lon = REFERENCE_LONGITUDE - (relativeOrbit - REFERENCE_ORBIT) * step
+    if direction == "DESCENDING":
+        lon += DESCENDING_LONGITUDE
+    slope = math.tan(math.radians(HEADINGS[direction]))
+    return _wrap(lon + slope * _mercator(lat))
+
+
+def frame_footprint(lat, lon, direction):
+    """Footprint polygon of an IW SLC frame centered at lat, lon."""
+    heading = math.radians(HEADINGS[direction])
+    along = FRAME_SECONDS / ORBIT_SECONDS * 180 * KM_PER_DEGREE
+    across = SWATH_KM / 2
+    # unit vectors (east, north) along track and to the right of it
+    forward = (math.sin(heading), math.cos(heading))
+    right = (math.cos(heading), -math.sin(heading))
+    scale = KM_PER_DEGREE * math.cos(math.radians(lat))
+    corners = []
+    for a, r in [(1, -1), (-1, -1), (-1, 1), (1, 1), (1, -1)]:
+        east = a * along * forward[0] + r * across * right[0]
+        north = a * along * forward[1] + r * across * right[1]
+        corners.append(
+            (round(lon + east / scale, 4), round(lat + north / KM_PER_DEGREE, 4))
+        )
+    return shapely.geometry.Polygon(corners)
+
+
+def _frame_templates(roi, orbits=None, directions=None):
+    """Frames of every pass intersecting a region, before timing.
+
+    Returns a list of dictionaries with the pass relative orbit, direction,
+    frame center, footprint, label offset (1 for ascending frames belonging
+    to the next relative orbit) and seconds from the pass's ascending node.
+    """
+    miny, maxy = roi.bounds[1], roi.bounds[3]
+    step = 360 * FRAME_STEP_SECONDS / ORBIT_SECONDS
+    half = 180 * FRAME_SECONDS / ORBIT_SECONDS
+    first = math.floor((max(miny, -MAX_LATITUDE) - 2 - NODE_LATITUDE) / step)
+    last = math.ceil((min(maxy, MAX_LATITUDE) + 2 - NODE_LATITUDE) / step)
+    lats = [NODE_LATITUDE + step * (j + 0.5) for j in range(first, last + 1)]
+    templates = []
+    for direction in directions or HEADINGS:
+        for relativeOrbit in range(1, RELATIVE_ORBITS + 1):
+            for lat in lats:
+                offset = int(direction == "ASCENDING" and lat >= NODE_LATITUDE)
+                label = (relativeOrbit + offset - 1) % RELATIVE_ORBITS + 1
+                if orbits is not None and label not in orbits:
+                    continue
+                lon = track_longitude(relativeOrbit, direction, lat)
+                footprint = frame_footprint(lat, lon, direction)
+                if not footprint.intersects(roi):
+                    continue
+                if direction == "ASCENDING":
+                    phase = lat - NODE_LATITUDE
+                    seconds = (lat - half) / 360 * ORBIT_SECONDS
+                else:
+                    phase = 180 - lat - NODE_LATITUDE
+                    seconds = -ORBIT_SECONDS / 2 - (lat + half) / 360 * ORBIT_SECONDS
+                templates.append(
+                    dict(
+                        relativeOrbit=relativeOrbit,
+                        label=label,
+                        offset=offset,
+                        direction=direction,
+                        lat=lat,
+                        lon=lon,
+                        footprint=footprint,
+                        seconds=seconds,
+                        frame=int(phase % 360 / 360 * FRAMES_PER_ORBIT) + 1,
+                    )
+                )
+    return templates
+
+
+def _scene(mission, template, absoluteOrbit, start, processed, productID, datapool):
+    """Scene dictionary with the fields of an ASF search result."""
+    stop = start + datetime.timedelta(seconds=FRAME_SECONDS)
+    direction = template["direction"]
+    # one datatake per pass, also across the start of the next relative orbit
+    pass_orbit = absoluteOrbit - template["offset"]
+    datatake = (2 * pass_orbit + (direction == "DESCENDING")) % 0x1000000
+    name = (
+        f"{mission}_IW_SLC__1SDV_{start:%Y%m%dT%H%M%S}_{stop:%Y%m%dT%H%M%S}_"
+        f"{absoluteOrbit:06d}_{datatake:06X}_{productID}"
+    )
+    sat = "S" + mission[-1]
+    frame = str(template["frame"])
+    return {
+        "granuleName": name,
+        "sceneId": name,
+        "productName": name,
+        "fileName": f"{name}.zip",
+        "product_file_id": f"{name}_SLC",
+        "platform": PLATFORMS[mission],
+        "missionName": f"ASF-{sat}-IW",
+        "collectionName": f"ASF-{sat}-IW",
+        "granuleType": f"SENTINEL_1{mission[-1]}_FRAME",
+        "sensor": "SAR",
+        "beamMode": "IW",
+        "beamModeType": "IW",
+        "beamSwath": "IW",
+        "processingLevel": "SLC",
+        "processingDescription": f"{PLATFORMS[mission]} Single Look Complex product",
+        "polarization": "VV+VH",
+        "lookDirection": "R",
+        "flightDirection": direction,
+        "relativeOrbit": str(template["label"]),
+        "flightLine": str(template["label"]),
+        "absoluteOrbit": str(absoluteOrbit),
+        "frameNumber": frame,
+        "firstFrame": frame,
+        "finalFrame": frame,
+        "startTime": f"{start:%Y-%m-%d %H:%M:%S}",
+        "stopTime": f"{stop:%Y-%m-%d %H:%M:%S}",
+        "sceneDate": f"{stop:%Y-%m-%d %H:%M:%S}",
+        "processingDate": f"{processed:%Y-%m-%d %H:%M:%S}",
+        "centerLat": round(template["lat"], 4),
+        "centerLon": round(template["lon"], 4),
+        "stringFootprint": template["footprint"].wkt,
+        "insarStackSize": "0",
+        "downloadUrl": f"{datapool}/SLC/{sat}/{name}.zip",
+    }
+
+
+def synthetic_scenes(
+    snwe,
+    start,
+    stop=None,
+    platforms=("S1A", "S1B"),
+    orbits=None,
+    flightDirection=None,
+    missing=0.0,
+    duplicates=0.0,
+    seed=0,
+    datapool=DATAPOOL_URL,
+):
+    """Generate Sentinel-1 SLC frames over a region in ASF search format.
+
+    Parameters
+    ----------
+    snwe : list or shapely geometry
+        bounding coordinates [south, north, west, east], or a polygon
+    start : str
+        first acquisition date (e.g. '2018-01-01')
+    stop : str
+        last acquisition date (default: start + one year)
+    platforms : list
+        missions to include ('S1A', 'S1B'), each within its operating dates
+    orbits : list
+        relative orbits to include (default: all passes over the region)
+    flightDirection : str
+        'ASCENDING' or 'DESCENDING' (default: both)
+    missing : float
+        probability that a frame is left out of an acquisition
+    duplicates : float
+        probability that a frame also has a reprocessed product with a later
+        processingDate (see asf.resolve_duplicates())
+    seed : int
+        seed of the random number generator, the inventory is reproducible
+    datapool : str
+        base url of downloadUrl
+
+    Returns
+    -------
+    scenes :  list
+        scene dictionaries sorted by startTime
+
+    """
+    if hasattr(snwe, "wkt"):
+        roi = snwe
+    else:
+        miny, maxy, minx, maxx = snwe
+        roi = shapely.geometry.box(minx, miny, maxx, maxy)
+    start = pd.Timestamp(start).to_pydatetime()
+    if stop is None:
+        stop = start + datetime.timedelta(days=365)
+    else:
+        stop = pd.Timestamp(stop).to_pydatetime() + datetime.timedelta(days=1)
+    directions = [flightDirection.upper()] if flightDirection else None
+    orbits = None if orbits is None else {int(orbit) for orbit in orbits}
+    templates = _frame_templates(roi, orbits, directions)
+    rng = np.random.default_rng(seed)
+
+    scenes = []
+    for mission in platforms:
+        reference, reference_time = REFERENCE_ORBITS[mission]
+        first, last = MISSION_DATES[mission]
+        begin = max(start, pd.Timestamp(first).to_pydatetime())
+        end = min(stop, pd.Timestamp(last).to_pydatetime()) if last else stop
+        for template in templates:
+            # absolute orbits of this pass are 175 apart
+            base = reference + template["relativeOrbit"] - REFERENCE_ORBIT
+            first_cycle = math.floor(
+                ((begin - reference_time).total_seconds() - template["seconds"])
+                / ORBIT_SECONDS
+                / RELATIVE_ORBITS
+            )
+            cycle = first_cycle
+            while True:
+                absoluteOrbit = base + cycle * RELATIVE_ORBITS
+                node = reference_time + datetime.timedelta(
+                    seconds=(absoluteOrbit - reference) * ORBIT_SECONDS
+                )
+                acquired = node + datetime.timedelta(seconds=template["seconds"])
+                cycle += 1
+                if acquired >= end:
+                    break
+                if acquired < begin or rng.random() < missing:
+                    continue
+                acquired = acquired.replace(microsecond=0)
+                label = absoluteOrbit + template["offset"]
+                processed = acquired + datetime.timedelta(hours=2 + 4 * rng.random())
+                products = [processed]
+                if rng.random() < duplicates:
+                    later = datetime.timedelta(days=int(rng.integers(30, 400)))
+                    products.append(processed + later)
+                for processed in products:
+                    productID = f"{rng.integers(0x10000):04X}"
+                    scenes.append(
+                        _scene(
+                            mission,
+                            template,
+                            label,
+                            acquired,
+                            processed,
+                            productID,
+                            datapool,
+                        )
+                    )
+
+    scenes.sort(key=lambda scene: (scene["startTime"], scene["granuleName"]))
+    return scenes
+
+
+def save_scenes(scenes, outname="query.json"):
+    """Save scene dictionaries like an ASF json query (see asf.load_asf_json).
+
+    Returns
+    -------
+    outname :  str
+
+    """
+    with open(outname, "w") as f:
+        json.dump([scenes], f)
+    return outname
+
+
+def synthetic_orbit_files(start, stop=None, platforms=("S1A", "S1B")):
+    """Names of precise orbit files covering every day of a time span.
+
+    Each file is valid from 22:59:42 the day before a date until 00:59:42
+    the day after it and is produced 20 days later, like the files listed by
+    asf.get_orbit_url().
+
+    Returns
+    -------
+    names :  list
+
+    """
+    stop = stop or pd.Timestamp(start) + pd.Timedelta(days=365)
+    days = pd.date_range(start, stop, freq="D")
+    names = []
+    for mission in platforms:
+        for day in days:
+            produced = day + pd.Timedelta(days=20, hours=12, minutes=12, seconds=21)
+            valid = day - pd.Timedelta(days=1) + pd.Timedelta(hours=22, minutes=59)
+            until = day + pd.Timedelta(days=1, minutes=59)
+            names.append(
+                f"{mission}_OPER_AUX_POEORB_OPOD_{produced:%Y%m%dT%H%M%S}_"
+                f"V{valid:%Y%m%dT%H%M}42_{until:%Y%m%dT%H%M}42.EOF"
+            )
+    return names
+
+
+def _timestamp(value):
+    """ASF start/end parameter as 'YYYY-MM-DD HH:MM:SS'."""
+    return pd.Timestamp(value.rstrip("Z")).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _orbit_set(value):
+    """Relative orbits from a comma separated list with optional ranges."""
+    orbits = set()
+    for item in value.split(","):
+        low, _, high = item.partition("-")
+        orbits.update(range(int(low), int(high or low) + 1))
+    return orbits
+
+
+def _missions(value):
+    """Missions matching an ASF platform parameter."""
+    missions = set()
+    for item in value.upper().replace(" ", "").split(","):
+        if item in ("S1", "SENTINEL-1", "SENTINEL1"):
+            missions.update(PLATFORMS)
+        else:
+            missions.add("S1" + item[-1])
+    return missions
+
+
+class MockArchive:
+    """Stand-in for the ASF search API, precise orbit listing and datapool.
+
+    Parameters
+    ----------
+    scenes : list
+        scene dictionaries to search (e.g. from synthetic_scenes())
+    orbit_files : list
+        precise orbit file names (e.g. from synthetic_orbit_files())
+    latency : float
+        seconds added to every response
+    page_size : int
+        largest number of scenes in a search response, further pages are
+        requested with the CMR-Search-After header of the previous response
+    error_rate : float
+        fraction of requests answered with `error_status`
+    error_status : int
+        HTTP status of random errors
+    download_bytes : int
+        size of every downloaded SLC or orbit file
+    seed : int
+        seed for random errors
+    clock : callable
+        returns the current UTC datetime, scenes acquired and orbit files
+        produced after it are not served yet (default: serve everything)
+
+    Notes
+    -----
+    Search responses point downloadUrl at this server, which serves files of
+    `download_bytes` zeros (with byte ranges, for wget -c). Requests per
+    route are counted in `requests`, the parameters of every search are
+    kept in `searches`, and inject() queues errors for the next requests.
+    Granule names added to `hidden` are left out of searches, like frames
+    ASF publishes late.
+
+    """
+
+    def __init__(
+        self,
+        scenes,
+        orbit_files=(),
+        latency=0.0,
+        page_size=None,
+        error_rate=0.0,
+        error_status=503,
+        download_bytes=1024,
+        seed=0,
+        clock=None,
+    ):
+        self.scenes = list(scenes)
+        self.orbit_files = set(orbit_files)
+        self.latency = latency
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.download_bytes = download_bytes
+        self.clock = clock
+        self.hidden = set()
+        self.url = None
+        self.requests = collections.Counter()
+        self.searches = []
+        self.errors = collections.deque()
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+        # columns for vectorized filtering, newest first like ASF
+        order = sorted(
+            range(len(self.scenes)),
+            key=lambda i: self.scenes[i]["startTime"],
+            reverse=True,
+        )
+        self.scenes = [self.scenes[i] for i in order]
+        self._encoded = [json.dumps(scene) for scene in self.scenes]
+        self._geometries = {}
+        self._times = np.array([s["startTime"] for s in self.scenes], dtype="U19")
+        self._orbits = np.array([int(s["relativeOrbit"]) for s in self.scenes])
+        self._missions = np.array(
+            ["S1" + s["platform"][-1] for s in self.scenes], dtype="U3"
+        )
+        self._directions = np.array(
+            [s["flightDirection"][0] for s in self.scenes], dtype="U1"
+        )
+        self._granules = {s["granuleName"] for s in self.scenes}
+        bounds = [shapely.wkt.loads(s["stringFootprint"]).bounds for s in self.scenes]
+        self._bounds = np.array(bounds, dtype="f8").reshape(-1, 4)
+
+    @property
+    def search_url(self):
+        """ASF search API endpoint of the running server."""
+        return self.url + SEARCH_PATH
+
+    @property
+    def orbit_url(self):
+        """Precise orbit listing of the running server."""
+        return self.url + ORBIT_PATH
+
+    def inject(self, status=503, count=1):
+        """Answer the next `count` requests with an HTTP error status."""
+        with self._lock:
+            self.errors.extend([status] * count)
+
+    def _geometry(self, i):
+        if i not in self._geometries:
+            self._geometries[i] = shapely.wkt.loads(self.scenes[i]["stringFootprint"])
+        return self._geometries[i]
+
+    def search(self, params):
+        """Positions of scenes matching ASF search parameters, newest first."""
+        mask = np.ones(len(self.scenes), dtype=bool)
+        if params.get("processingLevel", "SLC").upper() != "SLC":
+            mask[:] = False
+        if params.get("beamMode", "IW").upper() != "IW":
+            mask[:] = False
+        if "platform" in params:
+            mask &= np.isin(self._missions, list(_missions(params["platform"])))
+        if "relativeOrbit" in params:
+            mask &= np.isin(self._orbits, list(_orbit_set(params["relativeOrbit"])))
+        if "flightDirection" in params:
+            mask &= self._directions == params["flightDirection"][0].upper()
+        if "start" in params:
+            mask &= self._times >= _timestamp(params["start"])
+        if "end" in params:
+            mask &= self._times <= _timestamp(params["end"])
+        if self.clock is not None:
+            mask &= self._times <= f"{self.clock():%Y-%m-%d %H:%M:%S}"
+        roi = None
+        if "intersectsWith" in params:
+            roi = shapely.wkt.loads(params["intersectsWith"])
+        elif "polygon" in params:
+            coords = [float(x) for x in params["polygon"].split(",")]
+            roi = shapely.geometry.Polygon(list(zip(coords[::2], coords[1::2])))
+        if roi is not None:
+            minx, miny, maxx, maxy = roi.bounds
+            b = self._bounds
+            mask &= (b[:, 0] <= maxx) & (b[:, 2] >= minx)
+            mask &= (b[:, 1] <= maxy) & (b[:, 3] >= miny)
+        found = [
+            i
+            for i in np.flatnonzero(mask)
+            if (roi is None or self._geometry(i).intersects(roi))
+            and self.scenes[i]["granuleName"] not in self.hidden
+        ]
+        if "maxResults" in params:
+            found = found[: int(params["maxResults"])]
+        return found
+
+    def _search_response(self, params, headers):
+        output = params.get("output", "json").lower()
+        found = self.search(params)
+        if output == "count":
+            return 200, {"Content-Type": "text/plain"}, str(len(found)).encode()
+        if output != "json":
+            return 400, {}, f"output={output} is not supported".encode()
+        response_headers = {"Content-Type": "application/json"}
+        if self.page_size:
+            offset = int(headers.get("CMR-Search-After") or 0)
+            if offset + self.page_size < len(found):
+                response_headers["CMR-Search-After"] = str(offset + self.page_size)
+            found = found[offset : offset + self.page_size]
+        text = "[[" + ",".join(self._encoded[i] for i in found) + "]]"
+        if self.url:
+            text = text.replace(DATAPOOL_URL, self.url)
+        return 200, response_headers, text.encode()
+
+    def available_orbit_files(self):
+        """Precise orbit file names produced by now (see `clock`)."""
+        if self.clock is None:
+            return set(self.orbit_files)
+        now = f"{self.clock():%Y%m%dT%H%M%S}"
+        # e.g. S1A_OPER_AUX_POEORB_OPOD_20180424T120721_V...
+        return {name for name in self.orbit_files if name[25:40] <= now}
+
+    def _orbit_listing(self):
+        links = "\n".join(
+            f'<a href="{name}">{name}</a><br>'
+            for name in sorted(self.available_orbit_files())
+        )
+        body = f"<html><body>\n{links}\n</body></html>\n"
+        return 200, {"Content-Type": "text/html"}, body.encode()
+
+    def _download(self, headers):
+        size = self.download_bytes
+        first = 0
+        status = 200
+        response_headers = {"Content-Type": "application/octet-stream"}
+        ranges = headers.get("Range", "")
+        if ranges.startswith("bytes="):
+            first = int(ranges[6:].split("-")[0] or 0)
+            if first >= size:
+                return 416, {"Content-Range": f"bytes */{size}"}, b""
+            status = 206
+            response_headers["Content-Range"] = f"bytes {first}-{size - 1}/{size}"
+        return status, response_headers, bytes(size - first)
+
+    def handle(self, path, params, headers=None):
+        """Answer a GET request.
+
+        Parameters
+        ----------
+        path : str
+            url path (e.g. /services/search/param)
+        params : dict
+            query parameters
+        headers : dict
+            request headers (CMR-Search-After, Range)
+
+        Returns
+        -------
+        status :  int
+        headers :  dict
+        body :  bytes
+
+        """
+        headers = headers or {}
+        path = path.rstrip("/")
+        if path == SEARCH_PATH:
+            route = "search"
+        elif path == ORBIT_PATH:
+            route = "orbits"
+        elif path.startswith(ORBIT_PATH + "/"):
+            route = "orbit"
+        elif path.startswith("/SLC/"):
+            route = "download"
+        else:
+            route = "unknown"
+        with self._lock:
+            self.requests[route] += 1
+            if self.errors:
+                status = self.errors.popleft()
+            elif self.error_rate and self._rng.random() < self.error_rate:
+                status = self.error_status
+            else:
+                status = None
+        if self.latency:
+            time.sleep(self.latency)
+        if status is not None:
+            self.requests["errors"] += 1
+            return status, {}, b"injected error"
+
+        if route == "search":
+            with self._lock:
+                self.searches.append(dict(params))
+            return self._search_response(params, headers)
+        if route == "orbits":
+            return self._orbit_listing()
+        if route == "orbit":
+            if path.rsplit("/", 1)[-1] not in self.available_orbit_files():
+                return 404, {}, b"not found"
+            return self._download(headers)
+        if route == "download":
+            if path.rsplit("/", 1)[-1][:-4] not in self._granules:
+                return 404, {}, b"not found"
+            return self._download(headers)
+        return 404, {}, b"not found"
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Serve MockArchive requests."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        status, headers, body = self.server.archive.handle(
+            url.path, params, self.headers
+        )
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock_server(archive, host="127.0.0.1", port=0):
+    """Serve a MockArchive from a background thread.
+
+    Parameters
+    ----------
+    archive : MockArchive
+    host : str
+        address to listen on (default: local connections only)
+    port : int
+        port to listen on (default: any free port, see archive.url)
+
+    Returns
+    -------
+    server :  ThreadingHTTPServer
+        call server.shutdown() then server.server_close() to stop serving
+
+    """
+    server = http.server.ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.archive = archive
+    archive.url = f"http://{host}:{server.server_port}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
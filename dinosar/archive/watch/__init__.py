@@ -0,0 +1,404 @@
+"""Watch ASF for new acquisitions over areas of interest.
+
+A `Watcher` keeps a high-water mark per area of interest (AOI), the latest
+sceneDate and granuleName seen, and searches ASF only for scenes acquired
+after it. Scenes that were not seen before are grouped by relative orbit and
+date into events::
+
+    {"kind": "new_date", "aoi": "uniongap", "relativeOrbit": 64,
+     "date": "20180320", "granules": [...], "detected": "2018-03-21T06:00:00"}
+
+"new_frames" events report more frames of a date that was already seen (ASF
+publishes the frames of an acquisition separately). Events are appended to
+{root}/{aoi}/events.jsonl and passed to callbacks, and new dates can
+optionally be paired with the previous dates of their orbit and prepared with
+the checkpointed Pipeline of {root}/{aoi}.
+
+Notes
+-----
+Events are written before the high-water mark is saved, so an interrupted
+poll repeats them on the next poll rather than losing them. Searches start
+`lag` before the high-water mark to pick up frames ASF publishes late.
+
+Watch an area with a local state directory::
+
+    watcher = Watcher({"uniongap": dict(roi=[46.45, 46.55, -120.53, -120.43])},
+                      root="watch", neighbors=2)
+    watcher.run(interval=3600)
+
+"""
+import datetime
+import json
+import os
+import time
+import requests
+from dinosar.archive import asf
+
+STATE_FILE = "watch-state.json"
+SCENES_FILE = "scenes.json"
+EVENTS_FILE = "events.jsonl"
+SCENE_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class PrepareError(Exception):
+    """Preparing the pairs of new dates failed."""
+
+
+def utcnow():
+    """Current UTC time (default clock of a Watcher)."""
+    return datetime.datetime.utcnow()
+
+
+def load_aois(config):
+    """Read areas of interest from a YAML file.
+
+    Each entry has either `roi` ([south, north, west, east]) or `file` (a
+    polygon vector file, with optional `buffer` in degrees), and optionally
+    `orbit` and `start` (first date to search when there is no high-water
+    mark yet)::
+
+        uniongap:
+          roi: [46.45, 46.55, -120.53, -120.43]
+          orbit: 64
+
+    Parameters
+    ----------
+    config : str
+        YAML file
+
+    Returns
+    -------
+    aois :  dict
+        AOI settings by name, as expected by Watcher
+
+    """
+    import yaml
+
+    with open(config) as f:
+        entries = yaml.safe_load(f)
+    aois = {}
+    for name, entry in entries.items():
+        aoi = dict(entry)
+        if "file" in aoi:
+            aoi["roi"] = asf.ogr2geometry(aoi.pop("file"), aoi.pop("buffer", None))
+        aois[name] = aoi
+    return aois
+
+
+def _acquisition(granuleName):
+    """Granule name without the product id, same for reprocessed products."""
+    return granuleName[:-5]
+
+
+def _day(sceneDate):
+    """YYYYMMDD of an ASF sceneDate."""
+    return sceneDate[:10].replace("-", "")
+
+
+def find_events(scenes, seen=(), known_dates=()):
+    """Group scenes not seen before into events by relative orbit and date.
+
+    Parameters
+    ----------
+    scenes : list
+        scene dictionaries from an ASF search
+    seen : set
+        granule names already seen (reprocessed products of seen
+        acquisitions are ignored)
+    known_dates : set
+        (relativeOrbit, YYYYMMDD) tuples already seen
+
+    Returns
+    -------
+    events :  list
+        event dictionaries sorted by date, without aoi and detected fields
+    new :  list
+        the new scene dictionaries
+
+    """
+    acquisitions = {_acquisition(name) for name in seen}
+    groups = {}
+    new = []
+    for scene in scenes:
+        acquisition = _acquisition(scene["granuleName"])
+        if acquisition in acquisitions:
+            continue
+        acquisitions.add(acquisition)
+        new.append(scene)
+        key = (int(scene["relativeOrbit"]), _day(scene["sceneDate"]))
+        groups.setdefault(key, []).append(scene)
+
+    events = []
+    for (orbit, day), group in sorted(groups.items(), key=lambda x: x[0][::-1]):
+        events.append(
+            dict(
+                kind="new_frames" if (orbit, day) in known_dates else "new_date",
+                relativeOrbit=orbit,
+                date=day,
+                sceneDate=max(scene["sceneDate"] for scene in group),
+                granules=sorted(scene["granuleName"] for scene in group),
+                platform=group[0].get("platform"),
+                flightDirection=group[0].get("flightDirection"),
+            )
+        )
+    return events, new
+
+
+class Watcher:
+    """Incremental ASF searches over areas of interest.
+
+    Parameters
+    ----------
+    aois : dict
+        settings by AOI name: `roi` ([south, north, west, east] or a shapely
+        polygon) and optionally `orbit` and `start` (see load_aois())
+    root : str
+        state directory, each AOI gets a subdirectory
+    sats : list
+        satellites to search for
+    lag : float
+        days before the high-water mark to search again for late frames
+    backfill : bool
+        emit events for the scenes found by the first search of an AOI,
+        by default they only set the high-water mark
+    neighbors : int
+        prepare each new date with this many previous dates (0 disables prep)
+    template : str
+        YAML template file of topsApp settings for prep
+    poeorb : bool
+        add precise orbits to prepared download links, new acquisitions
+        usually have none yet and are prepared with header orbits
+    orbit_url : str
+        precise orbit listing (see asf.get_orbit_url())
+    on_event : callable or list
+        functions called with each event dictionary
+    clock : callable
+        returns the current UTC datetime
+    baseurl : str
+        ASF search API endpoint
+
+    """
+
+    def __init__(
+        self,
+        aois,
+        root=".",
+        sats=("SA", "SB"),
+        lag=1,
+        backfill=False,
+        neighbors=0,
+        template=None,
+        poeorb=False,
+        orbit_url=asf.ORBIT_URL,
+        on_event=None,
+        clock=utcnow,
+        baseurl=asf.ASF_SEARCH_URL,
+    ):
+        self.aois = aois
+        self.root = root
+        self.sats = sats
+        self.lag = datetime.timedelta(days=lag)
+        self.backfill = backfill
+        self.neighbors = neighbors
+        self.template = template
+        self.poeorb = poeorb
+        self.orbit_url = orbit_url
+        if on_event is None:
+            on_event = []
+        elif callable(on_event):
+            on_event = [on_event]
+        self.callbacks = list(on_event)
+        self.clock = clock
+        self.baseurl = baseurl
+        self.state_file = os.path.join(root, STATE_FILE)
+        self.state = {}
+        if os.path.exists(self.state_file):
+            with open(self.state_file) as f:
+                self.state = json.load(f)
+
+    def save(self):
+        """Write the high-water marks."""
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp, self.state_file)
+
+    def path(self, name, filename=""):
+        """Path of a file in the directory of an AOI."""
+        return os.path.join(self.root, name, filename)
+
+    def scenes(self, name):
+        """Scene dictionaries seen so far for an AOI."""
+        path = self.path(name, SCENES_FILE)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return json.load(f)[0]
+
+    def _stage_scenes(self, name, scenes):
+        """Write seen scenes in the ASF search format (see asf.load_asf_json).
+
+        The file is written next to SCENES_FILE and only replaces it once the
+        events of the poll are out, its path is returned.
+        """
+        staged = self.path(name, SCENES_FILE + ".tmp")
+        with open(staged, "w") as f:
+            json.dump([scenes], f)
+        return staged
+
+    def search_start(self, name):
+        """Start time of the next search for an AOI, None for all history."""
+        mark = self.state.get(name)
+        if mark is None:
+            start = self.aois[name].get("start")
+            return str(start) if start else None
+        latest = datetime.datetime.strptime(mark["sceneDate"], SCENE_DATE_FORMAT)
+        return (latest - self.lag).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def search(self, name):
+        """Search ASF for scenes of an AOI acquired after its high-water mark."""
+        aoi = self.aois[name]
+        start = self.search_start(name)
+        scenes = []
+        for sat in self.sats:
+            outname = asf.query_asf(
+                aoi["roi"],
+                sat,
+                orbit=aoi.get("orbit"),
+                start=start,
+                outdir=self.path(name),
+                baseurl=self.baseurl,
+            )
+            with open(outname) as f:
+                results = json.load(f)
+            if results:
+                scenes.extend(results[0])
+        return scenes
+
+    def poll_once(self, name):
+        """Search one AOI, emit events for new scenes and move its mark.
+
+        Returns
+        -------
+        events :  list
+            event dictionaries, empty if nothing new was found
+
+        """
+        os.makedirs(self.path(name), exist_ok=True)
+        first = name not in self.state
+        found = self.search(name)
+        detected = self.clock().isoformat(timespec="seconds")
+
+        seen = self.scenes(name)
+        known_dates = {
+            (int(scene["relativeOrbit"]), _day(scene["sceneDate"])) for scene in seen
+        }
+        events, new = find_events(
+            found, {scene["granuleName"] for scene in seen}, known_dates
+        )
+        for event in events:
+            event["aoi"] = name
+            event["detected"] = detected
+        if first and not self.backfill:
+            events = []
+        staged = self._stage_scenes(name, seen + new) if new else None
+        try:
+            if events and self.neighbors:
+                self.prepare(name, events, staged)
+
+            with open(self.path(name, EVENTS_FILE), "a") as f:
+                for event in events:
+                    f.write(json.dumps(event) + "\n")
+            for event in events:
+                for callback in self.callbacks:
+                    callback(event)
+            if staged:
+                os.replace(staged, self.path(name, SCENES_FILE))
+        finally:
+            if staged and os.path.exists(staged):
+                os.remove(staged)
+
+        mark = self.state.get(name, {})
+        latest = max(seen + new, key=lambda x: x["sceneDate"], default=None)
+        if latest is not None:
+            mark.update(
+                sceneDate=latest["sceneDate"], granuleName=latest["granuleName"]
+            )
+        mark.update(polled=detected, scenes=len(seen) + len(new))
+        self.state[name] = mark
+        self.save()
+        print(f"{name}: {len(new)} new scenes, {len(events)} events")
+        return events
+
+    def poll(self):
+        """Search every AOI once, failed polls are retried on the next poll.
+
+        Returns
+        -------
+        events :  list
+            event dictionaries of all AOIs
+
+        """
+        events = []
+        for name in self.aois:
+            try:
+                events.extend(self.poll_once(name))
+            except PrepareError as e:
+                print(e)
+            except requests.RequestException as e:
+                print(f"Search for {name} failed: {e}")
+            except (ValueError, OSError) as e:
+                print(f"Polling {name} failed: {e}")
+        return events
+
+    def run(self, interval=3600, iterations=None, sleep=time.sleep):
+        """Poll every `interval` seconds, forever or `iterations` times."""
+        count = 0
+        while True:
+            self.poll()
+            count += 1
+            if iterations is not None and count >= iterations:
+                break
+            sleep(interval)
+
+    def prepare(self, name, events, scenes=None):
+        """Prepare each event's date with the previous dates of its orbit.
+
+        Pairs are prep stages of the Pipeline in the AOI directory, so a pair
+        is only rewritten if its frames changed. The prepared interferogram
+        directories are added to each event as `pairs`. Dates come from the
+        `scenes` file (default: scenes.json of the AOI). Raises PrepareError
+        if any pair fails.
+        """
+        try:
+            self._prepare(name, events, scenes)
+        except Exception as e:
+            raise PrepareError(f"Preparing pairs of {name} failed: {e}") from e
+
+    def _prepare(self, name, events, scenes):
+        import dinosar.isce as dice
+        from dinosar.pipeline import Pipeline, prep_pair
+
+        pipeline = Pipeline(self.path(name))
+        gf = asf.merge_inventories(scenes or self.path(name, SCENES_FILE))
+        gf["relativeOrbit"] = gf.relativeOrbit.astype("int")
+        inputDict = dice.load_defaultDict(self.template)
+        for event in events:
+            orbit = event["relativeOrbit"]
+            days = gf.loc[gf.relativeOrbit == orbit, "dateStamp"].dt.strftime("%Y%m%d")
+            dates = sorted(set(days))
+            previous = [day for day in dates if day < event["date"]]
+            event["pairs"] = [
+                prep_pair(
+                    pipeline,
+                    gf,
+                    event["date"],
+                    day,
+                    orbit,
+                    inputDict,
+                    self.poeorb,
+                    self.orbit_url,
+                )
+                for day in previous[-self.neighbors :]
+            ]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Predict runtime, memory and disk use of topsApp.py interferograms.
+
+Report costs for a network of pairs selected from an inventory, or for
+prepared int-* directories, and calibrate the cost model from finished runs.
+
+Example
+-------
+
+$ cost_topsApp.py -i query.geojson -p 64 -t topsApp-template.yml -n 3 -x 48
+
+$ cost_topsApp.py -d .
+
+$ cost_topsApp.py -c ./previous_runs
+
+Author: Scott Henderson (scottyh@uw.edu)
+"""
+import argparse
+import glob
+import os
+import sys
+import pandas as pd
+from dinosar.archive import asf
+import dinosar.isce as dice
+from dinosar.isce import cost
+
+
+def cmdLineParse():
+    """Command line parser."""
+    parser = argparse.ArgumentParser(description="predict topsApp.py job costs")
+    parser.add_argument(
+        "-i", type=str, dest="inventory", required=False, help="Inventory file"
+    )
+    parser.add_argument(
+        "-p", type=int, dest="path", required=False, help="Relative orbit number"
+    )
+    parser.add_argument(
+        "-t", type=str, dest="template", required=False, help="YAML template file"
+    )
+    parser.add_argument(
+        "-n",
+        type=int,
+        dest="neighbors",
+        required=False,
+        default=1,
+        help="Pair each date with this many following dates",
+    )
+    parser.add_argument(
+        "-x", type=int, dest="max_days", required=False, help="Max days between dates"
+    )
+    parser.add_argument(
+        "-d", type=str, dest="root", required=False, help="Report on int-* directories"
+    )
+    parser.add_argument(
+        "-c",
+        type=str,
+        dest="calibrate",
+        required=False,
+        help="Calibrate model from finished runs in this directory",
+    )
+    parser.add_argument(
+        "-m", type=str, dest="model", required=False, help="Cost model JSON file"
+    )
+    parser.add_argument(
+        "-o",
+        type=str,
+        dest="outname",
+        required=False,
+        default="cost_report.csv",
+        help="Output report (default: cost_report.csv)",
+    )
+
+    return parser
+
+
+def main():
+    """Run as a script with args coming from argparse."""
+    parser = cmdLineParse()
+    inps = parser.parse_args()
+
+    if inps.calibrate:
+        records = cost.record_runs(inps.calibrate)
+        model = cost.CostModel.fit(records)
+        model.save(inps.model)
+        return
+
+    model = cost.CostModel.load(inps.model)
+    if model.nruns == 0:
+        print("WARNING: cost model is not calibrated, run with '-c' first")
+
+    if inps.root:
+        intdirs = sorted(glob.glob(os.path.join(inps.root, "int-*")))
+        intdirs = [d for d in intdirs if os.path.isfile(f"{d}/topsApp.xml")]
+        rows = {os.path.basename(d): cost.features_from_intdir(d) for d in intdirs}
+        features = pd.DataFrame.from_dict(rows, orient="index")
+    elif inps.inventory and inps.path:
+        gf = asf.load_inventory(inps.inventory)
+        gf = gf[gf.relativeOrbit == inps.path]
+        dates = asf.acquisition_statistics(gf)[1]
+        pairs = asf.select_pairs(dates, inps.neighbors, inps.max_days)
+        topsinsar = dice.load_defaultDict(inps.template)["topsinsar"]
+        features = cost.network_features(gf, pairs, topsinsar)
+    else:
+        print("ERROR: requires '-d', '-c' or '-i' and '-p' arguments")
+        parser.print_help()
+        sys.exit(1)
+
+    if len(features) == 0:
+        print("No interferograms found")
+        sys.exit(1)
+    costs = model.predict(features)
+    report = features.join(costs)
+    report.to_csv(inps.outname)
+    cost.summarize_costs(costs)
+    print(f"Saved {inps.outname}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,10 @@ Date: 10/2017
 """
 
 import argparse
+import geopandas as gpd
 import dinosar.archive.asf as asf
+from dinosar.archive.coverage import AcquisitionMatrix, matrix_path
+from dinosar.archive.index import FootprintIndex, index_path
 import sys
 
 
@@ -32,6 +35,14 @@ def cmdLineParse():
     parser.add_argument(
         "-b", type=float, dest="buffer", required=False, help="Add buffer [in degrees]"
     )
+    parser.add_argument(
+        "-t",
+        action="store_true",
+        default=False,
+        dest="tight",
+        required=False,
+        help="Query with the polygon from '-i' instead of its bounding box",
+    )
     parser.add_argument(
         "-f",
         action="store_true",
@@ -40,6 +51,14 @@ def cmdLineParse():
         required=False,
         help="Create subfolders with geojson footprints",
     )
+    parser.add_argument(
+        "-g",
+        action="store_true",
+        default=False,
+        dest="gpkg",
+        required=False,
+        help="Save footprints to footprints.gpkg with a layer per orbit",
+    )
     parser.add_argument(
         "-o",
         type=str,
@@ -73,6 +92,30 @@ def cmdLineParse():
         help="Download metalink from ASF API",
     )
 
+    parser.add_argument(
+        "-a",
+        type=str,
+        dest="regions",
+        required=False,
+        help="Vector file with many regions of interest, save inventory for each",
+    )
+    parser.add_argument(
+        "-n",
+        type=str,
+        dest="name",
+        required=False,
+        default="name",
+        help="Attribute with unique region names for '-a' (default: name)",
+    )
+    parser.add_argument(
+        "-d",
+        type=float,
+        dest="distance",
+        required=False,
+        default=0.5,
+        help="Query regions within this distance together for '-a' [in degrees]",
+    )
+
     return parser
 
 
@@ -80,8 +123,15 @@ def main():
     """Run as a script with args coming from argparse."""
     parser = cmdLineParse()
     args = parser.parse_args()
+    if args.regions:
+        regions = gpd.read_file(args.regions)
+        asf.query_regions(
+            regions, name=args.name, distance=args.distance, orbit=args.orbit
+        )
+        return
+
     if not (args.roi or args.input):
-        print("ERROR: requires '-r' or '-i' argument")
+        print("ERROR: requires '-r', '-i' or '-a' argument")
         parser.print_help()
         sys.exit(1)
 
@@ -89,12 +139,19 @@ def main():
         args.roi = asf.ogr2snwe(args.input, args.buffer)
 
     asf.snwe2file(args.roi)
+    if args.input and args.tight:
+        args.roi = asf.ogr2geometry(args.input, args.buffer)
     asf.query_asf(args.roi, "SA", orbit=args.orbit)
     asf.query_asf(args.roi, "SB", orbit=args.orbit)
     gf = asf.merge_inventories("query_SA.json", "query_SB.json")
-    asf.summarize_inventory(gf)
-    asf.summarize_orbits(gf)
+    stats = asf.acquisition_statistics(gf)
+    asf.summarize_inventory(gf, stats)
+    asf.summarize_orbits(gf, stats)
+    AcquisitionMatrix.from_inventory(gf).save(matrix_path("query.geojson"))
     asf.save_inventory(gf)
+    # index rows in the order load_inventory() returns them
+    inventory = asf.load_inventory("query.geojson")
+    FootprintIndex.for_inventory(inventory, index_path("query.geojson"))
     if args.csvs:
         asf.query_asf(args.roi, "SA", "csv", orbit=args.orbit)
         asf.query_asf(args.roi, "SB", "csv", orbit=args.orbit)
@@ -106,6 +163,8 @@ def main():
         asf.query_asf(args.roi, "SB", "metalink", orbit=args.orbit)
     if args.footprints:
         asf.save_geojson_footprints(gf)
+    if args.gpkg:
+        asf.save_footprints(gf)
 
 
 if __name__ == "__main__":
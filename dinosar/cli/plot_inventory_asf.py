@@ -7,6 +7,7 @@ Date: 10/2017
 """
 
 import argparse
+import geopandas as gpd
 import dinosar.archive.plot as plot
 from dinosar.archive.asf import load_inventory
 
@@ -28,6 +29,45 @@ def cmdLineParse():
         required=False,
         help="Polygon defining region of interest",
     )
+    parser.add_argument(
+        "-a",
+        type=str,
+        dest="aggregate",
+        required=False,
+        metavar="FREQ",
+        help="Plot timeline as counts per time bin (e.g. W, M, Y) for large inventories",
+    )
+    parser.add_argument(
+        "-b",
+        type=str,
+        dest="batch",
+        required=False,
+        help="Vector file of regions of interest, save figures for each region",
+    )
+    parser.add_argument(
+        "-n",
+        type=str,
+        dest="name",
+        required=False,
+        default="name",
+        help="Attribute with unique region names for batch mode (default: name)",
+    )
+    parser.add_argument(
+        "-o",
+        type=str,
+        dest="outdir",
+        required=False,
+        default=".",
+        help="Output directory for batch mode",
+    )
+    parser.add_argument(
+        "-j",
+        type=int,
+        dest="processes",
+        required=False,
+        default=None,
+        help="Number of parallel processes for batch mode (default: all CPUs)",
+    )
 
     return parser
 
@@ -38,11 +78,26 @@ def main():
     parser = cmdLineParse()
     args = parser.parse_args()
     gf = load_inventory(args.input)
+    if args.batch:
+        aois = gpd.read_file(args.batch)
+        plot.plot_reports(
+            gf,
+            aois,
+            outdir=args.outdir,
+            name=args.name,
+            processes=args.processes,
+            freq=args.aggregate,
+        )
+        return
+
     w, s, e, n = gf.geometry.cascaded_union.bounds
     snwe = [s, n, w, e]
-    plat1, plat2 = gf.platform.unique()
     plot.plot_map(gf, snwe, args.polygon)
-    plot.plot_timeline(gf, plat1, plat2)
+    if args.aggregate:
+        plot.plot_timeline_binned(gf, args.aggregate)
+    else:
+        plat1, plat2 = gf.platform.unique()
+        plot.plot_timeline(gf, plat1, plat2)
     print("Saved map.pdf and timeline.pdf figures")
 
 
@@ -111,47 +111,22 @@ def main():
     inps = parser.parse_args()
     gf = asf.load_inventory(inps.inventory)
 
-    if inps.template:
-        print(f"Reading from template file: {inps.template}...")
-        inputDict = dice.read_yaml_template(inps.template)
-    else:
-        inputDict = {
-            "topsinsar": {
-                "sensorname": "SENTINEL1",
-                "reference": {"safe": ""},
-                "secondary": {"safe": ""},
-            }
-        }
+    inputDict = dice.load_defaultDict(inps.template)
 
     intdir = "int-{0}-{1}".format(inps.reference, inps.secondary)
-    if not os.path.isdir(intdir):
-        os.mkdir(intdir)
-    os.chdir(intdir)
-
     reference_urls = asf.get_slc_urls(gf, inps.reference, inps.path)
     secondary_urls = asf.get_slc_urls(gf, inps.secondary, inps.path)
-    downloadList = reference_urls + secondary_urls
-    inps.reference_scenes = [os.path.basename(x) for x in reference_urls]
-    inps.secondary_scenes = [os.path.basename(x) for x in secondary_urls]
-
+    orbit_urls = []
     if inps.poeorb:
         try:
-            frame = os.path.basename(inps.reference_scenes[0])
-            downloadList.append(asf.get_orbit_url(frame))
-            frame = os.path.basename(inps.secondary_scenes[0])
-            downloadList.append(asf.get_orbit_url(frame))
+            for urls in (reference_urls, secondary_urls):
+                orbit_urls.append(asf.get_orbit_url(os.path.basename(urls[0])))
         except Exception as e:
             print("Trouble downloading POEORB... maybe scene is too recent?")
             print("Falling back to using header orbits")
             print(e)
-            inps.poeorb = False
-            pass
-
-    # Update input dictionary with argparse inputs
-    inputDict["topsinsar"]["reference"]["safe"] = inps.reference_scenes
-    inputDict["topsinsar"]["reference"]["output directory"] = "referencedir"
-    inputDict["topsinsar"]["secondary"]["safe"] = inps.secondary_scenes
-    inputDict["topsinsar"]["secondary"]["output directory"] = "secondarydir"
+            orbit_urls = []
+
     # Optional inputs
     # swaths, poeorb, dem, roi, gbox, alooks, rlooks, filtstrength
     if inps.swaths:
@@ -169,10 +144,7 @@ def main():
     if inps.rlooks:
         inputDict["topsinsar"]["rangelooks"] = inps.rlooks
     print(inputDict)
-    xml = dice.dict2xml(inputDict)
-    dice.write_xml(xml)
-    # Create a download file
-    asf.write_download_urls(downloadList)
+    dice.prep_topsapp(inputDict, reference_urls, secondary_urls, intdir, orbit_urls)
     print(f"Generated download-links.txt and topsApp.xml in {intdir}")
 
 
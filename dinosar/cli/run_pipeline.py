@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Query, prepare, download and process interferograms in a project directory.
+
+Completed stages are recorded in pipeline-state.json, so running the same
+command again only does work that is missing or whose inputs changed.
+
+Example
+-------
+
+$ run_pipeline.py -d uniongap -r 46.45 46.55 -120.53 -120.43 -p 64 -n 2
+
+$ run_pipeline.py -d uniongap -r 46.45 46.55 -120.53 -120.43 -p 64 -n 2 -g -s
+
+$ run_pipeline.py -d uniongap -l
+
+Author: Scott Henderson (scottyh@uw.edu)
+"""
+import argparse
+import sys
+from dinosar.archive import asf
+from dinosar.pipeline import Pipeline, run_project
+
+
+def cmdLineParse():
+    """Command line parser."""
+    parser = argparse.ArgumentParser(description="resumable dinosar pipeline")
+    parser.add_argument(
+        "-d", type=str, dest="root", required=True, help="Project directory"
+    )
+    parser.add_argument(
+        "-r",
+        type=float,
+        nargs=4,
+        dest="roi",
+        required=False,
+        metavar=("S", "N", "W", "E"),
+        help="Region of interest bbox [S,N,W,E]",
+    )
+    parser.add_argument(
+        "-i",
+        type=str,
+        dest="input",
+        required=False,
+        help="Polygon vector file defining region of interest",
+    )
+    parser.add_argument(
+        "-b", type=float, dest="buffer", required=False, help="Add buffer [in degrees]"
+    )
+    parser.add_argument(
+        "-p", type=int, dest="path", required=False, help="Relative orbit number"
+    )
+    parser.add_argument(
+        "-t", type=str, dest="template", required=False, help="YAML template file"
+    )
+    parser.add_argument(
+        "-n",
+        type=int,
+        dest="neighbors",
+        required=False,
+        default=1,
+        help="Pair each date with this many following dates",
+    )
+    parser.add_argument(
+        "-x", type=int, dest="max_days", required=False, help="Max days between dates"
+    )
+    parser.add_argument(
+        "-g",
+        action="store_true",
+        default=False,
+        dest="download",
+        required=False,
+        help="Download SLCs and orbits",
+    )
+    parser.add_argument(
+        "-s",
+        action="store_true",
+        default=False,
+        dest="process",
+        required=False,
+        help="Run topsApp.py (implies '-g')",
+    )
+    parser.add_argument(
+        "-u",
+        action="store_true",
+        default=False,
+        dest="refresh",
+        required=False,
+        help="Repeat the ASF search to find new acquisitions",
+    )
+    parser.add_argument(
+        "-l",
+        action="store_true",
+        default=False,
+        dest="status",
+        required=False,
+        help="List finished stages and exit",
+    )
+
+    return parser
+
+
+def main():
+    """Run as a script with args coming from argparse."""
+    parser = cmdLineParse()
+    inps = parser.parse_args()
+    if inps.status:
+        print(Pipeline(inps.root).status().to_string())
+        return
+
+    if inps.input:
+        roi = asf.ogr2geometry(inps.input, inps.buffer)
+    elif inps.roi:
+        roi = inps.roi
+    else:
+        print("ERROR: requires '-r' or '-i' argument")
+        parser.print_help()
+        sys.exit(1)
+
+    run_project(
+        inps.root,
+        roi,
+        orbit=inps.path,
+        template=inps.template,
+        neighbors=inps.neighbors,
+        max_days=inps.max_days,
+        download=inps.download,
+        process=inps.process,
+        refresh=inps.refresh,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Run topsApp.py in prepared interferogram directories on local machine.
+
+Jobs are started whenever enough cores and memory are free, and progress is
+saved to scheduler-state.json so an interrupted run can be restarted.
+
+Example
+-------
+
+$ run_topsApp_local.py -d . -c 16 -m 64
+
+Author: Scott Henderson (scottyh@uw.edu)
+"""
+import argparse
+import sys
+from dinosar.isce.scheduler import Scheduler, discover_jobs
+
+
+def cmdLineParse():
+    """Command line parser."""
+    parser = argparse.ArgumentParser(description="run many ISCE topsApp.py jobs")
+    parser.add_argument(
+        "-d",
+        type=str,
+        dest="root",
+        required=False,
+        default=".",
+        help="Directory containing int-* directories",
+    )
+    parser.add_argument(
+        "-c", type=int, dest="cores", required=False, help="Number of cores to use"
+    )
+    parser.add_argument(
+        "-m", type=float, dest="memory", required=False, help="Memory to use [in GB]"
+    )
+    parser.add_argument(
+        "-t", type=float, dest="timeout", required=False, help="Job timeout [in s]"
+    )
+    parser.add_argument(
+        "-r",
+        type=int,
+        dest="retries",
+        required=False,
+        default=0,
+        help="Number of times to retry failed jobs",
+    )
+    parser.add_argument(
+        "-x",
+        type=str,
+        dest="command",
+        required=False,
+        default="topsApp.py --steps",
+        help="Command run in each directory (default: 'topsApp.py --steps')",
+    )
+
+    return parser
+
+
+def main():
+    """Run as a script with args coming from argparse."""
+    parser = cmdLineParse()
+    inps = parser.parse_args()
+    jobs = discover_jobs(inps.root)
+    if not jobs:
+        print(f"ERROR: no int-*/topsApp.xml found in {inps.root}")
+        sys.exit(1)
+    memory = inps.memory * 1e9 if inps.memory else None
+    scheduler = Scheduler(
+        jobs,
+        cores=inps.cores,
+        memory=memory,
+        command=inps.command.split(),
+        timeout=inps.timeout,
+        retries=inps.retries,
+    )
+    failed = scheduler.run()
+    if failed:
+        print("Failed jobs: " + " ".join(job.name for job in failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Serve inventories and the precise orbit catalog over local HTTP.
+
+Inventories are loaded once, kept in memory and reloaded when the files
+change. Query with dinosar.archive.service.InventoryClient, or e.g.
+curl 'http://127.0.0.1:8765/urls?date=20180320&orbit=120'
+
+Example
+-------
+
+$ serve_inventory.py -i query.geojson -c poeorb.txt
+
+Author: Scott Henderson (scottyh@uw.edu)
+"""
+import argparse
+import time
+from dinosar.archive import service
+
+
+def cmdLineParse():
+    """Command line parser."""
+    parser = argparse.ArgumentParser(description="serve dinosar inventories")
+    parser.add_argument(
+        "-i",
+        type=str,
+        nargs="+",
+        dest="inventories",
+        required=True,
+        help="Inventory files (query.geojson)",
+    )
+    parser.add_argument(
+        "-c",
+        type=str,
+        dest="catalog",
+        required=False,
+        help="Text file listing precise orbit file names",
+    )
+    parser.add_argument(
+        "-a",
+        type=str,
+        dest="host",
+        required=False,
+        default="127.0.0.1",
+        help="Address to listen on (default: 127.0.0.1)",
+    )
+    parser.add_argument(
+        "-p",
+        type=int,
+        dest="port",
+        required=False,
+        default=service.DEFAULT_PORT,
+        help=f"Port to listen on (default: {service.DEFAULT_PORT})",
+    )
+    parser.add_argument(
+        "-w",
+        type=float,
+        dest="interval",
+        required=False,
+        default=1.0,
+        help="Seconds between checks for changed files (default: 1)",
+    )
+
+    return parser
+
+
+def main():
+    """Run as a script with args coming from argparse."""
+    parser = cmdLineParse()
+    inps = parser.parse_args()
+    inventories = service.InventoryService(inps.inventories, inps.catalog)
+    server = service.start_server(inventories, inps.host, inps.port, inps.interval)
+    print(f"Serving on http://{inps.host}:{server.server_port} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        inventories.close()
+
+
+if __name__ == "__main__":
+    main()
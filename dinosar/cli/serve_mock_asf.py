@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Serve a synthetic Sentinel-1 archive like the ASF search API.
+
+Scenes are generated for a region and time span, and served with the precise
+orbit listing and SLC downloads for testing queries and downloads offline
+(pass the printed urls as `baseurl` of asf.query_asf() and `url` of
+asf.get_orbit_url()).
+
+Example
+-------
+
+$ serve_mock_asf.py -r 46.45 46.55 -120.53 -120.43 -s 2018-01-01 -e 2018-12-31
+
+$ serve_mock_asf.py -r 46.45 46.55 -120.53 -120.43 -s 2018-01-01 -l 0.5 -g 100 -x 0.1
+
+$ serve_mock_asf.py -r 46.45 46.55 -120.53 -120.43 -s 2015-01-01 -w query.json
+
+Author: Scott Henderson (scottyh@uw.edu)
+"""
+import argparse
+import time
+from dinosar.archive import synthetic
+
+DEFAULT_PORT = 8766
+
+
+def cmdLineParse():
+    """Command line parser."""
+    parser = argparse.ArgumentParser(description="serve a synthetic ASF archive")
+    parser.add_argument(
+        "-r",
+        type=float,
+        nargs=4,
+        dest="roi",
+        required=True,
+        metavar=("S", "N", "W", "E"),
+        help="Region of interest bbox [S,N,W,E]",
+    )
+    parser.add_argument(
+        "-s", type=str, dest="start", required=True, help="First date (YYYY-MM-DD)"
+    )
+    parser.add_argument(
+        "-e", type=str, dest="stop", required=False, help="Last date (YYYY-MM-DD)"
+    )
+    parser.add_argument(
+        "-o",
+        type=int,
+        nargs="+",
+        dest="orbits",
+        required=False,
+        help="Relative orbits (default: all over the region)",
+    )
+    parser.add_argument(
+        "-m",
+        type=float,
+        dest="missing",
+        required=False,
+        default=0.0,
+        help="Fraction of frames left out",
+    )
+    parser.add_argument(
+        "-u",
+        type=float,
+        dest="duplicates",
+        required=False,
+        default=0.0,
+        help="Fraction of frames with a reprocessed duplicate",
+    )
+    parser.add_argument(
+        "-l",
+        type=float,
+        dest="latency",
+        required=False,
+        default=0.0,
+        help="Seconds added to every response",
+    )
+    parser.add_argument(
+        "-g",
+        type=int,
+        dest="page_size",
+        required=False,
+        help="Largest number of scenes per search response",
+    )
+    parser.add_argument(
+        "-x",
+        type=float,
+        dest="error_rate",
+        required=False,
+        default=0.0,
+        help="Fraction of requests answered with HTTP 503",
+    )
+    parser.add_argument(
+        "-a",
+        type=str,
+        dest="host",
+        required=False,
+        default="127.0.0.1",
+        help="Address to listen on (default: 127.0.0.1)",
+    )
+    parser.add_argument(
+        "-p",
+        type=int,
+        dest="port",
+        required=False,
+        default=DEFAULT_PORT,
+        help=f"Port to listen on (default: {DEFAULT_PORT})",
+    )
+    parser.add_argument(
+        "-w",
+        type=str,
+        dest="outname",
+        required=False,
+        help="Save the scenes as an ASF json query and exit",
+    )
+
+    return parser
+
+
+def main():
+    """Run as a script with args coming from argparse."""
+    inps = cmdLineParse().parse_args()
+    scenes = synthetic.synthetic_scenes(
+        inps.roi,
+        inps.start,
+        inps.stop,
+        orbits=inps.orbits,
+        missing=inps.missing,
+        duplicates=inps.duplicates,
+    )
+    print(f"Generated {len(scenes)} scenes")
+    if inps.outname:
+        synthetic.save_scenes(scenes, inps.outname)
+        print(f"Saved {inps.outname}")
+        return
+
+    days = sorted(scene["startTime"][:10] for scene in scenes)
+    orbit_files = synthetic.synthetic_orbit_files(days[0], days[-1]) if days else []
+    archive = synthetic.MockArchive(
+        scenes,
+        orbit_files,
+        latency=inps.latency,
+        page_size=inps.page_size,
+        error_rate=inps.error_rate,
+    )
+    server = synthetic.start_mock_server(archive, inps.host, inps.port)
+    print(f"Search API: {archive.search_url}")
+    print(f"Precise orbits: {archive.orbit_url}")
+    print("Serving (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Pack prepared interferogram directories into balanced array-job shards.
+
+Writes shard-NNN.txt manifests, shards.json and run_shard.sh to the output
+directory. Submit run_shard.sh as an array job with one element per shard.
+
+Example
+-------
+
+$ shard_topsApp.py -d . -n 50 -o shards
+
+$ sbatch --array=0-49 shards/run_shard.sh
+
+Author: Scott Henderson (scottyh@uw.edu)
+"""
+import argparse
+import sys
+from dinosar.isce import shard
+from dinosar.isce.cost import CostModel
+
+
+def cmdLineParse():
+    """Command line parser."""
+    parser = argparse.ArgumentParser(description="split topsApp.py jobs into shards")
+    parser.add_argument(
+        "-d",
+        type=str,
+        dest="root",
+        required=False,
+        default=".",
+        help="Directory containing int-* directories",
+    )
+    parser.add_argument(
+        "-n", type=int, dest="nshards", required=True, help="Number of shards"
+    )
+    parser.add_argument(
+        "-o",
+        type=str,
+        dest="outdir",
+        required=False,
+        default="shards",
+        help="Output directory (default: shards)",
+    )
+    parser.add_argument(
+        "-m",
+        action="store_true",
+        dest="model",
+        required=False,
+        help="Balance predicted wall time of the saved cost model",
+    )
+
+    return parser
+
+
+def main():
+    """Run as a script with args coming from argparse."""
+    parser = cmdLineParse()
+    inps = parser.parse_args()
+    cost = shard.model_cost(CostModel.load()) if inps.model else shard.job_cost
+    costs = shard.estimate_costs(inps.root, cost=cost)
+    if len(costs) == 0:
+        print(f"ERROR: no int-*/topsApp.xml found in {inps.root}")
+        sys.exit(1)
+    shards = shard.pack_shards(costs, inps.nshards)
+    summary = shard.write_manifests(shards, costs, inps.outdir)
+    shard.summarize_shards(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Watch ASF for new acquisitions and optionally prepare new pairs.
+
+Each poll searches only for scenes newer than the latest one seen for each
+area of interest, prints an event (JSON) for every new date, appends it to
+{root}/{aoi}/events.jsonl and with '-n' prepares pairs with previous dates.
+
+Example
+-------
+
+$ watch_asf.py -d watch -a uniongap -r 46.45 46.55 -120.53 -120.43 -p 64
+
+$ watch_asf.py -d watch -f aois.yml -n 2 -w 3600
+
+$ watch_asf.py -d watch -f aois.yml -n 2 --poeorb
+
+Author: Scott Henderson (scottyh@uw.edu)
+"""
+import argparse
+import json
+import sys
+from dinosar.archive import asf
+from dinosar.archive.watch import Watcher, load_aois
+
+
+def cmdLineParse():
+    """Command line parser."""
+    parser = argparse.ArgumentParser(description="watch ASF for new acquisitions")
+    parser.add_argument(
+        "-d", type=str, dest="root", required=True, help="State directory"
+    )
+    parser.add_argument(
+        "-f", type=str, dest="config", required=False, help="YAML file of AOIs"
+    )
+    parser.add_argument(
+        "-a", type=str, dest="name", required=False, default="aoi", help="AOI name"
+    )
+    parser.add_argument(
+        "-r",
+        type=float,
+        nargs=4,
+        dest="roi",
+        required=False,
+        metavar=("S", "N", "W", "E"),
+        help="Region of interest bbox [S,N,W,E]",
+    )
+    parser.add_argument(
+        "-i",
+        type=str,
+        dest="input",
+        required=False,
+        help="Polygon vector file defining region of interest",
+    )
+    parser.add_argument(
+        "-b", type=float, dest="buffer", required=False, help="Add buffer [in degrees]"
+    )
+    parser.add_argument(
+        "-p", type=int, dest="path", required=False, help="Relative orbit number"
+    )
+    parser.add_argument(
+        "-n",
+        type=int,
+        dest="neighbors",
+        required=False,
+        default=0,
+        help="Prepare new dates with this many previous dates",
+    )
+    parser.add_argument(
+        "-t", type=str, dest="template", required=False, help="YAML template file"
+    )
+    parser.add_argument(
+        "-o",
+        "--poeorb",
+        action="store_true",
+        default=False,
+        dest="poeorb",
+        required=False,
+        help="Look for precise orbits when preparing (default: header orbits)",
+    )
+    parser.add_argument(
+        "-w",
+        type=float,
+        dest="interval",
+        required=False,
+        help="Keep polling every this many seconds (default: poll once)",
+    )
+    parser.add_argument(
+        "-l",
+        type=float,
+        dest="lag",
+        required=False,
+        default=1,
+        help="Days before the latest scene to search again for late frames",
+    )
+    parser.add_argument(
+        "-e",
+        action="store_true",
+        default=False,
+        dest="backfill",
+        required=False,
+        help="Emit events for scenes found by the first search",
+    )
+
+    return parser
+
+
+def main():
+    """Run as a script with args coming from argparse."""
+    parser = cmdLineParse()
+    inps = parser.parse_args()
+    if inps.config:
+        aois = load_aois(inps.config)
+    elif inps.input:
+        roi = asf.ogr2geometry(inps.input, inps.buffer)
+        aois = {inps.name: dict(roi=roi, orbit=inps.path)}
+    elif inps.roi:
+        aois = {inps.name: dict(roi=inps.roi, orbit=inps.path)}
+    else:
+        print("ERROR: requires '-f', '-r' or '-i' argument")
+        parser.print_help()
+        sys.exit(1)
+
+    watcher = Watcher(
+        aois,
+        root=inps.root,
+        lag=inps.lag,
+        backfill=inps.backfill,
+        neighbors=inps.neighbors,
+        template=inps.template,
+        poeorb=inps.poeorb,
+        on_event=lambda event: print(json.dumps(event), flush=True),
+    )
+    if inps.interval:
+        watcher.run(inps.interval)
+    else:
+        watcher.poll()
+
+
+if __name__ == "__main__":
+    main()
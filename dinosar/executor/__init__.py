@@ -0,0 +1,272 @@
+"""Run external commands with timeouts, logs and bounded parallelism.
+
+dinosar drives many external tools (wget, aws s3 sync, GDAL, topsApp.py).
+Commands run through `run()` have their combined stdout/stderr streamed to
+the screen and/or a log file while also being captured, are killed (with any
+child processes) after an optional timeout, and return a `Result` with the
+exit code, wall time and peak memory use. Failures raise `CommandError` so
+pipelines stop or react instead of silently continuing.
+
+Notes
+-----
+Run many commands concurrently with an `Executor`::
+
+    with Executor(max_workers=4, log_dir="logs") as ex:
+        results = ex.map(["wget -nc -c url1", "wget -nc -c url2"], timeout=3600)
+
+"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import (
+    ALL_COMPLETED,
+    FIRST_EXCEPTION,
+    ThreadPoolExecutor,
+    wait,
+)
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+RSS_BYTES = 1 if sys.platform == "darwin" else 1024
+
+Result = namedtuple(
+    "Result", ["cmd", "returncode", "wall_time", "max_rss", "output", "log"]
+)
+Result.__doc__ = """Outcome of a finished command.
+
+cmd : command as displayed (secrets redacted), returncode : exit code
+(negative signal number if killed), wall_time : seconds, max_rss : peak
+resident memory of the command and its children in bytes, output : captured
+stdout and stderr, log : path to log file or None
+"""
+
+
+class CommandError(RuntimeError):
+    """Command exited with a non-zero status."""
+
+    def __init__(self, result):
+        self.result = result
+        tail = "\n".join(result.output.splitlines()[-20:])
+        super().__init__(
+            f"Command '{result.cmd}' returned {result.returncode} "
+            f"after {result.wall_time:.1f}s\n{tail}"
+        )
+
+
+class CommandTimeout(CommandError):
+    """Command was killed after exceeding its timeout."""
+
+    def __init__(self, result, timeout):
+        self.timeout = timeout
+        self.result = result
+        RuntimeError.__init__(
+            self, f"Command '{result.cmd}' timed out after {timeout}s"
+        )
+
+
+def _exit_code(status):
+    """Exit code from a wait status, negative signal number if killed."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _kill(process):
+    """Kill a process and everything in its process group."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run(
+    cmd,
+    timeout=None,
+    log=None,
+    echo=True,
+    check=True,
+    cwd=None,
+    env=None,
+    display=None,
+):
+    """Run an external command.
+
+    Parameters
+    ----------
+    cmd : str or list
+        shell command string, or list of program arguments (no shell)
+    timeout : float
+        seconds before the command and its children are killed
+    log : str
+        file to write command output to (appended)
+    echo : bool
+        print command output as it is produced
+    check : bool
+        raise CommandError for non-zero exit codes
+    cwd : str
+        working directory for the command
+    env : dict
+        environment variables for the command (default: inherited)
+    display : str
+        text printed and recorded instead of `cmd` (e.g. to hide passwords)
+
+    Returns
+    -------
+    result :  Result
+        exit code, wall time, peak memory and captured output
+
+    """
+    shell = isinstance(cmd, str)
+    if display is None:
+        display = cmd if shell else subprocess.list2cmdline(cmd)
+    print(display)
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        cmd,
+        shell=shell,
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    timer = None
+    expired = threading.Event()
+    if timeout is not None:
+
+        def expire():
+            expired.set()
+            _kill(process)
+
+        timer = threading.Timer(timeout, expire)
+        timer.daemon = True
+        timer.start()
+
+    lines = []
+    logfile = open(log, "a") if log else None
+    try:
+        if logfile:
+            logfile.write(f"$ {display}\n")
+        for raw in process.stdout:
+            line = raw.decode(errors="replace")
+            lines.append(line)
+            if echo:
+                sys.stdout.write(line)
+            if logfile:
+                logfile.write(line)
+                logfile.flush()
+        pid, status, usage = os.wait4(process.pid, 0)
+        process.returncode = _exit_code(status)
+    except BaseException:
+        _kill(process)
+        raise
+    finally:
+        if timer is not None:
+            timer.cancel()
+        process.stdout.close()
+        if logfile:
+            logfile.close()
+
+    result = Result(
+        display,
+        process.returncode,
+        time.perf_counter() - start,
+        usage.ru_maxrss * RSS_BYTES,
+        "".join(lines),
+        log,
+    )
+    if expired.is_set():
+        raise CommandTimeout(result, timeout)
+    if check and result.returncode != 0:
+        raise CommandError(result)
+
+    return result
+
+
+class Executor:
+    """Run commands concurrently with a bounded number of workers.
+
+    Parameters
+    ----------
+    max_workers : int
+        maximum number of commands running at once
+    log_dir : str
+        directory for per-command log files (named after each command's
+        `name`, or its position), None to only capture output
+    echo : bool
+        print command output as it is produced
+
+    """
+
+    def __init__(self, max_workers=4, log_dir=None, echo=False):
+        self.max_workers = max_workers
+        self.log_dir = log_dir
+        self.echo = echo
+        self._pool = ThreadPoolExecutor(max_workers)
+        self._count = 0
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown(wait=exc[0] is None)
+
+    def shutdown(self, wait=True):
+        """Stop accepting commands (and cancel pending ones if wait=False)."""
+        if sys.version_info >= (3, 9):
+            self._pool.shutdown(wait=wait, cancel_futures=not wait)
+        else:
+            self._pool.shutdown(wait=wait)
+
+    def submit(self, cmd, name=None, **kwargs):
+        """Schedule a command, returns a Future for its Result.
+
+        Keyword arguments are passed to run().
+        """
+        if name is None:
+            name = f"{self._count:04d}"
+        self._count += 1
+        if self.log_dir and "log" not in kwargs:
+            kwargs["log"] = os.path.join(self.log_dir, f"{name}.log")
+        kwargs.setdefault("echo", self.echo)
+        return self._pool.submit(run, cmd, **kwargs)
+
+    def map(self, cmds, names=None, fail_fast=True, **kwargs):
+        """Run commands concurrently and return their results in order.
+
+        Parameters
+        ----------
+        cmds : list
+            commands (see run())
+        names : list
+            names for log files (default: position)
+        fail_fast : bool
+            cancel commands that haven't started once one fails
+        kwargs :
+            passed to run() (e.g. timeout, check)
+
+        Returns
+        -------
+        results :  list
+            Result of each command
+
+        """
+        names = names or [None] * len(cmds)
+        futures = [self.submit(c, n, **kwargs) for c, n in zip(cmds, names)]
+        done, pending = wait(
+            futures, return_when=FIRST_EXCEPTION if fail_fast else ALL_COMPLETED
+        )
+        for future in pending:
+            future.cancel()
+        wait(pending)
+        for future in futures:
+            if not future.cancelled() and future.exception() is not None:
+                raise future.exception()
+        return [future.result() for future in futures]
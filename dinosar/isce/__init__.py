@@ -13,10 +13,8 @@ functions borrow from example applications distributed with ISCE.
 # import matplotlib
 # matplotlib.use("Agg") # Necessary for basic OS (e.g. minimal docker images)
 
-import matplotlib.pyplot as plt
-import matplotlib.colors as colors
-import matplotlib.cm as cmx
-import numpy as np
+# NOTE: matplotlib and numpy are imported inside the colormap functions so that
+# writing topsApp.xml (e.g. prep_topsApp_local) doesn't pay their import time
 import yaml
 import os
 
@@ -80,6 +78,46 @@ def load_defaultDict(template):
     return inputDict
 
 
+def prep_topsapp(inputDict, reference_urls, secondary_urls, intdir, extra_urls=()):
+    """Write topsApp.xml and download-links.txt to an interferogram directory.
+
+    Parameters
+    ----------
+    inputDict : dict
+        topsApp settings (e.g. from load_defaultDict()), not modified
+    reference_urls : list
+        download urls of the reference frames
+    secondary_urls : list
+        download urls of the secondary frames
+    intdir : str
+        interferogram directory, created if needed
+    extra_urls : list
+        other files to download (e.g. precise orbits)
+
+    Returns
+    -------
+    downloadList :  list
+        all download urls
+
+    """
+    import copy
+
+    os.makedirs(intdir, exist_ok=True)
+    inputDict = copy.deepcopy(inputDict)
+    topsinsar = inputDict["topsinsar"]
+    topsinsar.setdefault("reference", {})
+    topsinsar.setdefault("secondary", {})
+    topsinsar["reference"]["safe"] = [os.path.basename(x) for x in reference_urls]
+    topsinsar["reference"]["output directory"] = "referencedir"
+    topsinsar["secondary"]["safe"] = [os.path.basename(x) for x in secondary_urls]
+    topsinsar["secondary"]["output directory"] = "secondarydir"
+    write_xml(dict2xml(inputDict), os.path.join(intdir, "topsApp.xml"))
+    downloadList = list(reference_urls) + list(secondary_urls) + list(extra_urls)
+    with open(os.path.join(intdir, "download-links.txt"), "w") as f:
+        f.write("\n".join(downloadList))
+    return downloadList
+
+
 def write_cmap(outname, vals, scalarMap):
     """Write external cpt colormap file based on matplotlib colormap.
 
@@ -127,6 +165,11 @@ def make_amplitude_cmap(
         number of discrete mapped values between vmin and vmax
 
     """
+    import matplotlib.pyplot as plt
+    import matplotlib.colors as colors
+    import matplotlib.cm as cmx
+    import numpy as np
+
     cmap = plt.get_cmap(mapname)
     # NOTE for strong contrast amp return:
     # cNorm = colors.Normalize(vmin=1e3, vmax=1e4)
@@ -165,6 +208,11 @@ def make_wrapped_phase_cmap(
         number of radians per phase cycle
 
     """
+    import matplotlib.pyplot as plt
+    import matplotlib.colors as colors
+    import matplotlib.cm as cmx
+    import numpy as np
+
     cmap = plt.get_cmap(mapname)
     cNorm = colors.Normalize(vmin=0, vmax=1)  # re-wrapping normalization
     scalarMap = cmx.ScalarMappable(norm=cNorm, cmap=cmap)
@@ -204,6 +252,11 @@ def make_coherence_cmap(
         number of discrete mapped values between vmin and vmax
 
     """
+    import matplotlib.pyplot as plt
+    import matplotlib.colors as colors
+    import matplotlib.cm as cmx
+    import numpy as np
+
     cmap = plt.get_cmap(mapname)
     cNorm = colors.Normalize(vmin=vmin, vmax=vmax)
     scalarMap = cmx.ScalarMappable(norm=cNorm, cmap=cmap)
@@ -0,0 +1,354 @@
+"""Predict runtime, memory and disk use of topsApp.py interferogram jobs.
+
+Job cost is modeled as linear in a few features derived from what the
+inventory and topsApp configuration already hold. The amount of data
+processed (`volume`) is the number of frames times subswaths, scaled by
+the fraction of the frames inside the region of interest. That volume is
+multiplied by the relative number of output pixels (`resolution`, from the
+azimuth and range looks) and by the relative cost of the unwrapper::
+
+    cost = c0 + c1 * volume + c2 * volume * resolution
+           + c3 * volume * resolution * unwrap
+
+Uncalibrated coefficients are rough guesses. `CostModel.fit()` replaces them
+with a least-squares fit to recorded runs (see `record_runs()`), and the
+fit is saved locally (~/.cache/dinosar/cost-model.json by default).
+
+Notes
+-----
+Calibrate from finished scheduler runs and predict a whole network::
+
+    model = CostModel.fit(record_runs("."))
+    model.save()
+    report = model.predict(network_features(gf, pairs, inputDict))
+
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+from dinosar import get_cache_dir
+from dinosar.isce.scheduler import ISCE_DEFAULT_LOOKS, STATE_FILE, read_topsapp_xml
+
+TARGETS = ("wall_time", "max_rss", "output_bytes", "scratch_bytes")
+TERMS = ("constant", "volume", "pixels", "unwrap")
+# Approximate area of a Sentinel-1 IW frame in square degrees
+FRAME_AREA = 2.5 * 1.8
+# Unwrapping cost relative to snaphu
+UNWRAP_COST = {"snaphu_mcf": 1.0, "snaphu": 1.0, "icu": 0.2, "grass": 0.2}
+DEFAULT_COEFFICIENTS = {
+    "wall_time": [300.0, 240.0, 20.0, 60.0],
+    "max_rss": [2e9, 7.5e8, 2e7, 6e7],
+    "output_bytes": [1e8, 1e8, 5e7, 1e7],
+    "scratch_bytes": [1e9, 8e9, 2e8, 5e7],
+}
+
+
+def default_model_path():
+    """Path of the locally stored cost model fit (see dinosar.get_cache_dir())."""
+    return os.path.join(get_cache_dir(), "cost-model.json")
+
+
+def features(
+    frames,
+    swaths=3,
+    roi_fraction=1.0,
+    looks=(7, 19),
+    unwrapper="snaphu_mcf",
+    dounwrap=True,
+):
+    """Cost model features of a single interferogram job.
+
+    Parameters
+    ----------
+    frames : int
+        total number of reference and secondary frames
+    swaths : int
+        number of subswaths processed
+    roi_fraction : float
+        fraction of the frames inside the region of interest
+    looks : tuple
+        (azimuth looks, range looks)
+    unwrapper : str
+        unwrapper name (e.g. 'snaphu_mcf', 'icu')
+    dounwrap : bool
+        whether the interferogram is unwrapped
+
+    Returns
+    -------
+    features :  dict
+        frames, swaths, roi_fraction, looks, volume, resolution and unwrap
+
+    """
+    nlooks = looks[0] * looks[1]
+    volume = frames * swaths * min(max(roi_fraction, 0.0), 1.0)
+    unwrap = UNWRAP_COST.get(unwrapper, 1.0) if dounwrap else 0.0
+    return dict(
+        frames=frames,
+        swaths=swaths,
+        roi_fraction=roi_fraction,
+        looks=nlooks,
+        volume=volume,
+        resolution=ISCE_DEFAULT_LOOKS / nlooks,
+        unwrap=unwrap,
+    )
+
+
+def _roi_area(snwe):
+    """Area of a [south, north, west, east] box in square degrees."""
+    south, north, west, east = snwe
+    return abs(north - south) * abs(east - west)
+
+
+def features_from_config(topsinsar, frames, frame_area=None):
+    """Cost model features from a topsApp configuration dictionary.
+
+    Parameters
+    ----------
+    topsinsar : dict
+        topsinsar settings (e.g. read_yaml_template()['topsinsar'] or
+        read_topsapp_xml() properties)
+    frames : int
+        total number of reference and secondary frames
+    frame_area : float
+        area covered by the reference frames in square degrees (default:
+        frames / 2 * FRAME_AREA)
+
+    Returns
+    -------
+    features :  dict
+
+    """
+    swaths = topsinsar.get("swaths") or [1, 2, 3]
+    swaths = len(swaths) if isinstance(swaths, (list, tuple)) else 1
+    if frame_area is None:
+        frame_area = max(frames, 2) / 2 * FRAME_AREA
+    roi = topsinsar.get("regionofinterest")
+    roi_fraction = _roi_area(roi) / frame_area if roi else 1.0
+    dounwrap = topsinsar.get("dounwrap", True)
+    if isinstance(dounwrap, str):
+        dounwrap = dounwrap.lower() == "true"
+    return features(
+        frames,
+        swaths,
+        roi_fraction,
+        (topsinsar.get("azimuthlooks", 7), topsinsar.get("rangelooks", 19)),
+        topsinsar.get("unwrappername", "snaphu_mcf"),
+        dounwrap,
+    )
+
+
+def features_from_intdir(intdir):
+    """Cost model features of a prepared interferogram directory."""
+    props = read_topsapp_xml(os.path.join(intdir, "topsApp.xml"))
+    frames = 0
+    for key in ("reference.safe", "secondary.safe"):
+        value = props.get(key)
+        frames += len(value) if isinstance(value, (list, tuple)) else int(bool(value))
+    return features_from_config(props, frames)
+
+
+def network_features(gf, pairs, topsinsar):
+    """Cost model features for every pair of a network from the inventory.
+
+    Parameters
+    ----------
+    gf : GeoDataFrame
+        inventory from load_inventory
+    pairs : DataFrame
+        columns relativeOrbit, reference and secondary (YYYYMMDD), e.g. from
+        asf.select_pairs()
+    topsinsar : dict
+        topsinsar settings from read_yaml_template()
+
+    Returns
+    -------
+    features :  DataFrame
+        features indexed by interferogram directory name
+
+    """
+    days = gf.dateStamp.dt.strftime("%Y%m%d")
+    gb = gf.groupby([gf.relativeOrbit.astype(int), days])
+    frames = gb.size()
+    area = gb.geometry.agg(lambda g: g.unary_union.area)
+    rows = {}
+    for pair in pairs.itertuples():
+        reference = (int(pair.relativeOrbit), pair.reference)
+        secondary = (int(pair.relativeOrbit), pair.secondary)
+        n = frames.get(reference, 0) + frames.get(secondary, 0)
+        f = features_from_config(topsinsar, n, area.get(reference))
+        rows[f"int-{pair.reference}-{pair.secondary}"] = f
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def _directory_bytes(path):
+    """Total size of files under a directory."""
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            filepath = os.path.join(root, name)
+            if not os.path.islink(filepath):
+                total += os.path.getsize(filepath)
+    return total
+
+
+def record_runs(root=".", state_file=None):
+    """Collect features and measured costs of finished scheduler jobs.
+
+    Parameters
+    ----------
+    root : str
+        directory with int-* directories and scheduler-state.json
+    state_file : str
+        scheduler checkpoint (default: root/scheduler-state.json)
+
+    Returns
+    -------
+    records :  DataFrame
+        features, wall_time, max_rss (from the scheduler), output_bytes
+        (size of merged/) and scratch_bytes (size of the directory), indexed
+        by job name
+
+    """
+    state_file = state_file or os.path.join(root, STATE_FILE)
+    with open(state_file) as f:
+        states = json.load(f)
+    rows = {}
+    for name, state in states.items():
+        path = state["path"]
+        if state["state"] != "done" or not os.path.isdir(path):
+            continue
+        row = features_from_intdir(path)
+        row["wall_time"] = state["wall_time"]
+        row["max_rss"] = state["max_rss"]
+        row["output_bytes"] = _directory_bytes(os.path.join(path, "merged"))
+        row["scratch_bytes"] = _directory_bytes(path)
+        rows[name] = row
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def design_matrix(features):
+    """Model terms (see TERMS) for a DataFrame or dict of features."""
+    f = pd.DataFrame(features, index=[0]) if isinstance(features, dict) else features
+    volume = f.volume.values.astype("f8")
+    pixels = volume * f.resolution.values
+    return np.column_stack([np.ones_like(volume), volume, pixels, pixels * f.unwrap])
+
+
+class CostModel:
+    """Linear cost model for interferogram jobs.
+
+    Parameters
+    ----------
+    coefficients : dict
+        coefficients of TERMS for each of TARGETS
+    nruns : int
+        number of recorded runs the coefficients were fit to (0 for defaults)
+
+    """
+
+    def __init__(self, coefficients=None, nruns=0):
+        self.coefficients = {
+            target: list(values)
+            for target, values in (coefficients or DEFAULT_COEFFICIENTS).items()
+        }
+        self.nruns = nruns
+
+    @classmethod
+    def fit(cls, records):
+        """Least-squares fit of model coefficients to recorded runs.
+
+        Coefficients are constrained to be non-negative (by refitting
+        without negative terms), so predictions grow with job size.
+
+        Parameters
+        ----------
+        records : DataFrame
+            features and measured TARGETS, e.g. from record_runs()
+
+        Returns
+        -------
+        model :  CostModel
+
+        """
+        if len(records) == 0:
+            raise ValueError("No recorded runs to fit")
+        A = design_matrix(records)
+        coefficients = {}
+        for target in TARGETS:
+            y = records[target].values.astype("f8")
+            active = np.ones(A.shape[1], dtype=bool)
+            while True:
+                coef = np.zeros(A.shape[1])
+                coef[active] = np.linalg.lstsq(A[:, active], y, rcond=None)[0]
+                if (coef >= 0).all() or not active.any():
+                    break
+                active &= coef > 0
+            coefficients[target] = coef.tolist()
+        return cls(coefficients, nruns=len(records))
+
+    @classmethod
+    def load(cls, path=None):
+        """Load saved model, or the uncalibrated default if there is none."""
+        path = path or default_model_path()
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            saved = json.load(f)
+        return cls(saved["coefficients"], saved["nruns"])
+
+    def save(self, path=None):
+        """Save model coefficients to a JSON file."""
+        path = path or default_model_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                dict(terms=TERMS, coefficients=self.coefficients, nruns=self.nruns),
+                f,
+                indent=1,
+            )
+        print(f"Saved cost model: {path}")
+
+    def predict(self, features):
+        """Predict job costs.
+
+        Parameters
+        ----------
+        features : dict or DataFrame
+            features of one job (e.g. from features()) or many jobs (e.g.
+            from network_features())
+
+        Returns
+        -------
+        costs :  dict or DataFrame
+            wall_time (s), max_rss, output_bytes and scratch_bytes (bytes)
+
+        """
+        A = design_matrix(features)
+        costs = {t: A @ np.asarray(self.coefficients[t]) for t in TARGETS}
+        if isinstance(features, dict):
+            return {t: float(v[0]) for t, v in costs.items()}
+        return pd.DataFrame(costs, index=features.index)
+
+    def estimate_resources(self, intdir):
+        """Cores and memory of a job, for use as a discover_jobs() estimator."""
+        f = features_from_intdir(intdir)
+        cost = self.predict(f)
+        return dict(cpus=f["swaths"], memory=int(cost["max_rss"]), **cost)
+
+
+def summarize_costs(costs):
+    """Print network totals of predicted costs.
+
+    Parameters
+    ----------
+    costs : DataFrame
+        output of CostModel.predict() for many jobs
+
+    """
+    print(f"Interferograms: {len(costs)}")
+    print(f"Total runtime: {costs.wall_time.sum() / 3600:.1f} job-hours")
+    print(f"Longest job: {costs.wall_time.max() / 3600:.2f} hours")
+    print(f"Peak memory: {costs.max_rss.max() / 1e9:.1f} GB")
+    print(f"Output: {costs.output_bytes.sum() / 1e9:.1f} GB")
+    print(f"Scratch: {costs.scratch_bytes.sum() / 1e9:.1f} GB")
@@ -0,0 +1,340 @@
+"""Run many prepared topsApp.py jobs on a local machine.
+
+Interferogram directories created by ``prep_topsApp_local`` (``int-*``) are
+discovered and each job's CPU and memory needs are estimated from its
+topsApp.xml (number of frames, swaths and looks). Jobs are started from a
+priority queue whenever enough cores and RAM are free, so the machine is kept
+busy without oversubscribing memory. Job states are checkpointed to a JSON
+file after every change, and finished jobs are skipped when the scheduler is
+restarted.
+
+Notes
+-----
+Any executable can stand in for topsApp.py (e.g. a fake for testing)::
+
+    scheduler = Scheduler(discover_jobs("."), cores=16, memory=64e9)
+    scheduler.run()
+
+"""
+import ast
+import glob
+import heapq
+import itertools
+import json
+import os
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dinosar.executor import CommandError, Result, run
+
+STATE_FILE = "scheduler-state.json"
+
+# Heuristic resource model for topsApp.py, all memory in bytes
+MEMORY_BASE = 2e9
+MEMORY_PER_FRAME_SWATH = 1.5e9
+UNWRAP_MEMORY_FULL_RES = 8e9
+ISCE_DEFAULT_LOOKS = 7 * 19
+
+
+def read_topsapp_xml(path):
+    """Read properties from a topsApp.xml file into a flat dictionary.
+
+    Properties of nested components are named '{component}.{property}', and
+    values are converted to python objects where possible.
+
+    Parameters
+    ----------
+    path : str
+        path to topsApp.xml
+
+    Returns
+    -------
+    properties :  dict
+        property values
+
+    """
+
+    def parse(text):
+        try:
+            return ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            return text
+
+    properties = {}
+    root = ET.parse(path).getroot()
+    for component in root:
+        for element in component:
+            if element.tag == "property":
+                properties[element.get("name")] = parse(element.text)
+            elif element.tag == "component":
+                for prop in element:
+                    name = f"{element.get('name')}.{prop.get('name')}"
+                    properties[name] = parse(prop.text)
+    return properties
+
+
+def estimate_resources(intdir):
+    """Estimate cores and memory needed to run topsApp.py in a directory.
+
+    Memory grows with the number of frames and swaths processed, plus
+    unwrapping memory that shrinks with the number of looks. Each swath can
+    use a core for the OpenMP-parallel steps.
+
+    Parameters
+    ----------
+    intdir : str
+        interferogram directory containing topsApp.xml
+
+    Returns
+    -------
+    resources :  dict
+        cpus, memory (bytes), frames, swaths and looks
+
+    """
+    props = read_topsapp_xml(os.path.join(intdir, "topsApp.xml"))
+
+    def count(value):
+        if isinstance(value, (list, tuple)):
+            return len(value)
+        return 1 if value else 0
+
+    frames = count(props.get("reference.safe")) + count(props.get("secondary.safe"))
+    swaths = count(props.get("swaths")) or 3
+    looks = props.get("azimuthlooks", 7) * props.get("rangelooks", 19)
+    memory = (
+        MEMORY_BASE
+        + MEMORY_PER_FRAME_SWATH * max(frames, 2) / 2 * swaths
+        + UNWRAP_MEMORY_FULL_RES * min(ISCE_DEFAULT_LOOKS / looks, 20) / 20
+    )
+    return dict(
+        cpus=swaths, memory=int(memory), frames=frames, swaths=swaths, looks=looks
+    )
+
+
+class Job:
+    """A topsApp.py run in an interferogram directory.
+
+    Parameters
+    ----------
+    path : str
+        interferogram directory
+    cpus : int
+        number of cores used
+    memory : int
+        peak memory in bytes
+    priority : float
+        jobs with lower values start first
+
+    """
+
+    def __init__(self, path, cpus=1, memory=0, priority=0):
+        self.path = path
+        self.name = os.path.basename(os.path.normpath(path))
+        self.cpus = int(cpus)
+        self.memory = int(memory)
+        self.priority = priority
+        self.state = "pending"
+        self.attempts = 0
+        self.returncode = None
+        self.wall_time = None
+        self.max_rss = None
+
+    def __repr__(self):
+        return f"Job({self.name!r}, cpus={self.cpus}, memory={self.memory:.3g})"
+
+    def to_dict(self):
+        """Checkpointed job state."""
+        keys = ("path", "state", "attempts", "returncode", "wall_time", "max_rss")
+        return {key: getattr(self, key) for key in keys}
+
+
+def discover_jobs(root=".", pattern="int-*", estimator=estimate_resources):
+    """Find prepared interferogram directories and estimate their resources.
+
+    Parameters
+    ----------
+    root : str
+        directory containing interferogram directories
+    pattern : str
+        glob pattern for interferogram directories
+    estimator : callable
+        function of a directory returning a dict with cpus and memory
+
+    Returns
+    -------
+    jobs :  list
+        Job for every directory with a topsApp.xml, largest memory first
+
+    """
+    jobs = []
+    for path in sorted(glob.glob(os.path.join(root, pattern))):
+        if os.path.isfile(os.path.join(path, "topsApp.xml")):
+            resources = estimator(path)
+            jobs.append(
+                Job(
+                    path,
+                    resources["cpus"],
+                    resources["memory"],
+                    priority=-resources["memory"],
+                )
+            )
+    return jobs
+
+
+def total_memory():
+    """Physical memory of this machine in bytes."""
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+class Scheduler:
+    """Pack jobs onto the available cores and memory.
+
+    Parameters
+    ----------
+    jobs : list
+        Job instances (e.g. from discover_jobs())
+    cores : int
+        cores available to jobs (default: all)
+    memory : float
+        bytes of memory available to jobs (default: 90% of physical memory)
+    command : list
+        program and arguments run in each job directory
+    state_file : str
+        JSON checkpoint of job states (default: scheduler-state.json next to
+        the first job directory), False to disable
+    timeout : float
+        seconds before a job is killed
+    retries : int
+        number of times a failed job is requeued
+
+    """
+
+    def __init__(
+        self,
+        jobs,
+        cores=None,
+        memory=None,
+        command=("topsApp.py", "--steps"),
+        state_file=None,
+        timeout=None,
+        retries=0,
+    ):
+        self.jobs = list(jobs)
+        self.cores = cores or os.cpu_count() or 1
+        self.memory = memory or 0.9 * total_memory()
+        self.command = list(command)
+        if state_file is None and self.jobs:
+            root = os.path.dirname(os.path.normpath(self.jobs[0].path))
+            state_file = os.path.join(root, STATE_FILE)
+        self.state_file = state_file or None
+        self.timeout = timeout
+        self.retries = retries
+        self._lock = threading.Lock()
+        for job in self.jobs:
+            # a job that needs more than the machine runs alone
+            job.cpus = min(max(job.cpus, 1), self.cores)
+            job.memory = min(job.memory, int(self.memory))
+        self.load_state()
+
+    def load_state(self):
+        """Restore job states from the checkpoint file."""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        with open(self.state_file) as f:
+            saved = json.load(f)
+        for job in self.jobs:
+            state = saved.get(job.name)
+            if state:
+                for key in ("attempts", "returncode", "wall_time", "max_rss"):
+                    setattr(job, key, state[key])
+                # interrupted jobs are rerun
+                job.state = "done" if state["state"] == "done" else "pending"
+
+    def save_state(self):
+        """Write job states to the checkpoint file."""
+        if not self.state_file:
+            return
+        with self._lock:
+            states = {job.name: job.to_dict() for job in self.jobs}
+            tmp = self.state_file + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(states, f, indent=1)
+            os.replace(tmp, self.state_file)
+
+    def _execute(self, job):
+        """Run a single job (in a worker thread)."""
+        env = dict(os.environ, OMP_NUM_THREADS=str(job.cpus))
+        log = os.path.join(job.path, "topsApp.log")
+        return run(
+            self.command,
+            timeout=self.timeout,
+            log=log,
+            echo=False,
+            cwd=job.path,
+            env=env,
+        )
+
+    def run(self):
+        """Run all pending jobs, returns the list of jobs that failed."""
+        queue = []
+        order = itertools.count()
+        for job in self.jobs:
+            if job.state != "done":
+                job.state = "pending"
+                heapq.heappush(queue, (job.priority, next(order), job))
+        free_cores, free_memory = self.cores, self.memory
+        running = {}
+        failed = []
+        print(f"Running {len(queue)} jobs on {self.cores} cores")
+
+        with ThreadPoolExecutor(self.cores) as pool:
+            while queue or running:
+                # start every queued job that fits, in priority order
+                waiting = []
+                while queue:
+                    item = heapq.heappop(queue)
+                    job = item[2]
+                    if job.cpus <= free_cores and job.memory <= free_memory:
+                        free_cores -= job.cpus
+                        free_memory -= job.memory
+                        job.state = "running"
+                        job.attempts += 1
+                        print(f"Starting {job.name} ({job.cpus} cores)")
+                        running[pool.submit(self._execute, job)] = job
+                    else:
+                        waiting.append(item)
+                for item in waiting:
+                    heapq.heappush(queue, item)
+                self.save_state()
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    free_cores += job.cpus
+                    free_memory += job.memory
+                    try:
+                        result = future.result()
+                        job.state = "done"
+                    except CommandError as e:
+                        result = e.result
+                        job.state = "failed"
+                    except Exception as e:
+                        # e.g. topsApp.py not found, the command never ran
+                        print(f"Could not run {job.name}: {e}")
+                        result = Result(
+                            str(self.command), None, 0.0, None, str(e), None
+                        )
+                        job.state = "failed"
+                    job.returncode = result.returncode
+                    job.wall_time = result.wall_time
+                    job.max_rss = result.max_rss
+                    print(f"Finished {job.name}: {job.state}")
+                    if job.state == "failed":
+                        if job.attempts <= self.retries:
+                            job.state = "pending"
+                            heapq.heappush(queue, (job.priority, next(order), job))
+                        else:
+                            failed.append(job)
+                self.save_state()
+
+        return failed
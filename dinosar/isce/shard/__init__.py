@@ -0,0 +1,157 @@
+"""Split prepared topsApp.py jobs into balanced shards for array jobs.
+
+Cluster and cloud batch systems run array jobs where every element processes
+a list of interferogram directories. To avoid a long tail of slow elements,
+directories are packed into shards of roughly equal estimated cost with the
+longest-processing-time-first rule: jobs are taken from most to least costly
+and each is added to the shard with the smallest total so far.
+
+Each shard is written as a plain text manifest of directories (shard-000.txt,
+...), along with shards.json summarizing the packing and run_shard.sh, a
+generic array-job script that runs the directories of one shard::
+
+    root/shards/shards.json
+    root/shards/shard-000.txt
+    root/shards/run_shard.sh
+
+Notes
+-----
+Costs default to frames x swaths / looks, or come from a calibrated
+CostModel::
+
+    costs = estimate_costs(".", cost=model_cost(CostModel.load()))
+    write_manifests(pack_shards(costs, 50), costs, "shards")
+
+"""
+import glob
+import heapq
+import json
+import os
+import shutil
+import pandas as pd
+from dinosar.isce.scheduler import estimate_resources
+
+MANIFEST = "shards.json"
+SCRIPT = "run_shard.sh"
+TEMPLATE = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "topsApp-array-template.sh"
+)
+
+
+def job_cost(intdir):
+    """Relative cost of a topsApp.py job, frames x swaths / looks."""
+    resources = estimate_resources(intdir)
+    return resources["frames"] * resources["swaths"] / resources["looks"]
+
+
+def model_cost(model, target="wall_time"):
+    """Job cost function predicting `target` with a CostModel."""
+
+    def cost(intdir):
+        return model.estimate_resources(intdir)[target]
+
+    return cost
+
+
+def estimate_costs(root=".", pattern="int-*", cost=job_cost):
+    """Estimated cost of every prepared interferogram directory.
+
+    Parameters
+    ----------
+    root : str
+        directory containing interferogram directories
+    pattern : str
+        glob pattern for interferogram directories
+    cost : callable
+        function of a directory returning its cost (e.g. job_cost or
+        model_cost(CostModel.load()))
+
+    Returns
+    -------
+    costs :  Series
+        cost indexed by directory path
+
+    """
+    paths = sorted(glob.glob(os.path.join(root, pattern)))
+    paths = [path for path in paths if os.path.isfile(f"{path}/topsApp.xml")]
+    return pd.Series([cost(path) for path in paths], index=paths, dtype="f8")
+
+
+def pack_shards(costs, nshards):
+    """Pack jobs into shards of roughly equal total cost.
+
+    Parameters
+    ----------
+    costs : Series
+        cost of each job, indexed by job (e.g. from estimate_costs())
+    nshards : int
+        number of shards (reduced to the number of jobs if there are fewer)
+
+    Returns
+    -------
+    shards :  list
+        lists of jobs, in order of decreasing cost within each shard
+
+    """
+    nshards = max(min(nshards, len(costs)), 1)
+    order = sorted(costs.items(), key=lambda item: (-item[1], item[0]))
+    loads = [(0.0, i) for i in range(nshards)]
+    shards = [[] for i in range(nshards)]
+    for job, value in order:
+        load, i = heapq.heappop(loads)
+        shards[i].append(job)
+        heapq.heappush(loads, (load + value, i))
+    return shards
+
+
+def write_manifests(shards, costs, outdir="shards", template=TEMPLATE):
+    """Save shard manifests and the array-job script.
+
+    Parameters
+    ----------
+    shards : list
+        lists of job directories from pack_shards()
+    costs : Series
+        cost of each job directory
+    outdir : str
+        output directory, manifest paths are relative to it
+    template : str
+        array-job script copied to outdir/run_shard.sh
+
+    Returns
+    -------
+    summary :  DataFrame
+        number of jobs and total cost of each shard
+
+    """
+    os.makedirs(outdir, exist_ok=True)
+    records = []
+    for i, jobs in enumerate(shards):
+        name = f"shard-{i:03d}.txt"
+        paths = [os.path.relpath(job, outdir) for job in jobs]
+        with open(os.path.join(outdir, name), "w") as f:
+            f.write("".join(f"{path}\n" for path in paths))
+        records.append(
+            dict(shard=i, manifest=name, jobs=paths, cost=float(costs[jobs].sum()))
+        )
+    with open(os.path.join(outdir, MANIFEST), "w") as f:
+        json.dump(records, f, indent=1)
+    script = os.path.join(outdir, SCRIPT)
+    shutil.copyfile(template, script)
+    os.chmod(script, 0o755)
+
+    summary = pd.DataFrame(records).set_index("shard")
+    summary["jobs"] = summary.jobs.str.len()
+    print(f"Saved {len(shards)} shard manifests to {outdir}")
+    return summary
+
+
+def summarize_shards(summary):
+    """Print balance of shard costs from write_manifests()."""
+    total = summary.cost.sum()
+    print(f"Shards: {len(summary)}, jobs: {summary.jobs.sum()}")
+    print(f"Mean shard cost: {summary.cost.mean():.3g}")
+    print(f"Largest shard cost: {summary.cost.max():.3g}")
+    if total > 0:
+        imbalance = summary.cost.max() / summary.cost.mean()
+        print(f"Imbalance (largest / mean): {imbalance:.2f}")
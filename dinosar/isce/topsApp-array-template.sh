@@ -0,0 +1,39 @@
+#!/bin/bash
+# Run one shard of prepared topsApp.py jobs as an element of an array job.
+#
+# The zero-based shard index is the first argument, or the array index set by
+# SLURM, PBS/Torque or AWS Batch. Directories listed in shard-NNN.txt (relative
+# to this script) are run in turn, and finished directories are marked with
+# topsApp.done so resubmitting the array only reruns failed jobs. Set
+# TOPSAPP_COMMAND to run something other than 'topsApp.py --steps'.
+#
+# sbatch --array=0-$((NSHARDS - 1)) run_shard.sh
+set -u
+
+INDEX=${1:-${SLURM_ARRAY_TASK_ID:-${PBS_ARRAYID:-${AWS_BATCH_JOB_ARRAY_INDEX:-}}}}
+if [ -z "$INDEX" ]; then
+    echo "usage: run_shard.sh INDEX (or run as an array job)"
+    exit 2
+fi
+HERE=$(cd "$(dirname "$0")" && pwd)
+MANIFEST=$HERE/$(printf "shard-%03d.txt" "$INDEX")
+COMMAND=${TOPSAPP_COMMAND:-topsApp.py --steps}
+
+failed=0
+while read -r intdir; do
+    cd "$HERE" && cd "$intdir" || { failed=$((failed + 1)); continue; }
+    if [ -e topsApp.done ]; then
+        echo "Skipping $intdir (done)"
+        continue
+    fi
+    echo "Running $intdir"
+    if $COMMAND < /dev/null > topsApp.log 2>&1; then
+        touch topsApp.done
+    else
+        echo "FAILED $intdir"
+        failed=$((failed + 1))
+    fi
+done < "$MANIFEST"
+
+echo "Shard $INDEX finished with $failed failed jobs"
+[ "$failed" -eq 0 ]
@@ -0,0 +1,454 @@
+"""Checkpointed, resumable processing pipelines.
+
+A project directory holds a state file (pipeline-state.json) recording, for
+every finished stage, a key computed from its parameters and the content
+hashes of its input files, and the content hashes of the files it produced.
+A stage is skipped when its key is unchanged and its outputs are still on
+disk unmodified, so re-running a pipeline only does missing or invalidated
+work. Because keys are built from content hashes, a stage that reruns but
+produces identical outputs does not invalidate the stages after it.
+
+File hashes are cached with their size and modification time, so checking a
+stage only costs a stat() per file unless a file actually changed.
+
+Notes
+-----
+The ASF query -> inventory -> prep -> download -> topsApp.py chain is
+available as `run_project()`, and any function can be a stage::
+
+    pipeline = Pipeline("project")
+    pipeline.run("inventory", make_inventory, inputs=["query_SA.json"],
+                 outputs=["query.geojson"], params=dict(orbit=64))
+
+"""
+import datetime
+import hashlib
+import json
+import os
+import time
+import pandas as pd
+import requests
+from dinosar.archive import asf
+from dinosar.executor import Executor
+import dinosar.isce as dice
+
+STATE_FILE = "pipeline-state.json"
+CHUNK_SIZE = 2 ** 20
+
+
+def _hash_file(path):
+    """SHA-1 of a file's contents."""
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _hash_json(value):
+    """SHA-1 of a JSON-serializable value."""
+    text = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class Pipeline:
+    """Record of finished stages and artifacts of a project directory.
+
+    Parameters
+    ----------
+    root : str
+        project directory, stage inputs and outputs are relative to it
+    state_file : str
+        JSON state file (default: root/pipeline-state.json)
+
+    """
+
+    def __init__(self, root=".", state_file=None):
+        self.root = root
+        self.state_file = state_file or os.path.join(root, STATE_FILE)
+        self.stages = {}
+        self.files = {}
+        if os.path.exists(self.state_file):
+            with open(self.state_file) as f:
+                saved = json.load(f)
+            self.stages = saved["stages"]
+            self.files = saved["files"]
+
+    def save(self):
+        """Write the state file."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(dict(stages=self.stages, files=self.files), f, indent=1)
+        os.replace(tmp, self.state_file)
+
+    def path(self, name):
+        """Absolute path of a file relative to the project directory."""
+        return os.path.join(self.root, name)
+
+    def fingerprint(self, name):
+        """Content hash of a file or directory, None if it doesn't exist.
+
+        Hashes are cached by size and modification time, directories hash the
+        names and hashes of all files below them.
+        """
+        path = self.path(name)
+        if os.path.isdir(path):
+            entries = []
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for filename in sorted(files):
+                    child = os.path.relpath(os.path.join(root, filename), self.root)
+                    entries.append(
+                        (os.path.relpath(child, name), self.fingerprint(child))
+                    )
+            return _hash_json(entries)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        cached = self.files.get(name)
+        if cached and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return cached[2]
+        digest = _hash_file(path)
+        self.files[name] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def stage_key(self, inputs=(), params=None):
+        """Key of a stage from its parameters and input file contents."""
+        hashes = {name: self.fingerprint(name) for name in inputs}
+        return _hash_json(dict(params=params, inputs=hashes))
+
+    def is_current(self, name, inputs=(), params=None):
+        """Whether a stage finished with the same inputs and kept its outputs."""
+        record = self.stages.get(name)
+        if not record or record["key"] != self.stage_key(inputs, params):
+            return False
+        return all(
+            self.fingerprint(output) == digest
+            for output, digest in record["outputs"].items()
+        )
+
+    def record(self, name, inputs=(), outputs=(), params=None, wall_time=None):
+        """Mark a stage finished and save the hashes of its outputs."""
+        hashes = {output: self.fingerprint(output) for output in outputs}
+        missing = [output for output, digest in hashes.items() if digest is None]
+        if missing:
+            raise FileNotFoundError(f"Stage {name} did not create {missing}")
+        self.stages[name] = dict(
+            key=self.stage_key(inputs, params),
+            outputs=hashes,
+            finished=datetime.datetime.now().isoformat(timespec="seconds"),
+            wall_time=wall_time,
+        )
+        self.save()
+
+    def invalidate(self, prefix=""):
+        """Forget finished stages whose names start with `prefix`."""
+        for name in [name for name in self.stages if name.startswith(prefix)]:
+            del self.stages[name]
+        self.save()
+
+    def run(self, name, func, inputs=(), outputs=(), params=None, force=False):
+        """Run a stage unless it is current.
+
+        Parameters
+        ----------
+        name : str
+            unique stage name
+        func : callable
+            function without arguments that creates the outputs
+        inputs : list
+            files or directories read by the stage
+        outputs : list
+            files or directories created by the stage
+        params : dict
+            JSON-serializable settings that change the outputs
+        force : bool
+            run even if the stage is current
+
+        Returns
+        -------
+        ran :  bool
+            False if the stage was skipped
+
+        """
+        if not force and self.is_current(name, inputs, params):
+            print(f"Skipping {name} (up to date)")
+            return False
+        self.stages.pop(name, None)
+        print(f"Running {name}")
+        start = time.perf_counter()
+        func()
+        self.record(name, inputs, outputs, params, time.perf_counter() - start)
+        return True
+
+    def status(self):
+        """Finished stages as a DataFrame indexed by stage name."""
+        records = {
+            name: dict(
+                finished=record["finished"],
+                wall_time=record["wall_time"],
+                outputs=len(record["outputs"]),
+            )
+            for name, record in self.stages.items()
+        }
+        return pd.DataFrame.from_dict(
+            records, orient="index", columns=["finished", "wall_time", "outputs"]
+        )
+
+
+def run_project(
+    root,
+    roi,
+    orbit=None,
+    template=None,
+    neighbors=1,
+    max_days=None,
+    poeorb=True,
+    download=False,
+    process=False,
+    refresh=False,
+    workers=4,
+    baseurl=asf.ASF_SEARCH_URL,
+    orbit_url=asf.ORBIT_URL,
+):
+    """Query, inventory, prepare, download and process a network of pairs.
+
+    Each step is a stage of a Pipeline in `root`, so an interrupted or
+    repeated run only redoes missing or invalidated work. Interferograms
+    are prepared in root/int-{reference}-{secondary}.
+
+    Parameters
+    ----------
+    root : str
+        project directory
+    roi : list or shapely geometry
+        [south, north, west, east] bounds or a polygon to search with
+    orbit : int
+        relative orbit number
+    template : str
+        YAML template file of topsApp settings
+    neighbors : int
+        pair each date with this many following dates
+    max_days : int
+        maximum days between paired dates
+    poeorb : bool
+        download precise orbits (header orbits are used for dates without one)
+    download : bool
+        download SLCs and orbits of every pair
+    process : bool
+        run topsApp.py for every downloaded pair (implies download)
+    refresh : bool
+        repeat the ASF search to pick up new acquisitions
+    workers : int
+        number of concurrent downloads
+    baseurl : str
+        ASF search API endpoint
+    orbit_url : str
+        precise orbit listing (see asf.get_orbit_url())
+
+    Returns
+    -------
+    pipeline :  Pipeline
+
+    """
+    os.makedirs(root, exist_ok=True)
+    pipeline = Pipeline(root)
+    queries = ["query_SA.json", "query_SB.json"]
+    search = list(roi) if not hasattr(roi, "wkt") else roi.wkt
+
+    def query():
+        for sat, outname in zip(["SA", "SB"], queries):
+            asf.query_asf(
+                roi, sat, orbit=orbit, outname=pipeline.path(outname), baseurl=baseurl
+            )
+
+    params = dict(roi=search, orbit=orbit)
+    pipeline.run("query", query, outputs=queries, params=params, force=refresh)
+
+    def inventory():
+        gf = asf.merge_inventories(*[pipeline.path(name) for name in queries])
+        asf.save_inventory(gf, pipeline.path("query.geojson"))
+
+    pipeline.run("inventory", inventory, inputs=queries, outputs=["query.geojson"])
+
+    gf = asf.load_inventory(pipeline.path("query.geojson"))
+    if orbit is not None:
+        gf = gf[gf.relativeOrbit == int(orbit)]
+    pairs = asf.select_pairs(asf.acquisition_statistics(gf)[1], neighbors, max_days)
+    inputDict = dice.load_defaultDict(template)
+
+    intdirs = [
+        prep_pair(
+            pipeline,
+            gf,
+            pair.reference,
+            pair.secondary,
+            pair.relativeOrbit,
+            inputDict,
+            poeorb,
+            orbit_url,
+        )
+        for pair in pairs.itertuples()
+    ]
+
+    if download or process:
+        download_pairs(pipeline, intdirs, workers)
+    if process:
+        process_pairs(pipeline, intdirs)
+
+    return pipeline
+
+
+def prep_pair(
+    pipeline,
+    gf,
+    reference,
+    secondary,
+    relativeOrbit,
+    inputDict,
+    poeorb=True,
+    orbit_url=asf.ORBIT_URL,
+):
+    """Prep stage of the interferogram directory int-{reference}-{secondary}.
+
+    The stage reruns if the frames of either date or the topsApp settings
+    changed, e.g. when ASF publishes another frame of an already prepared
+    date. Pairs without precise orbits yet (ASF publishes them ~3 weeks
+    after acquisition) are prepared with header orbits and prepared again on
+    the next call.
+
+    Parameters
+    ----------
+    pipeline : Pipeline
+        project the interferogram directory belongs to
+    gf : GeoDataFrame
+        ASF inventory of S1 frames
+    reference : str
+        later date (YYYYMMDD)
+    secondary : str
+        earlier date (YYYYMMDD)
+    relativeOrbit : int
+        relative orbit of both dates
+    inputDict : dict
+        topsApp settings (e.g. from load_defaultDict())
+    poeorb : bool
+        add precise orbits to the download links
+    orbit_url : str
+        precise orbit listing (see asf.get_orbit_url())
+
+    Returns
+    -------
+    intdir :  str
+        interferogram directory relative to the project directory
+
+    """
+    intdir = f"int-{reference}-{secondary}"
+    reference_urls = asf.get_slc_urls(gf, reference, relativeOrbit)
+    secondary_urls = asf.get_slc_urls(gf, secondary, relativeOrbit)
+    params = dict(
+        reference=reference_urls,
+        secondary=secondary_urls,
+        inputDict=inputDict,
+        poeorb=poeorb,
+    )
+    outputs = [f"{intdir}/topsApp.xml", f"{intdir}/download-links.txt"]
+    header_orbits = []
+
+    def prep():
+        extra = []
+        if poeorb:
+            try:
+                extra = [
+                    asf.get_orbit_url(urls[0], url=orbit_url)
+                    for urls in (reference_urls, secondary_urls)
+                ]
+            except (requests.RequestException, IndexError, ValueError) as e:
+                print("Trouble downloading POEORB... maybe scene is too recent?")
+                print("Falling back to using header orbits")
+                print(e)
+                header_orbits.append(intdir)
+        outdir = pipeline.path(intdir)
+        dice.prep_topsapp(inputDict, reference_urls, secondary_urls, outdir, extra)
+
+    pipeline.run(f"prep/{intdir}", prep, outputs=outputs, params=params)
+    if header_orbits:
+        # look for precise orbits again next time
+        pipeline.invalidate(f"prep/{intdir}")
+    return intdir
+
+
+def _download_links(pipeline, intdir):
+    """Download urls and local file names of an interferogram directory."""
+    with open(pipeline.path(f"{intdir}/download-links.txt")) as f:
+        urls = f.read().split()
+    return urls, [f"{intdir}/{os.path.basename(url)}" for url in urls]
+
+
+def download_pairs(pipeline, intdirs, workers=4):
+    """Download stage for prepared interferogram directories.
+
+    Downloads of directories whose links haven't changed since they last
+    finished are skipped, the rest run concurrently.
+    """
+    pending = []
+    for intdir in intdirs:
+        urls, outputs = _download_links(pipeline, intdir)
+        inputs = [f"{intdir}/download-links.txt"]
+        if pipeline.is_current(f"download/{intdir}", inputs):
+            print(f"Skipping download/{intdir} (up to date)")
+        else:
+            pending.append((intdir, urls, inputs, outputs))
+
+    with Executor(max_workers=workers) as ex:
+        futures = [
+            [ex.submit(f"wget -nc -c {url}", cwd=pipeline.path(intdir)) for url in urls]
+            for intdir, urls, inputs, outputs in pending
+        ]
+        for (intdir, urls, inputs, outputs), downloads in zip(pending, futures):
+            try:
+                wall_time = sum(future.result().wall_time for future in downloads)
+            except Exception as e:
+                print(f"Download failed for {intdir}: {e}")
+                continue
+            pipeline.record(f"download/{intdir}", inputs, outputs, None, wall_time)
+
+
+def process_pairs(pipeline, intdirs, command=("topsApp.py", "--steps"), **kwargs):
+    """Processing stage for downloaded interferogram directories.
+
+    Directories whose topsApp.xml and downloaded files haven't changed since
+    they were last processed are skipped, the rest are run with the local
+    Scheduler (keyword arguments are passed to it).
+    """
+    from dinosar.isce.scheduler import Scheduler, discover_jobs
+
+    pending = {}
+    for intdir in intdirs:
+        if f"download/{intdir}" not in pipeline.stages:
+            print(f"Skipping process/{intdir} (not downloaded)")
+            continue
+        inputs = [f"{intdir}/topsApp.xml"] + _download_links(pipeline, intdir)[1]
+        if pipeline.is_current(f"process/{intdir}", inputs):
+            print(f"Skipping process/{intdir} (up to date)")
+        else:
+            pending[intdir] = inputs
+
+    jobs = [
+        job
+        for job in discover_jobs(pipeline.root)
+        if os.path.relpath(job.path, pipeline.root) in pending
+    ]
+    scheduler = Scheduler(jobs, command=command, state_file=False, **kwargs)
+    scheduler.run()
+    for job in jobs:
+        if job.state == "done":
+            intdir = os.path.relpath(job.path, pipeline.root)
+            pipeline.record(
+                f"process/{intdir}",
+                pending[intdir],
+                [f"{intdir}/merged"],
+                None,
+                job.wall_time,
+            )
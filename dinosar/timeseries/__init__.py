@@ -0,0 +1,198 @@
+"""Functions for Small BAseline Subset (SBAS) time series inversion.
+
+This module inverts a stack of unwrapped interferograms for displacement at
+each acquisition date. The pair/date graph is taken from the interferogram
+directories created by ``prep_topsApp_local`` (``int-{reference}-{secondary}``).
+The design matrix is built and factorized once per network, and pixels are
+solved together in large blocks. Pixels with missing data are grouped by the
+pattern of valid interferograms, so each distinct pattern is factorized only
+once.
+
+Notes
+-----
+The stack can be any array-like with shape (pairs, rows, columns) that supports
+slicing, for example a numpy array, `numpy.memmap`, or a chunked h5py, zarr or
+dask array. Only one block of rows is read into memory at a time.
+
+"""
+import os
+import numpy as np
+
+
+def pairs_from_dirs(intdirs):
+    """Get (reference, secondary) dates from interferogram directory names.
+
+    Parameters
+    ----------
+    intdirs : list
+        paths to interferogram directories (e.g. 'int-20180706-20180624')
+
+    Returns
+    -------
+    pairs :  list
+        list of (reference, secondary) date strings
+
+    """
+    pairs = []
+    for path in intdirs:
+        name = os.path.basename(os.path.normpath(path))
+        try:
+            prefix, reference, secondary = name.split("-")
+        except ValueError:
+            raise ValueError(f"{name} is not named int-[reference]-[secondary]")
+        if prefix != "int":
+            raise ValueError(f"{name} is not named int-[reference]-[secondary]")
+        pairs.append((reference, secondary))
+
+    return pairs
+
+
+def build_design_matrix(pairs):
+    """Construct SBAS design matrix from a list of interferometric pairs.
+
+    Unknowns are the cumulative displacements at each date relative to the
+    first date, so each interferogram row has +1 at the reference date and
+    -1 at the secondary date.
+
+    Parameters
+    ----------
+    pairs : list
+        list of (reference, secondary) date strings
+
+    Returns
+    -------
+    A :  ndarray
+        design matrix with shape (pairs, dates - 1)
+    dates :  list
+        sorted list of unique date strings
+
+    """
+    dates = sorted(set(d for pair in pairs for d in pair))
+    index = {date: i for i, date in enumerate(dates)}
+    A = np.zeros((len(pairs), len(dates)), dtype="f8")
+    for row, (reference, secondary) in enumerate(pairs):
+        if reference == secondary:
+            raise ValueError(f"Pair {reference}-{secondary} has identical dates")
+        A[row, index[reference]] = 1
+        A[row, index[secondary]] = -1
+
+    return A[:, 1:], dates
+
+
+def _solver(A, valid):
+    """Pseudo-inverse of design matrix for a single pattern of valid pairs.
+
+    Dates that are not constrained by any valid interferogram are flagged so
+    that they are returned as NaN rather than the minimum-norm solution of 0.
+    """
+    Asub = A[valid]
+    observed = np.any(Asub != 0, axis=0)
+    if not observed.any():
+        return None, observed
+    return np.linalg.pinv(Asub), observed
+
+
+def invert_block(data, A, cache=None):
+    """Invert a block of pixels for cumulative displacement.
+
+    Parameters
+    ----------
+    data : ndarray
+        interferogram values with shape (pairs, pixels), NaN where invalid
+    A : ndarray
+        design matrix from build_design_matrix()
+    cache : dict
+        optional dictionary of factorizations keyed by valid-pair pattern,
+        reused across blocks
+
+    Returns
+    -------
+    model :  ndarray
+        displacement with shape (dates - 1, pixels)
+
+    """
+    if cache is None:
+        cache = {}
+    npairs, npix = data.shape
+    model = np.full((A.shape[1], npix), np.nan, dtype=data.dtype)
+
+    mask = np.isfinite(data)
+    packed = np.packbits(mask, axis=0).T
+    patterns, inverse = np.unique(packed, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    order = np.argsort(inverse, kind="stable")
+    groups = np.split(order, np.cumsum(np.bincount(inverse))[:-1])
+
+    for pattern, pixels in zip(patterns, groups):
+        key = pattern.tobytes()
+        if key not in cache:
+            valid = np.unpackbits(pattern, count=npairs).astype(bool)
+            cache[key] = (valid,) + _solver(A, valid)
+        valid, Ainv, observed = cache[key]
+        if Ainv is None:
+            continue
+        if pixels.size == npix:
+            solution = Ainv @ data[valid]
+        else:
+            solution = Ainv @ data[np.ix_(valid, pixels)]
+        solution[~observed] = np.nan
+        model[:, pixels] = solution
+
+    return model
+
+
+def invert_stack(stack, pairs, block_rows=None, out=None, dtype="f4"):
+    """Invert an interferogram stack for displacement time series.
+
+    The stack is processed in blocks of rows so that memory use is bounded by
+    the block size rather than the size of the stack.
+
+    Parameters
+    ----------
+    stack : array-like
+        unwrapped interferograms with shape (pairs, rows, columns)
+    pairs : list
+        list of (reference, secondary) date strings matching the stack order
+    block_rows : int
+        number of rows to read per block (default: chunk size of the stack,
+        or enough rows for ~1 million pixels)
+    out : array-like
+        optional preallocated output (e.g. numpy.memmap) with shape
+        (dates, rows, columns)
+    dtype : str
+        output data type if `out` is not given
+
+    Returns
+    -------
+    out :  array-like
+        displacement relative to the first date with shape (dates, rows,
+        columns)
+    dates :  list
+        sorted list of unique date strings
+
+    """
+    npairs, nrows, ncols = stack.shape
+    if npairs != len(pairs):
+        raise ValueError(f"Stack has {npairs} layers but {len(pairs)} pairs")
+    A, dates = build_design_matrix(pairs)
+
+    if block_rows is None:
+        chunks = getattr(stack, "chunks", None)
+        if chunks and isinstance(chunks[1], int):
+            block_rows = chunks[1]
+        else:
+            block_rows = max(1, int(1e6 // max(ncols, 1)))
+    if out is None:
+        out = np.empty((len(dates), nrows, ncols), dtype=dtype)
+
+    cache = {}
+    for row in range(0, nrows, block_rows):
+        rows = slice(row, min(row + block_rows, nrows))
+        block = np.asarray(stack[:, rows, :], dtype="f8")
+        nblock = block.shape[1]
+        model = invert_block(block.reshape(npairs, -1), A, cache)
+        first = np.where(np.isnan(model).all(axis=0), np.nan, 0)
+        out[0, rows, :] = first.reshape(nblock, ncols)
+        out[1:, rows, :] = model.reshape(-1, nblock, ncols)
+
+    return out, dates
@@ -0,0 +1,74 @@
+"""Shared test fixtures."""
+import json
+import os
+import pytest
+
+
+@pytest.fixture(scope="module")
+def gf():
+    """Inventory of the test queries."""
+    from dinosar.archive import asf
+
+    return asf.load_inventory("tests/data/query.geojson")
+
+
+@pytest.fixture
+def make_intdir():
+    """Function writing root/name/topsApp.xml for scheduler and cost tests.
+
+    Directories with fail=True get a FAIL file, which makes
+    tests/data/fake_topsApp.py exit with an error.
+    """
+    import dinosar.isce as dice
+
+    def make(root, name, swaths=(1,), frames=1, looks=(1, 6), fail=False):
+        intdir = os.path.join(root, name)
+        os.makedirs(intdir)
+        inputDict = {
+            "topsinsar": {
+                "swaths": list(swaths),
+                "azimuthlooks": looks[0],
+                "rangelooks": looks[1],
+                "reference": {"safe": [f"ref{i}.zip" for i in range(frames)]},
+                "secondary": {"safe": [f"sec{i}.zip" for i in range(frames)]},
+            }
+        }
+        dice.write_xml(dice.dict2xml(inputDict), os.path.join(intdir, "topsApp.xml"))
+        if fail:
+            open(os.path.join(intdir, "FAIL"), "w").close()
+        return intdir
+
+    return make
+
+
+@pytest.fixture
+def asf_server():
+    """Local ASF stand-in serving the scenes of the test queries."""
+    from dinosar.archive import synthetic
+
+    scenes = []
+    for sat in ["S1A", "S1B"]:
+        with open(os.path.join("tests", "data", f"query_{sat}.json")) as f:
+            scenes.extend(json.load(f)[0])
+    orbit_files = synthetic.synthetic_orbit_files("2014-10-01", "2018-06-30")
+    archive = synthetic.MockArchive(scenes, orbit_files)
+    server = synthetic.start_mock_server(archive)
+    yield archive
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def mock_archive():
+    """Local ASF stand-in serving a synthetic year of scenes over Ecuador."""
+    from dinosar.archive import synthetic
+
+    scenes = synthetic.synthetic_scenes(
+        [-1.5, 3.1, -80.7, -75.8], "2018-01-01", "2018-12-31", orbits=[40, 120, 142]
+    )
+    orbit_files = synthetic.synthetic_orbit_files("2017-12-01", "2018-12-31")
+    archive = synthetic.MockArchive(scenes, orbit_files)
+    server = synthetic.start_mock_server(archive)
+    yield archive
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""Stand-in for topsApp.py that records when it ran.
+
+Appends "start {time} {cwd}" and "stop {time} {cwd}" lines to the file in
+FAKE_TOPSAPP_LOG, sleeps FAKE_TOPSAPP_SECONDS, and exits with status 1 if the
+working directory contains a file named FAIL.
+"""
+import os
+import sys
+import time
+
+log = os.environ.get("FAKE_TOPSAPP_LOG", "fake_topsApp.txt")
+seconds = float(os.environ.get("FAKE_TOPSAPP_SECONDS", "0.2"))
+with open(log, "a") as f:
+    f.write(f"start {time.time()} {os.getcwd()}\n")
+print("fake topsApp.py", " ".join(sys.argv[1:]))
+time.sleep(seconds)
+with open(log, "a") as f:
+    f.write(f"stop {time.time()} {os.getcwd()}\n")
+if os.path.exists("FAIL"):
+    print("ERROR: fake failure")
+    sys.exit(1)
+os.makedirs("merged", exist_ok=True)
+open(os.path.join("merged", "filt_topophase.unw"), "w").close()
@@ -4,7 +4,11 @@ import pytest
 import requests
 import os
 import geopandas as gpd
+import pandas as pd
 import contextlib
+import tempfile
+import numpy as np
+from shapely.geometry import Polygon, box
 
 
 @contextlib.contextmanager
@@ -66,6 +70,36 @@ def test_merge_inventories():
     assert type(gf) == gpd.geodataframe.GeoDataFrame
 
 
+def test_merge_inventories_nway():
+    gfA = asf.load_asf_json("tests/data/query_S1A.json")
+    files = ["tests/data/query_S1A.json", "tests/data/query_S1B.json", gfA]
+    gf = asf.merge_inventories(*files)
+    assert gf.granuleName.is_unique
+    assert len(gf) == len(gfA) + len(asf.load_asf_json("tests/data/query_S1B.json"))
+
+
+def test_merge_empty_inventories(tmpdir):
+    empty = str(tmpdir.join("query_empty.json"))
+    with open(empty, "w") as f:
+        f.write("[[]]")
+    gf = asf.merge_inventories(empty, "tests/data/query_S1B.json")
+    assert len(gf) == len(asf.load_asf_json("tests/data/query_S1B.json"))
+    with pytest.raises(ValueError):
+        asf.merge_inventories(empty)
+
+
+def test_compact_inventory():
+    gf = asf.merge_inventories("tests/data/query_S1A.json", "tests/data/query_S1B.json")
+    compact = asf.compact_inventory(gf)
+    assert compact.platform.dtype == "category"
+    assert compact.sceneDateString.dtype == "category"
+    assert compact.relativeOrbit.dtype == "i2"
+    assert "fileName" not in compact.columns
+    pd.testing.assert_series_equal(asf.get_column(compact, "fileName"), gf.fileName)
+    ratio = gf.memory_usage(deep=True).sum() / compact.memory_usage(deep=True).sum()
+    assert ratio > 3
+
+
 def test_load_inventory():
     gf = asf.load_inventory("tests/data/query.geojson")
     assert type(gf) == gpd.geodataframe.GeoDataFrame
@@ -89,6 +123,35 @@ def test_get_orbit_url_file():
     assert "AUX_POEORB" in url
 
 
+def test_orbit_key():
+    gid = "S1B_IW_SLC__1SDV_20171117T015310_20171117T015337_008315_00EB6C_40CA"
+    assert asf.orbit_key(gid) == ("S1B", "20171116")
+    assert asf.orbit_key(f"https://example.com/{gid}.zip") == ("S1B", "20171116")
+    url = asf.get_orbit_url_file(gid, inventory="tests/data/poeorb.txt")
+    assert asf.orbit_file_key(os.path.basename(url)) == asf.orbit_key(gid)
+    with pytest.raises(ValueError):
+        asf.orbit_key("S1B_IW_SLC__1SDV")
+    with pytest.raises(ValueError):
+        asf.get_orbit_url_file(gid.replace("2017", "2031"), "tests/data/poeorb.txt")
+
+
+def test_get_orbit_url_download_url(mock_archive):
+    gf = asf.load_inventory("tests/data/query.geojson")
+    downloadUrl = gf.downloadUrl.iloc[0]
+    expected = asf.get_orbit_url_file(
+        gf.granuleName.iloc[0], inventory="tests/data/poeorb.txt"
+    )
+    url = asf.get_orbit_url_file(
+        os.path.basename(downloadUrl), inventory="tests/data/poeorb.txt"
+    )
+    assert url == expected
+    scene = mock_archive.scenes[0]
+    expected = asf.get_orbit_url(scene["granuleName"], url=mock_archive.orbit_url)
+    for name in [scene["downloadUrl"], os.path.basename(scene["downloadUrl"])]:
+        assert name.endswith(".zip")
+        assert asf.get_orbit_url(name, url=mock_archive.orbit_url) == expected
+
+
 def test_get_slc_urls():
     acquisition_date = "20180320"
     path = 120
@@ -118,29 +181,259 @@ def test_get_slc_names():
 
 def test_summarize_orbits(tmpdir):
     gf = asf.load_inventory("tests/data/query.geojson")
-    with run_in(tmpdir):
-        asf.summarize_orbits(gf)
-        assert os.path.isfile("acquisitions_40.csv")
+    outnames = asf.summarize_orbits(gf, outdir=str(tmpdir))
+    assert os.path.isfile(tmpdir.join("acquisitions_40.csv"))
+    assert len(outnames) == gf.relativeOrbit.nunique()
+
+
+def test_summarize_inventory(tmpdir):
+    gf = asf.load_inventory("tests/data/query.geojson")
+    outname = str(tmpdir.join("summary.csv"))
+    dfS = asf.summarize_inventory(gf, outname=outname)
+    assert len(pd.read_csv(outname)) == len(dfS)
 
 
 def test_save_geojson_footprints(tmpdir):
     gf = asf.load_inventory("tests/data/query.geojson")
-    with run_in(tmpdir):
-        asf.save_geojson_footprints(gf)
-        assert os.path.isfile("40/2015-10-03.geojson")
+    outnames = asf.save_geojson_footprints(gf, outdir=str(tmpdir), workers=4)
+    assert len(outnames) == gf.groupby(["relativeOrbit", "sceneDateString"]).ngroups
+    df = gpd.read_file(str(tmpdir.join("40", "2015-10-03.geojson")))
+    assert list(df.columns) == ["granuleName", "downloadUrl", "geometry"]
+    assert df.crs == "EPSG:4326"
+    # existing directories are reused
+    assert asf.save_geojson_footprints(gf, outdir=str(tmpdir)) == outnames
+
+
+def test_save_footprints(tmpdir):
+    gf = asf.load_inventory("tests/data/query.geojson")
+    outname = str(tmpdir.join("footprints.gpkg"))
+    dates = asf.save_footprints(gf, outname)
+    assert dates.frames.sum() == len(gf)
+    assert asf.load_footprints(outname).equals(dates)
+    assert len(asf.load_footprints(outname, 142)) == (gf.relativeOrbit == 142).sum()
+    for orbit, date in [(142, "2017-03-15"), (40, "2015-10-03"), (120, "2018-05-31")]:
+        df = asf.load_footprints(outname, orbit, date)
+        expected = gf[(gf.relativeOrbit == orbit) & (gf.sceneDateString == date)]
+        assert sorted(df.granuleName) == sorted(expected.granuleName)
+    with pytest.raises(ValueError):
+        asf.load_footprints(outname, 142, "2017-03-16")
 
 
 def test_save_inventory(tmpdir):
     gf = asf.load_inventory("tests/data/query.geojson")
-    with run_in(tmpdir):
-        asf.save_inventory(gf, outname="test.geojson")
-        assert os.path.isfile("test.geojson")
+    columns = list(gf.columns)
+    asf.save_inventory(gf, outname=str(tmpdir.join("test.geojson")))
+    assert os.path.isfile(tmpdir.join("test.geojson"))
+    assert list(gf.columns) == columns
 
 
 def test_snwe2file(tmpdir):
     snwe = [0.611, 1.048, -78.196, -77.522]
-    with run_in(tmpdir):
-        asf.snwe2file(snwe)
-        assert os.path.isfile("snwe.json")
-        assert os.path.isfile("snwe.wkt")
-        assert os.path.isfile("snwe.txt")
+    asf.snwe2file(snwe, outdir=str(tmpdir))
+    assert os.path.isfile(tmpdir.join("snwe.json"))
+    assert os.path.isfile(tmpdir.join("snwe.wkt"))
+    assert os.path.isfile(tmpdir.join("snwe.txt"))
+
+
+def test_write_download_urls(tmpdir):
+    urls = ["https://example.com/a.zip", "https://example.com/b.zip"]
+    outname = asf.write_download_urls(urls, str(tmpdir.join("links.txt")))
+    with open(outname) as f:
+        assert f.read().split() == urls
+
+
+def test_concurrent_outputs(tmpdir, asf_server):
+    """Queries and summaries run in threads write only to their own directory."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    baseurl = asf_server.search_url
+    cwd = os.listdir(".")
+
+    def work(i):
+        outdir = str(tmpdir.mkdir(f"aoi{i}"))
+        snwe = [0.6, 1.0, -78.2, -77.5]
+        query = asf.query_asf(snwe, "SA", outdir=outdir, baseurl=baseurl)
+        gf = asf.load_asf_json(query)
+        asf.summarize_inventory(gf, outname=os.path.join(outdir, "summary.csv"))
+        asf.summarize_orbits(gf, outdir=outdir)
+        asf.snwe2file(snwe, outdir=outdir)
+        return sorted(os.listdir(outdir))
+
+    with ThreadPoolExecutor(4) as pool:
+        listings = list(pool.map(work, range(8)))
+    assert all(listing == listings[0] for listing in listings)
+    assert "query_SA.json" in listings[0]
+    assert os.listdir(".") == cwd
+
+
+def test_split_inventory():
+    gf = asf.load_inventory("tests/data/query.geojson")
+    aois = gpd.GeoDataFrame(
+        dict(name=["ecuador", "uniongap"]),
+        geometry=[
+            box(-78.196, 0.611, -77.522, 1.048),
+            box(-120.47, 46.51, -120.45, 46.53),
+        ],
+        crs="EPSG:4326",
+    )
+    subsets = asf.split_inventory(gf, aois)
+    assert list(subsets) == ["ecuador"]
+    expected = gf[gf.intersects(aois.geometry.iloc[0])]
+    assert len(expected) > 0
+    assert set(subsets["ecuador"].granuleName) == set(expected.granuleName)
+
+
+def test_acquisition_statistics():
+    gf = asf.load_inventory("tests/data/query.geojson")
+    orbits, dates = asf.acquisition_statistics(gf)
+    assert orbits.loc[40, "Frames"] == (gf.relativeOrbit == 40).sum()
+    assert (
+        orbits.loc[40, "Dates"] == gf.query("relativeOrbit == 40").dateStamp.nunique()
+    )
+    assert orbits.loc[40, "Start"] == "2014-10-08"
+    assert orbits.Frames.sum() == dates.nFrames.sum() == len(gf)
+    assert dates.loc[(40, "2014-10-20"), "dt"] == 12
+
+
+def test_acquisition_statistics_update():
+    gf = asf.load_inventory("tests/data/query.geojson")
+    gf = gf.sort_values("sceneDate")
+    orbits, dates = asf.acquisition_statistics(gf)
+    old, new = gf.iloc[:200], gf.iloc[200:]
+    orbits2, dates2 = asf.acquisition_statistics(
+        new, asf.acquisition_statistics(old)[1]
+    )
+    pd.testing.assert_frame_equal(dates, dates2)
+    pd.testing.assert_frame_equal(orbits, orbits2)
+
+
+def test_parse_granule_names():
+    gf = asf.load_inventory("tests/data/query.geojson")
+    df = asf.parse_granule_names(gf.granuleName)
+    assert df.index.equals(gf.index)
+    row = df.loc[gf.granuleName.str.endswith("01260A_0613")].iloc[0]
+    assert row.mission == "S1B"
+    assert row["mode"] == "IW"
+    assert row.productType == "SLC"
+    assert row.polarization == "DV"
+    assert row.startTime == pd.Timestamp("2018-03-20 23:28:21")
+    assert row.stopTime == pd.Timestamp("2018-03-20 23:28:48")
+    assert row.absoluteOrbit == 10121
+    assert row.datatakeID == 0x01260A
+    assert row.productID == "0613"
+    assert (df.absoluteOrbit == gf.absoluteOrbit.astype(int)).all()
+    with pytest.raises(ValueError):
+        asf.parse_granule_names(["S1B_IW_SLC__1SDV_20171117T015310"])
+
+
+def test_resolve_duplicates():
+    gf = asf.load_asf_json("tests/data/query_S1A.json")
+    original = gf.iloc[:3]
+    reprocessed = original.copy()
+    reprocessed["granuleName"] = reprocessed.granuleName.str[:-4] + "FFFF"
+    reprocessed["processingDate"] = "2099-01-01 00:00:00"
+    both = pd.concat([original, reprocessed, gf.iloc[3:]])
+
+    kept, dropped = asf.resolve_duplicates(both)
+    assert len(kept) == len(gf)
+    assert set(dropped.granuleName) == set(original.granuleName)
+
+    kept, dropped = asf.resolve_duplicates(both, prefer="oldest")
+    assert set(dropped.granuleName) == set(reprocessed.granuleName)
+
+    merged = asf.merge_inventories(both)
+    assert len(merged) == len(gf)
+    assert merged.granuleName.str.endswith("FFFF").sum() == 3
+
+
+def test_cluster_regions():
+    regions = gpd.GeoDataFrame(
+        geometry=[box(0, 0, 1, 1), box(1.2, 0, 2, 1), box(10, 10, 11, 11)],
+        crs="EPSG:4326",
+    )
+    labels, bounds = asf.cluster_regions(regions, distance=0.5)
+    assert list(labels) == [0, 0, 1]
+    assert bounds == [[0, 1, 0, 2], [10, 11, 10, 11]]
+    labels, bounds = asf.cluster_regions(regions, distance=0.1)
+    assert list(labels) == [0, 1, 2]
+
+
+def test_query_regions(tmpdir, asf_server):
+    regions = gpd.GeoDataFrame(
+        dict(name=["a", "b", "c", "far"]),
+        geometry=[
+            box(-78.2, 0.6, -78.1, 0.7),
+            box(-78.0, 0.6, -77.9, 0.7),
+            box(-77.8, 0.9, -77.7, 1.0),
+            box(-120.47, 46.51, -120.45, 46.53),
+        ],
+        crs="EPSG:4326",
+    )
+    inventories = asf.query_regions(
+        regions, outdir=str(tmpdir), baseurl=asf_server.search_url
+    )
+    assert len(asf_server.searches) == 4  # 2 clusters x 2 satellites
+    assert sorted(inventories) == ["a", "b", "c"]
+    assert inventories["a"] == os.path.join(str(tmpdir), "a", "query.geojson")
+    gf = asf.load_inventory(inventories["a"])
+    assert gf.intersects(regions.geometry.iloc[0]).all()
+
+
+def test_ogr2geometry():
+    geom = asf.ogr2geometry("tests/data/UnionGap.shp")
+    assert geom.exterior.is_ccw
+    miny, maxy, minx, maxx = asf.ogr2snwe("tests/data/UnionGap.shp")
+    assert np.allclose(geom.bounds, (minx, miny, maxx, maxy))
+
+
+def test_ogr2geometry_simplify():
+    circle = gpd.GeoDataFrame(
+        geometry=[box(0, 0, 1, 1).buffer(1, resolution=64)], crs="EPSG:4326"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "circle.geojson")
+        circle.to_file(path, driver="GeoJSON")
+        geom = asf.ogr2geometry(path, max_vertices=50)
+    assert asf.count_vertices(geom) <= 50
+    assert geom.symmetric_difference(circle.geometry[0]).area < 0.05
+
+
+def test_ogr2geometry_contains_shape(tmpdir):
+    t = np.linspace(0, 2 * np.pi, 3000, endpoint=False)
+    r = 1 + 0.05 * np.sin(60 * t)
+    wavy = Polygon(np.column_stack([r * np.cos(t), r * np.sin(t)]))
+    path = str(tmpdir.join("wavy.geojson"))
+    gpd.GeoDataFrame(geometry=[wavy], crs="EPSG:4326").to_file(path, driver="GeoJSON")
+    geom = asf.ogr2geometry(path)
+    assert asf.count_vertices(geom) <= 300
+    assert wavy.within(geom)
+
+
+def test_ogr2geometry_many_parts(tmpdir):
+    boxes = [box(i, j, i + 0.5, j + 0.5) for i in range(10) for j in range(10)]
+    parts = gpd.GeoDataFrame(geometry=boxes, crs="EPSG:4326")
+    path = str(tmpdir.join("boxes.geojson"))
+    parts.to_file(path, driver="GeoJSON")
+    geom = asf.ogr2geometry(path)
+    assert asf.count_vertices(geom) <= 300
+    assert all(geom.contains(b) for b in boxes)
+    assert asf.count_vertices(asf.ogr2geometry(path, max_vertices=600)) == 500
+    with pytest.raises(ValueError):
+        asf.ogr2geometry(path, max_vertices=3)
+
+
+def test_query_asf_polygon(tmpdir, asf_server):
+    geom = asf.ogr2geometry("tests/data/UnionGap.shp")
+    asf.query_asf(geom, "SA", outdir=str(tmpdir), baseurl=asf_server.search_url)
+    assert asf_server.searches[0]["intersectsWith"] == geom.wkt
+
+
+def test_select_pairs():
+    gf = asf.load_inventory("tests/data/query.geojson")
+    orbits, dates = asf.acquisition_statistics(gf)
+    pairs = asf.select_pairs(dates)
+    assert len(pairs) == len(dates) - len(orbits)
+    assert (pairs.reference > pairs.secondary).all()
+    pairs = asf.select_pairs(dates, neighbors=3, max_days=24)
+    assert pairs.days.max() <= 24
+    assert not pairs.duplicated(["relativeOrbit", "reference", "secondary"]).any()
@@ -0,0 +1,111 @@
+"""Tests for the interferogram job cost model."""
+from dinosar.archive import asf
+from dinosar.isce import cost
+from dinosar.isce.scheduler import Scheduler, discover_jobs
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+FAKE_TOPSAPP = [sys.executable, os.path.abspath("tests/data/fake_topsApp.py")]
+
+
+def test_features():
+    f = cost.features(4, swaths=2, looks=(7, 19))
+    assert f["volume"] == 8
+    assert f["resolution"] == 1
+    assert f["unwrap"] == 1
+    assert cost.features(4, unwrapper="icu")["unwrap"] < 1
+    assert cost.features(4, dounwrap=False)["unwrap"] == 0
+
+
+def test_features_from_config_roi():
+    topsinsar = {"swaths": [1, 2, 3], "regionofinterest": [0, 1, 0, 1]}
+    f = cost.features_from_config(topsinsar, 2, frame_area=4.0)
+    assert f["roi_fraction"] == 0.25
+    assert f["volume"] == 2 * 3 * 0.25
+
+
+def test_features_from_intdir(tmpdir, make_intdir):
+    intdir = make_intdir(str(tmpdir), "int-20180706-20180624", (1, 2), 2, (3, 7))
+    f = cost.features_from_intdir(intdir)
+    assert f["frames"] == 4
+    assert f["swaths"] == 2
+    assert f["looks"] == 21
+
+
+def test_fit_recovers_coefficients():
+    rng = np.random.default_rng(0)
+    records = pd.DataFrame(
+        [
+            cost.features(n, s, looks=(a, 3 * a), unwrapper=u)
+            for (n, s, a), u in zip(
+                rng.integers(1, 5, size=(30, 3)), ["icu", "snaphu_mcf"] * 15
+            )
+        ]
+    )
+    truth = cost.CostModel({t: [10.0, 20.0, 3.0, 1.0] for t in cost.TARGETS})
+    for target, values in truth.predict(records).items():
+        records[target] = values
+    model = cost.CostModel.fit(records)
+    assert model.nruns == 30
+    np.testing.assert_allclose(model.coefficients["wall_time"], [10, 20, 3, 1])
+
+
+def test_fit_nonnegative():
+    records = pd.DataFrame([cost.features(n) for n in range(1, 6)])
+    for target in cost.TARGETS:
+        records[target] = 100.0 - records.volume
+    model = cost.CostModel.fit(records)
+    assert min(model.coefficients["wall_time"]) >= 0
+
+
+def test_save_load(tmpdir, monkeypatch):
+    monkeypatch.setenv("DINOSAR_CACHE", str(tmpdir))
+    assert cost.CostModel.load().nruns == 0
+    model = cost.CostModel({t: [1.0, 2.0, 3.0, 4.0] for t in cost.TARGETS}, 7)
+    model.save()
+    assert os.path.exists(tmpdir.join("cost-model.json"))
+    loaded = cost.CostModel.load()
+    assert loaded.nruns == 7
+    assert loaded.coefficients == model.coefficients
+
+
+def test_predict():
+    model = cost.CostModel()
+    small = model.predict(cost.features(2, swaths=1))
+    large = model.predict(cost.features(6, swaths=3))
+    assert set(small) == set(cost.TARGETS)
+    assert all(large[t] > small[t] for t in cost.TARGETS)
+
+
+def test_network_features():
+    gf = asf.load_inventory("./tests/data/query.geojson")
+    dates = asf.acquisition_statistics(gf)[1]
+    pairs = asf.select_pairs(dates, neighbors=2)
+    features = cost.network_features(gf, pairs, {"swaths": [1, 2]})
+    assert len(features) == len(pairs)
+    assert features.index[0].startswith("int-")
+    assert (features.frames >= 2).all()
+    costs = cost.CostModel().predict(features)
+    assert (costs.index == features.index).all()
+
+
+def test_record_runs(tmpdir, monkeypatch, make_intdir):
+    monkeypatch.setenv("FAKE_TOPSAPP_SECONDS", "0.1")
+    root = str(tmpdir)
+    make_intdir(root, "int-20180706-20180624", frames=1)
+    make_intdir(root, "int-20180718-20180706", frames=2)
+    merged = os.path.join(root, "int-20180718-20180706", "merged")
+    os.makedirs(merged)
+    with open(os.path.join(merged, "topophase.cor"), "wb") as f:
+        f.write(b"\0" * 1000)
+    Scheduler(discover_jobs(root), cores=1, memory=1e12, command=FAKE_TOPSAPP).run()
+
+    records = cost.record_runs(root)
+    assert len(records) == 2
+    assert (records.wall_time > 0).all()
+    assert records.loc["int-20180718-20180706", "output_bytes"] == 1000
+    assert (records.scratch_bytes >= records.output_bytes).all()
+    model = cost.CostModel.fit(records)
+    assert model.nruns == 2
@@ -0,0 +1,48 @@
+"""Tests for acquisition matrix coverage queries."""
+from dinosar.archive import asf
+from dinosar.archive.coverage import AcquisitionMatrix, matrix_path
+import numpy as np
+
+
+def test_from_inventory(gf):
+    acq = AcquisitionMatrix.from_inventory(gf)
+    assert list(acq.orbits) == sorted(gf.relativeOrbit.unique())
+    assert acq.frames.sum() == len(gf)
+    assert acq.bits.shape == (acq.orbits.size, -(-acq.ndays // 8))
+    assert acq.dates[0] == np.datetime64("2014-10-08")
+
+
+def test_max_gaps(gf):
+    acq = AcquisitionMatrix.from_inventory(gf)
+    orbits, dates = asf.acquisition_statistics(gf)
+    gaps = acq.max_gaps()
+    for orbit in acq.orbits:
+        assert gaps[orbit] == orbits.loc[orbit, "MaxGap"]
+    assert set(acq.tracks_with_gap(24)) == set(orbits.index[orbits.MaxGap > 24])
+
+
+def test_overlap_dates(gf):
+    acq = AcquisitionMatrix.from_inventory(gf)
+    dates = gf.groupby("flightDirection").sceneDateString.apply(set)
+    expected = sorted(dates["ASCENDING"] & dates["DESCENDING"])
+    assert list(acq.overlap_dates().astype(str)) == expected
+
+
+def test_coverage_fraction(gf):
+    acq = AcquisitionMatrix.from_inventory(gf)
+    fraction = acq.coverage_fraction(revisit=12, start="2017-01-01", stop="2017-12-31")
+    assert fraction[121] == 0
+    df = gf.query("relativeOrbit == 40 and sceneDateString.str.startswith('2017')")
+    days = (df.dateStamp - np.datetime64("2017-01-01")).dt.days
+    assert fraction[40] == days.floordiv(12).nunique() / 31
+
+
+def test_save_load(gf, tmpdir):
+    acq = AcquisitionMatrix.from_inventory(gf)
+    path = matrix_path(str(tmpdir.join("query.geojson")))
+    acq.save(path)
+    acq2 = AcquisitionMatrix.load(path)
+    assert np.array_equal(acq.bits, acq2.bits)
+    assert np.array_equal(acq.frames, acq2.frames)
+    assert list(acq.directions) == list(acq2.directions)
+    assert acq.start == acq2.start
@@ -0,0 +1,86 @@
+"""Tests for acquisition density rasters."""
+from dinosar.archive.density import density_raster, rasterize_spans, write_raster
+from shapely.geometry import Point, Polygon
+from shapely.prepared import prep
+import numpy as np
+import pytest
+
+
+def pixel_centers(bounds, shape):
+    minx, miny, maxx, maxy = bounds
+    nrows, ncols = shape
+    x = minx + (np.arange(ncols) + 0.5) * (maxx - minx) / ncols
+    y = maxy - (np.arange(nrows) + 0.5) * (maxy - miny) / nrows
+    return [[Point(xi, yi) for xi in x] for yi in y]
+
+
+def test_rasterize_spans():
+    hole = [(1, 1), (2, 1), (2, 2), (1, 2)]
+    square = Polygon([(0, 0), (4, 0), (4, 4), (0, 4)], [hole])
+    shifted = Polygon([(2, 2), (6, 2), (6, 6), (2, 6)])
+    xy = np.array(square.exterior.coords)
+    hole = np.array(square.interiors[0].coords)
+    other = np.array(shifted.exterior.coords)
+    edges = np.vstack([np.hstack([c[:-1], c[1:]]) for c in (xy, hole, other)])
+    owner = np.repeat([0, 0, 1], 4)
+    # same group: overlap counted once
+    counts = rasterize_spans(edges, owner, np.array([0, 0]), (0, 0, 8, 8), (8, 8))
+    assert counts.max() == 1
+    assert counts.sum() == 16 - 1 + 16 - 4
+    assert counts[8 - 2, 1] == 0  # hole
+    # different groups: overlap counted twice
+    counts = rasterize_spans(edges, owner, np.array([0, 1]), (0, 0, 8, 8), (8, 8))
+    assert counts.max() == 2
+    assert counts.sum() == 16 - 1 + 16
+
+
+def test_density_raster(gf):
+    shape = (30, 40)
+    counts, labels, bounds = density_raster(gf, shape=shape, workers=2)
+    assert labels == sorted(gf.relativeOrbit.unique())
+    points = pixel_centers(bounds, shape)
+    for layer, orbit in zip(counts, labels):
+        expected = np.zeros(shape, dtype=int)
+        for date, df in gf[gf.relativeOrbit == orbit].groupby("sceneDateString"):
+            footprint = prep(df.unary_union)
+            expected += [[footprint.contains(p) for p in row] for row in points]
+        np.testing.assert_array_equal(layer, expected)
+
+
+def test_density_raster_by_direction(gf):
+    counts, labels, bounds = density_raster(gf, shape=(30, 40), workers=2)
+    total, directions, _ = density_raster(
+        gf, bounds, shape=(30, 40), by="flightDirection", workers=2
+    )
+    assert directions == ["ASCENDING", "DESCENDING"]
+    np.testing.assert_array_equal(total.sum(axis=0), counts.sum(axis=0))
+    window, _, _ = density_raster(
+        gf, bounds, shape=(30, 40), start="2016-01-01", stop="2016-12-31", by=None
+    )
+    assert 0 < window.max() < total.sum(axis=0).max()
+
+
+def test_density_raster_empty_window(gf):
+    bounds = (-79, 0, -77, 2)
+    counts, labels, _ = density_raster(
+        gf, bounds, shape=(30, 40), start="2030-01-01", by=None
+    )
+    assert labels == ["all"]
+    assert counts.shape == (1, 30, 40)
+    assert counts.max() == 0
+    counts, labels, _ = density_raster(gf, bounds, shape=(30, 40), stop="2000-01-01")
+    assert labels == []
+    assert counts.shape == (0, 30, 40)
+    with pytest.raises(ValueError):
+        density_raster(gf, start="2030-01-01")
+
+
+def test_write_raster(gf, tmpdir):
+    counts, labels, bounds = density_raster(gf, shape=(30, 40), workers=1)
+    outname = str(tmpdir.join("density.vrt"))
+    write_raster(counts, labels, bounds, outname)
+    data = np.fromfile(str(tmpdir.join("density.bin")), dtype="<i4")
+    np.testing.assert_array_equal(data.reshape(counts.shape), counts)
+    with open(outname) as f:
+        vrt = f.read()
+    assert vrt.count("<VRTRasterBand") == len(labels)
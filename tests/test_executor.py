@@ -0,0 +1,72 @@
+"""Tests for running external commands."""
+from dinosar.executor import CommandError, CommandTimeout, Executor, run
+import os
+import sys
+import time
+import pytest
+
+
+def test_run_captures_output(tmpdir):
+    log = str(tmpdir.join("echo.log"))
+    result = run("echo hello; echo oops >&2", log=log, echo=False)
+    assert result.returncode == 0
+    assert result.output == "hello\noops\n"
+    assert result.wall_time > 0
+    with open(log) as f:
+        assert f.read() == "$ echo hello; echo oops >&2\nhello\noops\n"
+
+
+def test_run_peak_memory():
+    code = "x = bytearray(100_000_000); x[::4096] = b'1' * len(x[::4096])"
+    result = run([sys.executable, "-c", code], echo=False)
+    assert result.max_rss > 100_000_000
+
+
+def test_run_failure():
+    with pytest.raises(CommandError) as excinfo:
+        run("echo failing; exit 3", echo=False)
+    assert excinfo.value.result.returncode == 3
+    assert "failing" in str(excinfo.value)
+    result = run("exit 3", check=False)
+    assert result.returncode == 3
+
+
+def test_run_timeout():
+    start = time.perf_counter()
+    with pytest.raises(CommandTimeout) as excinfo:
+        run("sleep 10 & sleep 10; echo done", timeout=0.5, echo=False)
+    assert time.perf_counter() - start < 5
+    assert excinfo.value.result.returncode < 0
+
+
+def test_run_display(capsys):
+    run("echo secret > /dev/null", display="echo [redacted]")
+    assert "secret" not in capsys.readouterr().out
+
+
+def test_executor_bounded_parallelism(tmpdir):
+    log_dir = str(tmpdir.join("logs"))
+    events = str(tmpdir.join("events.txt"))
+    cmds = [
+        f"echo start >> {events}; sleep 0.3; echo end >> {events}; echo {i}"
+        for i in range(4)
+    ]
+    with Executor(max_workers=2, log_dir=log_dir) as ex:
+        results = ex.map(cmds, names=[f"job{i}" for i in range(4)])
+    with open(events) as f:
+        running = peak = 0
+        for line in f:
+            running += 1 if line.strip() == "start" else -1
+            peak = max(peak, running)
+    assert peak == 2
+    assert [r.output for r in results] == [f"{i}\n" for i in range(4)]
+    assert sorted(os.listdir(log_dir)) == [f"job{i}.log" for i in range(4)]
+
+
+def test_executor_fail_fast(tmpdir):
+    marker = tmpdir.join("ran")
+    cmds = ["exit 1", "sleep 0.2", f"touch {marker}"]
+    with Executor(max_workers=1) as ex:
+        with pytest.raises(CommandError):
+            ex.map(cmds)
+    assert not marker.exists()
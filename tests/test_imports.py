@@ -0,0 +1,53 @@
+"""Import-time regression tests for the command line scripts."""
+import subprocess
+import sys
+import pytest
+
+# Extra seconds a CLI may spend importing on top of its required dependencies
+CLI_STARTUP_BUDGET = 0.3
+HEAVY_MODULES = ["matplotlib", "cartopy", "owslib", "lxml"]
+CLI_MODULES = [
+    "dinosar.cli.prep_topsApp_local",
+    "dinosar.cli.get_inventory_asf",
+    "dinosar.cli.plot_inventory_asf",
+    "dinosar.cli.run_topsApp_local",
+    "dinosar.cli.cost_topsApp",
+    "dinosar.cli.shard_topsApp",
+    "dinosar.cli.run_pipeline",
+    "dinosar.cli.serve_inventory",
+    "dinosar.cli.watch_asf",
+    "dinosar.cli.serve_mock_asf",
+]
+
+
+def import_seconds(statement, repeat=3):
+    """Fastest wall time of running an import statement in a fresh interpreter."""
+    code = (
+        "import time; t0 = time.perf_counter(); "
+        f"{statement}; print(time.perf_counter() - t0)"
+    )
+    times = []
+    for i in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        times.append(float(out.stdout.split()[-1]))
+    return min(times)
+
+
+@pytest.mark.parametrize("module", CLI_MODULES)
+def test_cli_defers_heavy_imports(module):
+    code = (
+        f"import sys, {module}; "
+        f"print(' '.join(m for m in {HEAVY_MODULES} if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == ""
+
+
+def test_cli_startup_budget():
+    baseline = import_seconds("import geopandas, requests, yaml")
+    elapsed = import_seconds("import dinosar.cli.prep_topsApp_local")
+    assert elapsed - baseline < CLI_STARTUP_BUDGET
@@ -0,0 +1,106 @@
+"""Tests for the persistent footprint spatial index."""
+from dinosar.archive import asf
+from dinosar.archive.index import FootprintIndex, index_path
+from shapely.geometry import Point, box
+import numpy as np
+import os
+import pytest
+
+
+@pytest.fixture(scope="module")
+def points(gf):
+    rng = np.random.default_rng(0)
+    minx, miny, maxx, maxy = gf.total_bounds
+    return np.column_stack([rng.uniform(minx, maxx, 200), rng.uniform(miny, maxy, 200)])
+
+
+def test_index_path():
+    assert index_path("tmp/query.geojson") == "tmp/query.sidx.npz"
+
+
+def test_query_point(gf, points):
+    index = FootprintIndex.for_inventory(gf)
+    for x, y in points[:20]:
+        expected = np.flatnonzero(gf.contains(Point(x, y)).values)
+        np.testing.assert_array_equal(index.query_point(x, y), expected)
+
+
+def test_query_polygon(gf):
+    index = FootprintIndex.for_inventory(gf, node_size=4)
+    roi = box(-78.2, 0.6, -78.1, 0.7)
+    np.testing.assert_array_equal(
+        index.query(roi), np.flatnonzero(gf.intersects(roi).values)
+    )
+    big = box(-80, -2, -76, 2)
+    np.testing.assert_array_equal(
+        index.query(big, "within"), np.flatnonzero(gf.within(big).values)
+    )
+    candidates = index.query_bbox(-78.2, 0.6, -78.1, 0.7)
+    assert set(index.query(roi)) <= set(candidates)
+
+
+def test_query_many_boxes():
+    rng = np.random.default_rng(1)
+    xy = rng.uniform(0, 100, (2000, 2))
+    boxes = [box(x, y, x + 1, y + 1) for x, y in xy]
+    index = FootprintIndex.from_geometries(boxes, node_size=8)
+    assert index.parent_bounds.shape == (32, 4)
+    queries = rng.uniform(0, 100, (50, 2))
+    pairs = index.query_bulk(queries, None)
+    inside = (xy[None] <= queries[:, None]) & (queries[:, None] <= xy[None] + 1)
+    q, geom = np.nonzero(inside.all(axis=2))
+    np.testing.assert_array_equal(pairs["query"], q)
+    np.testing.assert_array_equal(pairs.geom, geom)
+
+
+def test_query_bulk(gf, points):
+    index = FootprintIndex.for_inventory(gf)
+    pairs = index.query_bulk(points)
+    from_shapes = index.query_bulk([Point(x, y) for x, y in points])
+    assert pairs.equals(from_shapes)
+    for i in range(0, len(points), 20):
+        expected = np.flatnonzero(gf.contains(Point(*points[i])).values)
+        np.testing.assert_array_equal(pairs.geom[pairs["query"] == i], expected)
+
+
+def test_persistent_index(gf, tmpdir, points):
+    path = str(tmpdir.join("query.sidx.npz"))
+    index = FootprintIndex.for_inventory(gf, path)
+    mtime = os.path.getmtime(path)
+    loaded = FootprintIndex.load(path)
+    assert loaded.key == index.key
+    # geometries decoded from the saved index when no inventory is attached
+    assert loaded.query_bulk(points, "contains").equals(index.query_bulk(points))
+
+    reused = FootprintIndex.for_inventory(gf, path)
+    assert os.path.getmtime(path) == mtime
+    np.testing.assert_array_equal(reused.order, index.order)
+
+    subset = gf.iloc[:100]
+    rebuilt = FootprintIndex.for_inventory(subset, path)
+    assert len(rebuilt) == 100
+    assert FootprintIndex.load(path).key == rebuilt.key
+
+
+def test_index_saved_by_cli(tmpdir, monkeypatch, asf_server):
+    import functools
+    import sys
+    from dinosar.cli import get_inventory_asf
+
+    query_asf = functools.partial(asf.query_asf, baseurl=asf_server.search_url)
+    monkeypatch.setattr(asf, "query_asf", query_asf)
+    monkeypatch.chdir(tmpdir)
+    roi = ["0.6", "1.0", "-78.2", "-77.5"]
+    monkeypatch.setattr(sys, "argv", ["get_inventory_asf.py", "-r"] + roi)
+    get_inventory_asf.main()
+
+    path = index_path("query.geojson")
+    mtime = os.path.getmtime(path)
+    gf = asf.load_inventory("query.geojson")
+    index = FootprintIndex.for_inventory(gf, path)
+    assert os.path.getmtime(path) == mtime
+    assert index.key == FootprintIndex.load(path).key
+    roi = box(-78.2, 0.6, -78.1, 0.7)
+    np.testing.assert_array_equal(
+        index.query(roi), np.flatnonzero(gf.intersects(roi).values)
+    )
@@ -0,0 +1,82 @@
+"""Tests for inventories partitioned by relative orbit and year."""
+from dinosar.archive import asf
+from dinosar.archive.partition import (
+    PartitionedInventory,
+    partition_path,
+    write_partitions,
+)
+import os
+import pytest
+
+
+@pytest.fixture(scope="module")
+def inventory(gf, tmpdir_factory):
+    root = str(tmpdir_factory.mktemp("archive"))
+    return write_partitions(gf, root, workers=2)
+
+
+def frame_count(gf):
+    return len(gf)
+
+
+def test_partition_path():
+    path = partition_path("archive", 18, 2017)
+    expected = os.path.join("relativeOrbit=018", "year=2017", "inventory.geojson")
+    assert path == os.path.join("archive", expected)
+
+
+def test_write_partitions(gf, inventory):
+    assert len(inventory) == len(gf)
+    years = gf.timeStamp.dt.year
+    assert len(inventory.manifest) == len(gf.groupby(["relativeOrbit", years]))
+    for path in inventory.manifest.path:
+        assert os.path.exists(os.path.join(inventory.root, path))
+
+
+def test_select(inventory):
+    selected = inventory.select(orbits=[40], start="2016-01-01")
+    assert list(selected.index) == [(40, 2016), (40, 2017), (40, 2018)]
+    assert len(inventory.select(bbox=[0, 0, 1, 1])) == 0
+
+
+def test_load(gf, inventory):
+    subset = inventory.load(orbits=[40], start="2016-01-01", stop="2016-06-30")
+    expected = gf.query("relativeOrbit == 40")
+    expected = expected[expected.sceneDateString.between("2016-01-01", "2016-06-30")]
+    assert sorted(subset.granuleName) == sorted(expected.granuleName)
+
+
+def test_partition_statistics(gf, inventory):
+    orbits, dates = inventory.acquisition_statistics(workers=2)
+    expected_orbits, expected_dates = asf.acquisition_statistics(gf)
+    assert orbits.equals(expected_orbits)
+    assert dates.equals(expected_dates)
+    counts = inventory.map_partitions(frame_count, orbits=[120], workers=2)
+    assert sum(counts) == (gf.relativeOrbit == 120).sum()
+
+
+def test_partition_statistics_no_match(inventory):
+    with pytest.raises(ValueError, match="No scenes match"):
+        inventory.acquisition_statistics(bbox=[0, 0, 1, 1])
+    # partitions match, but none of their scenes are in the time window
+    with pytest.raises(ValueError, match="No scenes match"):
+        inventory.acquisition_statistics(
+            orbits=[40], start="2016-06-02", stop="2016-06-02"
+        )
+
+
+def test_partition_lookups(gf, inventory):
+    date = gf[gf.relativeOrbit == 40].sceneDateString.iloc[5]
+    assert inventory.get_slc_urls(date, 40) == asf.get_slc_urls(gf, date, 40)
+    assert inventory.get_slc_names(date, 40) == asf.get_slc_names(gf, date, 40)
+    pairs = inventory.select_pairs(neighbors=2, max_days=30, workers=2)
+    assert pairs.equals(asf.select_pairs(asf.acquisition_statistics(gf)[1], 2, 30))
+
+
+def test_append_partitions(gf, tmpdir):
+    root = str(tmpdir)
+    first = gf[gf.sceneDateString < "2016-07-01"]
+    write_partitions(first, root, workers=2)
+    inventory = write_partitions(gf, root, append=True, workers=2)
+    assert len(inventory) == len(gf)
+    assert len(PartitionedInventory(root).load()) == len(gf)
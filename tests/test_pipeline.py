@@ -0,0 +1,212 @@
+"""Tests for checkpointed, resumable pipelines."""
+import dinosar.isce as dice
+from dinosar import pipeline as dp
+from dinosar.pipeline import Pipeline
+import os
+import sys
+
+FAKE_TOPSAPP = [sys.executable, os.path.abspath("tests/data/fake_topsApp.py")]
+
+
+def write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_run_skips_current_stage(tmpdir):
+    root = str(tmpdir)
+    write(os.path.join(root, "input.txt"), "a")
+    calls = []
+
+    def stage():
+        calls.append(1)
+        with open(os.path.join(root, "input.txt")) as f:
+            write(os.path.join(root, "output.txt"), f.read().upper())
+
+    def run(params=None):
+        return Pipeline(root).run(
+            "upper", stage, ["input.txt"], ["output.txt"], params=params
+        )
+
+    assert run()
+    assert not run()
+    assert run(params=dict(option=1))
+    assert not run(params=dict(option=1))
+    # touching without changing the contents keeps the stage current
+    os.utime(os.path.join(root, "input.txt"), ns=(0, 0))
+    assert not run(params=dict(option=1))
+    write(os.path.join(root, "input.txt"), "b")
+    assert run(params=dict(option=1))
+    # modified or deleted outputs are recreated
+    write(os.path.join(root, "output.txt"), "edited")
+    assert run(params=dict(option=1))
+    os.remove(os.path.join(root, "output.txt"))
+    assert run(params=dict(option=1))
+    assert len(calls) == 5
+
+
+def test_unchanged_outputs_keep_downstream_current(tmpdir):
+    root = str(tmpdir)
+    pipeline = Pipeline(root)
+
+    def first():
+        write(os.path.join(root, "first.txt"), "same")
+
+    def second():
+        write(os.path.join(root, "second.txt"), "done")
+
+    pipeline.run("first", first, outputs=["first.txt"], params=dict(version=1))
+    pipeline.run("second", second, inputs=["first.txt"], outputs=["second.txt"])
+    assert pipeline.run("first", first, outputs=["first.txt"], params=dict(version=2))
+    assert not pipeline.run(
+        "second", second, inputs=["first.txt"], outputs=["second.txt"]
+    )
+    pipeline.invalidate("sec")
+    assert "second" not in Pipeline(root).stages
+    assert list(pipeline.status().index) == ["first"]
+
+
+def test_fingerprint_cache(tmpdir, monkeypatch):
+    root = str(tmpdir)
+    os.makedirs(os.path.join(root, "merged"))
+    write(os.path.join(root, "merged", "a.txt"), "a")
+    write(os.path.join(root, "merged", "b.txt"), "b")
+    pipeline = Pipeline(root)
+    digest = pipeline.fingerprint("merged")
+    assert pipeline.fingerprint("missing.txt") is None
+
+    hashed = []
+    monkeypatch.setattr(dp, "_hash_file", lambda path: hashed.append(path))
+    assert pipeline.fingerprint("merged") == digest
+    assert hashed == []
+    write(os.path.join(root, "merged", "b.txt"), "c")
+    assert pipeline.fingerprint("merged") != digest
+    assert len(hashed) == 1
+
+
+def test_failed_stage_not_recorded(tmpdir):
+    root = str(tmpdir)
+    pipeline = Pipeline(root)
+    try:
+        pipeline.run("missing", lambda: None, outputs=["never.txt"])
+    except FileNotFoundError:
+        pass
+    assert "missing" not in Pipeline(root).stages
+
+
+def test_run_project(tmpdir, asf_server, capsys):
+    requests_seen = asf_server.searches
+    root = str(tmpdir.join("project"))
+    roi = [0.6, 1.0, -78.2, -77.5]
+    kwargs = dict(orbit=120, poeorb=False, baseurl=asf_server.search_url, neighbors=1)
+    pipeline = dp.run_project(root, roi, **kwargs)
+    prepped = [name for name in pipeline.stages if name.startswith("prep/")]
+    assert len(prepped) > 0
+    assert len(requests_seen) == 2
+    intdir = prepped[0].split("/")[1]
+    props = os.listdir(os.path.join(root, intdir))
+    assert sorted(props) == ["download-links.txt", "topsApp.xml"]
+
+    capsys.readouterr()
+    pipeline = dp.run_project(root, roi, **kwargs)
+    assert "Running" not in capsys.readouterr().out
+    assert len(requests_seen) == 2
+
+    # more neighbors only prepares the new pairs
+    kwargs["neighbors"] = 2
+    pipeline = dp.run_project(root, roi, **kwargs)
+    out = capsys.readouterr().out
+    ran = [line for line in out.splitlines() if line.startswith("Running")]
+    assert 0 < len(ran) < len(prepped) + 1
+    assert all(line.startswith("Running prep/") for line in ran)
+
+
+def test_run_project_precise_orbits(tmpdir, capsys):
+    from dinosar.archive import synthetic
+
+    roi = [-1.5, 3.1, -80.7, -75.8]
+    scenes = synthetic.synthetic_scenes(roi, "2018-03-01", "2018-04-30", orbits=[120])
+    # no precise orbits yet for the last dates
+    orbit_files = synthetic.synthetic_orbit_files("2018-02-20", "2018-04-20")
+    archive = synthetic.MockArchive(scenes, orbit_files)
+    server = synthetic.start_mock_server(archive)
+    root = str(tmpdir)
+    kwargs = dict(orbit=120, baseurl=archive.search_url, orbit_url=archive.orbit_url)
+    try:
+        pipeline = dp.run_project(root, roi, **kwargs)
+        assert "Falling back to using header orbits" in capsys.readouterr().out
+        intdirs = sorted(name for name in os.listdir(root) if name.startswith("int-"))
+        assert len(intdirs) > 3
+
+        def orbits(intdir):
+            with open(os.path.join(root, intdir, "download-links.txt")) as f:
+                return [url for url in f.read().split() if url.endswith(".EOF")]
+
+        for intdir in intdirs:
+            assert all(url.startswith(archive.orbit_url) for url in orbits(intdir))
+        header = [intdir for intdir in intdirs if not orbits(intdir)]
+        assert header == [intdir for intdir in intdirs if intdir[4:12] > "20180420"]
+        assert header
+        assert all(len(orbits(intdir)) == 2 for intdir in intdirs[: -len(header)])
+        assert not any(f"prep/{intdir}" in pipeline.stages for intdir in header)
+
+        # pairs with header orbits are prepared again once orbits are published
+        archive.orbit_files.update(
+            synthetic.synthetic_orbit_files("2018-04-21", "2018-05-31")
+        )
+        dp.run_project(root, roi, **kwargs)
+        ran = [
+            line.split("/")[1]
+            for line in capsys.readouterr().out.splitlines()
+            if line.startswith("Running prep/")
+        ]
+        assert sorted(ran) == header
+        assert all(len(orbits(intdir)) == 2 for intdir in intdirs)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_download_pairs_missing_command(tmpdir, monkeypatch, capsys):
+    root = str(tmpdir)
+    intdir = "int-20180706-20180624"
+    urls = ["https://example.com/ref.zip", "https://example.com/sec.zip"]
+    inputDict = dice.load_defaultDict(None)
+    dice.prep_topsapp(inputDict, urls[:1], urls[1:], os.path.join(root, intdir))
+
+    def popen(*args, **kwargs):
+        raise FileNotFoundError("wget")
+
+    monkeypatch.setattr("subprocess.Popen", popen)
+    pipeline = Pipeline(root)
+    dp.download_pairs(pipeline, [intdir])
+    assert f"Download failed for {intdir}" in capsys.readouterr().out
+    assert f"download/{intdir}" not in pipeline.stages
+
+
+def test_process_pairs(tmpdir, monkeypatch):
+    monkeypatch.setenv("FAKE_TOPSAPP_LOG", str(tmpdir.join("events.txt")))
+    monkeypatch.setenv("FAKE_TOPSAPP_SECONDS", "0.1")
+    root = str(tmpdir)
+    intdir = "int-20180706-20180624"
+    urls = ["https://example.com/ref.zip", "https://example.com/sec.zip"]
+    inputDict = dice.load_defaultDict(None)
+    dice.prep_topsapp(inputDict, urls[:1], urls[1:], os.path.join(root, intdir))
+    assert inputDict["topsinsar"]["reference"]["safe"] == ""
+    pipeline = Pipeline(root)
+    dp.process_pairs(pipeline, [intdir], command=FAKE_TOPSAPP)
+    assert f"process/{intdir}" not in pipeline.stages
+
+    # stand-in for a finished download
+    outputs = []
+    for url in urls:
+        write(os.path.join(root, intdir, os.path.basename(url)), url)
+        outputs.append(f"{intdir}/{os.path.basename(url)}")
+    pipeline.record(f"download/{intdir}", [f"{intdir}/download-links.txt"], outputs)
+    dp.process_pairs(pipeline, [intdir], command=FAKE_TOPSAPP)
+    assert f"process/{intdir}" in Pipeline(root).stages
+    with open(tmpdir.join("events.txt")) as f:
+        assert len(f.readlines()) == 2
+    dp.process_pairs(pipeline, [intdir], command=FAKE_TOPSAPP)
+    with open(tmpdir.join("events.txt")) as f:
+        assert len(f.readlines()) == 2
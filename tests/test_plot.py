@@ -0,0 +1,79 @@
+"""Tests for plotting inventories."""
+from dinosar.archive import asf
+import pytest
+import os
+
+pytest.importorskip("cartopy")
+from dinosar.archive import plot  # noqa: E402
+
+
+def test_get_tiler_local_cache(tmpdir):
+    from PIL import Image
+
+    source = tmpdir.mkdir("source")
+    os.makedirs(source.join("1", "0"))
+    Image.new("RGB", (256, 256), (10, 20, 30)).save(str(source.join("1", "0", "1.png")))
+    url = "file://" + str(source) + "/{z}/{x}/{y}.png"
+    cache = str(tmpdir.join("cache"))
+
+    tiler = plot.get_tiler(url, cache_dir=cache)
+    img, extent, origin = tiler.get_image((0, 1, 1))
+    assert img.getpixel((0, 0)) == (10, 20, 30)
+    assert os.path.isfile(tiler.tile_path((0, 1, 1)))
+
+    # served from the cache once the source is gone
+    source.remove()
+    img, extent, origin = plot.get_tiler(url, cache_dir=cache).get_image((0, 1, 1))
+    assert img.getpixel((0, 0)) == (10, 20, 30)
+
+
+def test_orbit_footprints_cached(tmpdir):
+    gf = asf.load_inventory("tests/data/query.geojson")
+    footprints = plot.orbit_footprints(gf, cache_dir=str(tmpdir))
+    assert list(footprints) == list(gf.relativeOrbit.unique())
+    assert plot.orbit_footprints(gf) is footprints
+
+    plot._FOOTPRINTS.clear()
+    reloaded = plot.orbit_footprints(gf, cache_dir=str(tmpdir))
+    for orbit, (poly, direction) in footprints.items():
+        assert reloaded[orbit][1] == direction
+        assert reloaded[orbit][0].equals(poly)
+
+
+def test_bin_acquisitions():
+    gf = asf.load_inventory("tests/data/query.geojson")
+    counts, orbits, periods = plot.bin_acquisitions(gf, freq="M")
+    assert counts.shape == (orbits.size, len(periods))
+    assert counts.sum() == len(gf)
+    assert list(orbits) == sorted(gf.relativeOrbit.unique())
+    row = list(orbits).index(40)
+    col = list(periods.astype(str)).index("2015-10")
+    expected = (gf.relativeOrbit == 40) & gf.sceneDateString.str.startswith("2015-10")
+    assert counts[row, col] == expected.sum()
+
+
+def test_plot_timeline_binned(tmpdir):
+    pytest.importorskip("matplotlib")
+    import matplotlib
+
+    matplotlib.use("Agg")
+    gf = asf.load_inventory("tests/data/query.geojson")
+    outname = str(tmpdir.join("timeline.png"))
+    plot.plot_timeline_binned(gf, freq="Q", outname=outname)
+    assert os.path.isfile(outname)
+
+
+@pytest.mark.network
+def test_plot_reports(tmpdir):
+    import geopandas as gpd
+    from shapely.geometry import box
+
+    gf = asf.load_inventory("tests/data/query.geojson")
+    aois = gpd.GeoDataFrame(
+        dict(name=["ecuador"]), geometry=[box(-78.196, 0.611, -77.522, 1.048)]
+    )
+    outdirs = plot.plot_reports(
+        gf, aois, outdir=str(tmpdir), processes=1, freq="M", zoom=1
+    )
+    assert os.path.isfile(os.path.join(outdirs["ecuador"], "map.pdf"))
+    assert os.path.isfile(os.path.join(outdirs["ecuador"], "timeline.pdf"))
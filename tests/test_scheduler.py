@@ -0,0 +1,122 @@
+"""Tests for running many topsApp jobs with the local scheduler."""
+from dinosar.isce.scheduler import (
+    Job,
+    Scheduler,
+    discover_jobs,
+    estimate_resources,
+    read_topsapp_xml,
+)
+import json
+import os
+import sys
+import pytest
+
+FAKE_TOPSAPP = [sys.executable, os.path.abspath("tests/data/fake_topsApp.py")]
+
+
+def read_events(path):
+    """Maximum number of concurrently running fake jobs and their order."""
+    with open(path) as f:
+        events = sorted((float(t), kind, d) for kind, t, d in map(str.split, f))
+    running = peak = 0
+    starts = []
+    for t, kind, d in events:
+        running += 1 if kind == "start" else -1
+        peak = max(peak, running)
+        if kind == "start":
+            starts.append(os.path.basename(d))
+    return peak, starts
+
+
+@pytest.fixture
+def fake_env(tmpdir, monkeypatch):
+    log = str(tmpdir.join("events.txt"))
+    monkeypatch.setenv("FAKE_TOPSAPP_LOG", log)
+    monkeypatch.setenv("FAKE_TOPSAPP_SECONDS", "0.3")
+    return log
+
+
+def test_read_topsapp_xml(tmpdir, make_intdir):
+    intdir = make_intdir(str(tmpdir), "int-20180706-20180624", swaths=(1, 2))
+    props = read_topsapp_xml(os.path.join(intdir, "topsApp.xml"))
+    assert props["swaths"] == [1, 2]
+    assert props["reference.safe"] == ["ref0.zip"]
+    assert props["rangelooks"] == 6
+
+
+def test_estimate_resources(tmpdir, make_intdir):
+    small = make_intdir(str(tmpdir), "int-1", swaths=(1,), frames=1, looks=(7, 19))
+    big = make_intdir(str(tmpdir), "int-2", swaths=(1, 2, 3), frames=3)
+    small, big = estimate_resources(small), estimate_resources(big)
+    assert (small["cpus"], small["frames"]) == (1, 2)
+    assert (big["cpus"], big["frames"]) == (3, 6)
+    assert big["memory"] > small["memory"]
+
+
+def test_discover_jobs(tmpdir, make_intdir):
+    make_intdir(str(tmpdir), "int-a")
+    make_intdir(str(tmpdir), "int-b", swaths=(1, 2, 3), frames=2)
+    os.makedirs(str(tmpdir.join("int-unprepared")))
+    jobs = discover_jobs(str(tmpdir))
+    assert [job.name for job in jobs] == ["int-a", "int-b"]
+    assert jobs[1].priority < jobs[0].priority
+
+
+def test_scheduler_packs_cores(tmpdir, fake_env, make_intdir):
+    jobs = [Job(make_intdir(str(tmpdir), f"int-{i}"), cpus=1) for i in range(4)]
+    jobs.append(Job(make_intdir(str(tmpdir), "int-big"), cpus=2, priority=-1))
+    failed = Scheduler(jobs, cores=2, memory=1e9, command=FAKE_TOPSAPP).run()
+    assert failed == []
+    peak, starts = read_events(fake_env)
+    assert peak == 2
+    assert starts[0] == "int-big"
+    for job in jobs:
+        assert job.state == "done"
+        assert os.path.exists(os.path.join(job.path, "merged", "filt_topophase.unw"))
+        assert os.path.exists(os.path.join(job.path, "topsApp.log"))
+
+
+def test_scheduler_packs_memory(tmpdir, fake_env, make_intdir):
+    jobs = [Job(make_intdir(str(tmpdir), f"int-{i}"), memory=6e9) for i in range(3)]
+    Scheduler(jobs, cores=4, memory=10e9, command=FAKE_TOPSAPP).run()
+    peak, starts = read_events(fake_env)
+    assert peak == 1
+
+
+def test_scheduler_checkpoint(tmpdir, fake_env, make_intdir):
+    root = str(tmpdir)
+    make_intdir(root, "int-ok")
+    make_intdir(root, "int-bad", fail=True)
+    scheduler = Scheduler(discover_jobs(root), cores=2, command=FAKE_TOPSAPP)
+    failed = scheduler.run()
+    assert [job.name for job in failed] == ["int-bad"]
+    with open(os.path.join(root, "scheduler-state.json")) as f:
+        states = json.load(f)
+    assert states["int-ok"]["state"] == "done"
+    assert states["int-bad"]["returncode"] == 1
+
+    # restart: only the failed job runs again
+    os.remove(os.path.join(root, "int-bad", "FAIL"))
+    os.remove(fake_env)
+    failed = Scheduler(discover_jobs(root), cores=2, command=FAKE_TOPSAPP).run()
+    assert failed == []
+    peak, starts = read_events(fake_env)
+    assert starts == ["int-bad"]
+
+
+def test_scheduler_retries(tmpdir, fake_env, make_intdir):
+    job = Job(make_intdir(str(tmpdir), "int-bad", fail=True))
+    failed = Scheduler([job], cores=1, command=FAKE_TOPSAPP, retries=2).run()
+    assert failed == [job]
+    assert job.attempts == 3
+
+
+def test_scheduler_missing_command(tmpdir, make_intdir):
+    root = str(tmpdir)
+    job = Job(make_intdir(root, "int-ok"))
+    command = [os.path.join(root, "missing", "topsApp.py")]
+    scheduler = Scheduler([job], cores=1, command=command, retries=1)
+    assert scheduler.run() == [job]
+    assert job.attempts == 2
+    with open(os.path.join(root, "scheduler-state.json")) as f:
+        assert json.load(f)["int-ok"]["state"] == "failed"
@@ -0,0 +1,115 @@
+"""Tests for the in-memory inventory service and client."""
+from dinosar.archive import asf
+from dinosar.archive.service import (
+    InventoryClient,
+    InventoryService,
+    ServiceError,
+    start_server,
+)
+import os
+import shutil
+import time
+import pytest
+
+GRANULE = "S1B_IW_SLC__1SDV_20180320T232821_20180320T232848_010121_01260A_0613"
+
+
+@pytest.fixture
+def served(tmpdir):
+    inventory = str(tmpdir.join("query.geojson"))
+    shutil.copy("tests/data/query.geojson", inventory)
+    service = InventoryService([inventory], "tests/data/poeorb.txt")
+    server = start_server(service, port=0, interval=None)
+    client = InventoryClient(f"http://127.0.0.1:{server.server_port}")
+    yield service, client, inventory
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def test_lookups_match_library(served):
+    service, client, inventory = served
+    gf = asf.load_inventory(inventory)
+    assert client.health()["inventories"] == 1
+    assert client.inventories()[inventory]["scenes"] == len(gf)
+    assert client.urls("20180320", 120) == asf.get_slc_urls(gf, "20180320", 120)
+    assert client.urls("2018-03-20", 120) == client.urls("20180320", 120)
+    assert client.names("20180320", 120) == [f"{GRANULE}.zip"]
+    assert client.urls("20180321", 120) == []
+    dates = client.dates(120)
+    assert dates == sorted(gf[gf.relativeOrbit == 120].dateStamp.dt.strftime("%Y%m%d"))
+    assert client.granule(GRANULE)["orbit"] == 120
+
+
+def test_orbit_url(served):
+    service, client, inventory = served
+    gid = "S1B_IW_SLC__1SDV_20171117T015310_20171117T015337_008315_00EB6C_40CA"
+    expected = asf.get_orbit_url_file(gid, inventory="tests/data/poeorb.txt")
+    assert client.orbit_url(gid) == expected
+
+
+def test_summary_and_coverage(served):
+    service, client, inventory = served
+    gf = asf.load_inventory(inventory)
+    summary = client.summary()
+    assert summary["120"]["Dates"] == gf[gf.relativeOrbit == 120].dateStamp.nunique()
+    coverage = client.coverage(revisit=12)
+    assert set(coverage) == set(summary)
+    assert 0 < coverage["120"]["coverage"] <= 1
+
+
+def test_footprints(served):
+    service, client, inventory = served
+    gf = asf.load_inventory(inventory)
+    point = gf.geometry.iloc[0].representative_point()
+    names = client.footprints(point=(point.x, point.y))
+    assert gf.granuleName.iloc[0] in names
+    assert len(client.footprints(bbox=(-81, -2, -75, 4))) == len(gf)
+    assert client.footprints(bbox=(0, 0, 1, 1)) == []
+
+
+def test_errors(served):
+    service, client, inventory = served
+    with pytest.raises(ServiceError) as e:
+        client.urls("2018", 120)
+    assert e.value.status == 400
+    with pytest.raises(ServiceError) as e:
+        client.get("unknown")
+    assert e.value.status == 404
+    with pytest.raises(ServiceError):
+        client.urls("20180320", 120, inventory="missing.geojson")
+    with pytest.raises(ServiceError):
+        client.get("urls", date="20180320")
+    assert client.health()["status"] == "ok"
+
+
+def test_hot_reload(served):
+    service, client, inventory = served
+    gf = asf.load_inventory(inventory)
+    asf.save_inventory(gf[gf.relativeOrbit != 120], inventory)
+    os.utime(inventory, ns=(0, 0))
+    assert service.reload() == [inventory]
+    assert service.reload() == []
+    assert client.urls("20180320", 120) == []
+    assert client.dates(120) == []
+
+
+def test_watch(tmpdir):
+    inventory = str(tmpdir.join("query.geojson"))
+    shutil.copy("tests/data/query.geojson", inventory)
+    service = InventoryService({"aoi": inventory})
+    server = start_server(service, port=0, interval=0.05)
+    client = InventoryClient(f"http://127.0.0.1:{server.server_port}")
+    try:
+        assert len(client.urls("20180320", 120, inventory="aoi")) == 1
+        gf = asf.load_inventory(inventory)
+        asf.save_inventory(gf[gf.relativeOrbit != 120], inventory)
+        for i in range(100):
+            if not client.urls("20180320", 120):
+                break
+            time.sleep(0.05)
+        assert client.urls("20180320", 120) == []
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
@@ -0,0 +1,78 @@
+"""Tests for packing topsApp jobs into array-job shards."""
+from dinosar.isce import shard
+import numpy as np
+import pandas as pd
+import json
+import os
+import subprocess
+import sys
+
+FAKE_TOPSAPP = f"{sys.executable} {os.path.abspath('tests/data/fake_topsApp.py')}"
+
+
+def test_job_cost(tmpdir, make_intdir):
+    small = make_intdir(str(tmpdir), "int-20180706-20180624")
+    large = make_intdir(str(tmpdir), "int-20180718-20180706", (1, 2, 3), 2)
+    assert shard.job_cost(small) == 2 * 1 / 6
+    assert shard.job_cost(large) == 6 * shard.job_cost(small)
+    costs = shard.estimate_costs(str(tmpdir))
+    assert list(costs.index) == [small, large]
+
+
+def test_pack_shards_balanced():
+    rng = np.random.default_rng(1)
+    costs = pd.Series(rng.lognormal(size=2000), index=[f"int-{i}" for i in range(2000)])
+    shards = shard.pack_shards(costs, 50)
+    assert len(shards) == 50
+    assert sorted(sum(shards, [])) == sorted(costs.index)
+    totals = np.array([costs[jobs].sum() for jobs in shards])
+    # no shard finishes later than the mean plus the largest single job
+    assert totals.max() <= totals.mean() + costs.max()
+    assert totals.max() / totals.mean() < 1.05
+
+
+def test_pack_shards_fewer_jobs():
+    costs = pd.Series([3.0, 1.0], index=["a", "b"])
+    assert shard.pack_shards(costs, 10) == [["a"], ["b"]]
+
+
+def test_write_manifests(tmpdir, make_intdir):
+    root = str(tmpdir)
+    for i in range(5):
+        make_intdir(root, f"int-2018070{i}-20180624", frames=i + 1)
+    costs = shard.estimate_costs(root)
+    outdir = os.path.join(root, "shards")
+    summary = shard.write_manifests(shard.pack_shards(costs, 2), costs, outdir)
+    assert summary.jobs.sum() == 5
+    assert np.isclose(summary.cost.sum(), costs.sum())
+    with open(os.path.join(outdir, "shard-000.txt")) as f:
+        assert f.readline().strip() == "../int-20180704-20180624"
+    with open(os.path.join(outdir, shard.MANIFEST)) as f:
+        assert len(json.load(f)) == 2
+    assert os.access(os.path.join(outdir, shard.SCRIPT), os.X_OK)
+
+
+def test_run_shard_script(tmpdir, make_intdir):
+    root = str(tmpdir)
+    make_intdir(root, "int-20180706-20180624")
+    make_intdir(root, "int-20180718-20180706", fail=True)
+    costs = shard.estimate_costs(root)
+    outdir = os.path.join(root, "shards")
+    shard.write_manifests(shard.pack_shards(costs, 1), costs, outdir)
+    env = dict(
+        os.environ,
+        TOPSAPP_COMMAND=FAKE_TOPSAPP,
+        FAKE_TOPSAPP_SECONDS="0",
+        SLURM_ARRAY_TASK_ID="0",
+    )
+    script = os.path.join(outdir, shard.SCRIPT)
+    proc = subprocess.run([script], env=env, capture_output=True, text=True)
+    assert proc.returncode == 1
+    assert "finished with 1 failed jobs" in proc.stdout
+    assert os.path.exists(os.path.join(root, "int-20180706-20180624", "topsApp.done"))
+
+    # finished jobs are skipped on resubmission
+    os.remove(os.path.join(root, "int-20180718-20180706", "FAIL"))
+    proc = subprocess.run([script], env=env, capture_output=True, text=True)
+    assert proc.returncode == 0
+    assert "Skipping ../int-20180706-20180624" in proc.stdout
@@ -0,0 +1,167 @@
+"""Tests for synthetic inventories and the local ASF stand-in."""
+from dinosar.archive import asf, synthetic
+import datetime
+import json
+import time
+import numpy as np
+import pytest
+import requests
+import shapely.wkt
+
+ROI = [-1.5, 3.1, -80.7, -75.8]
+
+
+def test_scenes_match_real_archive():
+    with open("tests/data/query_S1B.json") as f:
+        real = json.load(f)[0]
+    for orbit in ["40", "120", "142"]:
+        scene = [s for s in real if s["relativeOrbit"] == orbit][0]
+        day = scene["startTime"][:10]
+        scenes = synthetic.synthetic_scenes(ROI, day, day, orbits=[int(orbit)])
+        footprint = shapely.wkt.loads(scene["stringFootprint"])
+        match = max(
+            scenes,
+            key=lambda s: shapely.wkt.loads(s["stringFootprint"])
+            .intersection(footprint)
+            .area,
+        )
+        overlap = shapely.wkt.loads(match["stringFootprint"]).intersection(footprint)
+        assert overlap.area > 0.5 * footprint.area
+        assert match["absoluteOrbit"] == scene["absoluteOrbit"]
+        assert match["flightDirection"] == scene["flightDirection"]
+        seconds = (
+            np.datetime64(match["startTime"].replace(" ", "T"))
+            - np.datetime64(scene["startTime"].replace(" ", "T"))
+        ).astype(int)
+        assert abs(seconds) < 60
+
+
+def test_synthetic_inventory(tmpdir):
+    scenes = synthetic.synthetic_scenes(ROI, "2018-01-01", "2018-06-30", seed=1)
+    outname = synthetic.save_scenes(scenes, str(tmpdir.join("query.json")))
+    gf = asf.load_asf_json(outname)
+    assert len(gf) == len(scenes)
+    assert gf.geometry.intersects(asf.box(ROI[2], ROI[0], ROI[3], ROI[1])).all()
+    granules = asf.parse_granule_names(gf.granuleName)
+    assert (granules.absoluteOrbit == gf.absoluteOrbit.astype(int)).all()
+    offsets = granules.mission.map(synthetic.ORBIT_OFFSETS).astype(int)
+    relative = (granules.absoluteOrbit - offsets) % 175 + 1
+    assert (relative == gf.relativeOrbit.astype(int)).all()
+    # S1A and S1B alternate on every track (dt is 0 for the first date)
+    orbits, dates = asf.acquisition_statistics(gf)
+    assert set(dates.dt) == {0, 6}
+    assert (dates.dt == 0).sum() == len(orbits)
+
+    assert synthetic.synthetic_scenes(ROI, "2018-01-01", "2018-06-30", seed=1) == scenes
+    fewer = synthetic.synthetic_scenes(ROI, "2018-01-01", "2018-06-30", missing=0.2)
+    assert 0.7 * len(scenes) < len(fewer) < 0.9 * len(scenes)
+    more = synthetic.synthetic_scenes(ROI, "2018-01-01", "2018-06-30", duplicates=0.1)
+    gf = asf.load_asf_json(synthetic.save_scenes(more, outname))
+    kept, dropped = asf.resolve_duplicates(gf)
+    assert len(kept) == len(scenes)
+    assert len(dropped) == len(more) - len(scenes) > 0
+
+
+def test_mission_dates():
+    scenes = synthetic.synthetic_scenes(ROI, "2022-01-01", "2022-01-31", orbits=[40])
+    assert {scene["platform"] for scene in scenes} == {"Sentinel-1A"}
+    scenes = synthetic.synthetic_scenes(
+        ROI, "2016-01-01", "2016-01-31", flightDirection="ascending"
+    )
+    assert {scene["platform"] for scene in scenes} == {"Sentinel-1A"}
+    assert {scene["flightDirection"] for scene in scenes} == {"ASCENDING"}
+
+
+def test_query_mock_archive(tmpdir, mock_archive):
+    outname = asf.query_asf(
+        ROI,
+        "SB",
+        orbit=120,
+        start="2018-03-01",
+        stop="2018-03-31T23:59:59Z",
+        outdir=str(tmpdir),
+        baseurl=mock_archive.search_url,
+    )
+    gf = asf.load_asf_json(outname)
+    expected = [
+        s["granuleName"]
+        for s in mock_archive.scenes
+        if s["relativeOrbit"] == "120"
+        and s["platform"] == "Sentinel-1B"
+        and "2018-03" in s["startTime"][:7]
+    ]
+    assert sorted(gf.granuleName) == sorted(expected)
+    assert gf.downloadUrl.str.startswith(mock_archive.url).all()
+
+    # a small region far from the tracks
+    count = requests.get(
+        mock_archive.search_url,
+        params=dict(intersectsWith="POINT (-70 -30)", output="count"),
+    )
+    assert count.text == "0"
+    count = requests.get(
+        mock_archive.search_url,
+        params=dict(platform="Sentinel-1", relativeOrbit="40-120", output="count"),
+    )
+    assert int(count.text) == sum(
+        s["relativeOrbit"] in ("40", "120") for s in mock_archive.scenes
+    )
+
+
+def test_paging_errors_and_latency(tmpdir, mock_archive):
+    mock_archive.page_size = 10
+    outname = asf.query_asf(
+        ROI, "SA", outdir=str(tmpdir), baseurl=mock_archive.search_url
+    )
+    gf = asf.load_asf_json(outname)
+    found = sum(s["platform"] == "Sentinel-1A" for s in mock_archive.scenes)
+    assert len(gf) == gf.granuleName.nunique() == found
+    assert mock_archive.requests["search"] == -(-found // 10)
+
+    mock_archive.inject(503)
+    with pytest.raises(requests.HTTPError):
+        asf.query_asf(ROI, "SA", outdir=str(tmpdir), baseurl=mock_archive.search_url)
+    mock_archive.error_rate = 1.0
+    with pytest.raises(requests.HTTPError):
+        asf.query_asf(ROI, "SA", outdir=str(tmpdir), baseurl=mock_archive.search_url)
+    assert mock_archive.requests["errors"] == 2
+
+    mock_archive.error_rate = 0
+    mock_archive.latency = 0.05
+    start = time.perf_counter()
+    requests.get(mock_archive.orbit_url)
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_orbits_and_downloads(mock_archive):
+    scene = mock_archive.scenes[0]
+    orbit = asf.get_orbit_url(scene["granuleName"], url=mock_archive.orbit_url)
+    assert orbit.startswith(mock_archive.orbit_url)
+    assert requests.get(orbit).status_code == 200
+    assert requests.get(mock_archive.orbit_url + "/missing.EOF").status_code == 404
+
+    url = f"{mock_archive.url}/SLC/SA/{scene['granuleName']}.zip"
+    r = requests.get(url)
+    assert len(r.content) == mock_archive.download_bytes
+    r = requests.get(url, headers=dict(Range="bytes=1000-"))
+    assert r.status_code == 206
+    assert len(r.content) == mock_archive.download_bytes - 1000
+    assert requests.get(url, headers=dict(Range="bytes=1024-")).status_code == 416
+    assert requests.get(url.replace("S1", "S2")).status_code == 404
+    assert mock_archive.requests["download"] == 4
+
+
+def test_clock_and_hidden_scenes(mock_archive):
+    mock_archive.clock = lambda: datetime.datetime(2018, 3, 1)
+    count = requests.get(mock_archive.search_url, params=dict(output="count"))
+    assert int(count.text) == sum(
+        s["startTime"] <= "2018-03-01" for s in mock_archive.scenes
+    )
+    # orbits of dates up to 2018-02-08 (valid from the day before) are out
+    available = mock_archive.available_orbit_files()
+    assert max(name[42:50] for name in available) == "20180207"
+    scene = mock_archive.scenes[-1]
+    mock_archive.hidden.add(scene["granuleName"])
+    response = requests.get(mock_archive.search_url, params=dict(output="count"))
+    assert int(response.text) == int(count.text) - 1
+    assert "start" not in mock_archive.searches[-1]
@@ -0,0 +1,70 @@
+"""Test SBAS time series inversion."""
+import dinosar.timeseries as ts
+import numpy as np
+import pytest
+
+
+PAIRS = [
+    ("20180612", "20180531"),
+    ("20180624", "20180612"),
+    ("20180624", "20180531"),
+    ("20180706", "20180624"),
+    ("20180706", "20180612"),
+    ("20180718", "20180706"),
+]
+
+
+def synthetic_stack(pairs, shape=(5, 4)):
+    """Interferograms from a known cumulative displacement at each date."""
+    dates = sorted(set(d for pair in pairs for d in pair))
+    rng = np.random.default_rng(0)
+    truth = np.cumsum(rng.normal(size=(len(dates),) + shape), axis=0)
+    truth -= truth[0]
+    index = {d: i for i, d in enumerate(dates)}
+    stack = np.stack([truth[index[r]] - truth[index[s]] for r, s in pairs])
+    return stack, truth
+
+
+def test_pairs_from_dirs():
+    dirs = ["/tmp/int-20180706-20180624/", "int-20180624-20180612"]
+    pairs = ts.pairs_from_dirs(dirs)
+    assert pairs == [("20180706", "20180624"), ("20180624", "20180612")]
+    with pytest.raises(ValueError):
+        ts.pairs_from_dirs(["merged"])
+
+
+def test_build_design_matrix():
+    A, dates = ts.build_design_matrix(PAIRS)
+    assert A.shape == (len(PAIRS), len(dates) - 1)
+    assert dates[0] == "20180531"
+    assert np.array_equal(A[2], [0, 1, 0, 0])
+
+
+def test_invert_stack():
+    stack, truth = synthetic_stack(PAIRS)
+    model, dates = ts.invert_stack(stack, PAIRS, block_rows=2, dtype="f8")
+    assert len(dates) == truth.shape[0]
+    np.testing.assert_allclose(model, truth, atol=1e-10)
+
+
+def test_invert_stack_masked():
+    stack, truth = synthetic_stack(PAIRS)
+    stack[3, 0, 0] = np.nan  # still fully connected
+    stack[5, 1, 1] = np.nan  # last date unconstrained
+    stack[:, 2, 2] = np.nan  # no data
+    model, dates = ts.invert_stack(stack, PAIRS, dtype="f8")
+    np.testing.assert_allclose(model[:, 0, 0], truth[:, 0, 0], atol=1e-10)
+    np.testing.assert_allclose(model[:-1, 1, 1], truth[:-1, 1, 1], atol=1e-10)
+    assert np.isnan(model[-1, 1, 1])
+    assert np.isnan(model[:, 2, 2]).all()
+    np.testing.assert_allclose(model[:, 3, 3], truth[:, 3, 3], atol=1e-10)
+
+
+def test_invert_stack_memmap(tmpdir):
+    stack, truth = synthetic_stack(PAIRS, shape=(7, 3))
+    out = np.lib.format.open_memmap(
+        str(tmpdir.join("ts.npy")), mode="w+", dtype="f4", shape=truth.shape
+    )
+    model, dates = ts.invert_stack(stack, PAIRS, block_rows=3, out=out)
+    assert model is out
+    np.testing.assert_allclose(model, truth, atol=1e-5)
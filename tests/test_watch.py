@@ -0,0 +1,207 @@
+"""Tests for watching ASF for new acquisitions."""
+from dinosar.archive.watch import Watcher, find_events, load_aois
+import datetime
+import json
+import os
+import pytest
+
+ROI = [-1.5, 3.1, -80.7, -75.8]
+
+
+class FakeClock:
+    """Settable UTC clock shared by the watcher and the stand-in ASF API."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += datetime.timedelta(seconds=seconds)
+
+
+@pytest.fixture
+def archive(asf_server):
+    """ASF stand-in only serving scenes acquired before the clock's `now`."""
+    asf_server.clock = FakeClock(datetime.datetime(2018, 4, 4))
+    return asf_server
+
+
+def test_find_events():
+    scenes = [
+        dict(granuleName="S1A_A_0001", relativeOrbit="40", sceneDate="2018-04-14 11"),
+        dict(granuleName="S1B_B_0001", relativeOrbit="40", sceneDate="2018-04-08 11"),
+        dict(granuleName="S1B_B_0002", relativeOrbit="40", sceneDate="2018-04-08 11"),
+        dict(granuleName="S1B_C_0001", relativeOrbit="40", sceneDate="2018-04-08 11"),
+    ]
+    events, new = find_events(
+        scenes, seen={"S1B_C_0001"}, known_dates={(40, "20180408")}
+    )
+    # S1B_B_0002 is a reprocessed product of S1B_B_0001
+    assert [scene["granuleName"] for scene in new] == ["S1A_A_0001", "S1B_B_0001"]
+    assert [(e["kind"], e["date"]) for e in events] == [
+        ("new_frames", "20180408"),
+        ("new_date", "20180414"),
+    ]
+
+
+def test_poll_emits_new_dates(tmpdir, archive):
+    clock = archive.clock
+    received = []
+    watcher = Watcher(
+        {"ecuador": dict(roi=ROI)},
+        root=str(tmpdir),
+        on_event=received.append,
+        clock=clock,
+        baseurl=archive.search_url,
+    )
+    # first search only sets the high-water mark
+    assert watcher.poll() == []
+    assert "start" not in archive.searches[-1]
+    assert watcher.state["ecuador"]["sceneDate"].startswith("2018-04-03")
+
+    clock.now = datetime.datetime(2018, 4, 16)
+    events = watcher.poll()
+    assert archive.searches[-1]["start"].startswith("2018-04-02T")
+    assert [(e["relativeOrbit"], e["date"]) for e in events] == [
+        (40, "20180408"),
+        (120, "20180413"),
+        (40, "20180414"),
+        (142, "20180415"),
+    ]
+    assert {e["kind"] for e in events} == {"new_date"}
+    assert all(e["detected"] == "2018-04-16T00:00:00" for e in events)
+    assert received == events
+    with open(tmpdir.join("ecuador", "events.jsonl")) as f:
+        assert [json.loads(line) for line in f] == events
+
+    # nothing new, and the mark survives a restart
+    watcher = Watcher(
+        {"ecuador": dict(roi=ROI)},
+        str(tmpdir),
+        clock=clock,
+        baseurl=archive.search_url,
+    )
+    assert watcher.state["ecuador"]["sceneDate"].startswith("2018-04-15")
+    assert watcher.poll() == []
+
+
+def test_late_frames_and_failures(tmpdir, archive):
+    clock = archive.clock
+    with open("tests/data/query_S1B.json") as f:
+        scenes = json.load(f)[0]
+    late = [
+        s["granuleName"] for s in scenes if s["startTime"].startswith("2018-04-15")
+    ][0]
+    watcher = Watcher(
+        {"ecuador": dict(roi=ROI, orbit=142)},
+        root=str(tmpdir),
+        backfill=True,
+        clock=clock,
+        baseurl=archive.search_url,
+    )
+    archive.hidden.add(late)
+    clock.now = datetime.datetime(2018, 4, 16)
+    events = watcher.poll()
+    assert len(events) == len({e["date"] for e in events}) > 10
+    assert archive.searches[-1]["relativeOrbit"] == "142"
+    assert events[-1]["date"] == "20180415"
+    assert len(events[-1]["granules"]) == 1
+
+    archive.error_rate = 1.0
+    assert watcher.poll() == []
+    archive.error_rate = 0
+    archive.hidden.clear()
+    events = watcher.poll()
+    assert [(e["kind"], e["date"], e["granules"]) for e in events] == [
+        ("new_frames", "20180415", [late])
+    ]
+
+
+def test_run_prepares_new_pairs(tmpdir, archive):
+    clock = archive.clock
+    watcher = Watcher(
+        {"ecuador": dict(roi=ROI, orbit=120)},
+        root=str(tmpdir),
+        neighbors=2,
+        poeorb=False,
+        clock=clock,
+        baseurl=archive.search_url,
+        sats=["SB"],
+    )
+    # 3 polls 12 days apart: baseline, 20180413, nothing (next date is 20180519)
+    watcher.run(interval=12 * 86400, iterations=3, sleep=clock.sleep)
+    assert clock.now == datetime.datetime(2018, 4, 28)
+    with open(tmpdir.join("ecuador", "events.jsonl")) as f:
+        events = [json.loads(line) for line in f]
+    assert [e["pairs"] for e in events] == [
+        ["int-20180413-20180320", "int-20180413-20180401"]
+    ]
+    intdir = tmpdir.join("ecuador", "int-20180413-20180401")
+    with open(intdir.join("download-links.txt")) as f:
+        links = f.read().split()
+    assert [os.path.basename(url)[17:25] for url in links] == ["20180413", "20180401"]
+    assert os.path.exists(intdir.join("topsApp.xml"))
+    assert sorted(os.listdir(tmpdir.join("ecuador"))) == [
+        "events.jsonl",
+        "int-20180413-20180320",
+        "int-20180413-20180401",
+        "pipeline-state.json",
+        "query_SB.json",
+        "scenes.json",
+    ]
+
+
+def test_prepare_with_precise_orbits(tmpdir, archive, capsys):
+    clock = archive.clock
+    watcher = Watcher(
+        {"ecuador": dict(roi=ROI, orbit=120)},
+        root=str(tmpdir),
+        neighbors=1,
+        poeorb=True,
+        orbit_url=archive.orbit_url,
+        clock=clock,
+        baseurl=archive.search_url,
+        sats=["SB"],
+    )
+    watcher.poll()
+    # precise orbits of 20180413 are not out yet
+    clock.now = datetime.datetime(2018, 4, 16)
+    events = watcher.poll()
+    assert [e["pairs"] for e in events] == [["int-20180413-20180401"]]
+    assert "Falling back to using header orbits" in capsys.readouterr().out
+    intdir = tmpdir.join("ecuador", "int-20180413-20180401")
+    with open(intdir.join("download-links.txt")) as f:
+        assert not [url for url in f.read().split() if url.endswith(".EOF")]
+    assert watcher.state["ecuador"]["sceneDate"].startswith("2018-04-13")
+
+    # failed prep is reported as such, and the poll is repeated next time
+    watcher.template = str(tmpdir.join("missing.yml"))
+    clock.now = datetime.datetime(2018, 5, 20)
+    assert watcher.poll() == []
+    out = capsys.readouterr().out
+    assert "Preparing pairs of ecuador failed" in out
+    assert "Search for" not in out
+    assert watcher.state["ecuador"]["sceneDate"].startswith("2018-04-13")
+    assert not os.path.exists(tmpdir.join("ecuador", "scenes.json.tmp"))
+
+    # precise orbits of 20180519 are out by now, not those of 20180531
+    watcher.template = None
+    clock.now = datetime.datetime(2018, 6, 12)
+    events = watcher.poll()
+    assert [e["pairs"] for e in events] == [
+        ["int-20180519-20180413"],
+        ["int-20180531-20180519"],
+    ]
+    intdir = tmpdir.join("ecuador", "int-20180519-20180413")
+    with open(intdir.join("download-links.txt")) as f:
+        orbits = [url for url in f.read().split() if url.endswith(".EOF")]
+    assert len(orbits) == 2
+    assert all(url.startswith(archive.orbit_url) for url in orbits)
+
+
+def test_load_aois(tmpdir):
+    config = tmpdir.join("aois.yml")
+    config.write("ecuador:\n  roi: [-1.5, 3.1, -80.7, -75.8]\n  orbit: 120\n")
+    assert load_aois(str(config)) == {"ecuador": dict(roi=ROI, orbit=120)}